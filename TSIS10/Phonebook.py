@@ -1,13 +1,200 @@
-import psycopg2
 import csv
+import gzip
+import io
+import itertools
+import os
+import time
 from psycopg2 import sql
 
-class PhoneBook:
-    def __init__(self, dbname, user, password, host='localhost', port='5432'):
+from db_pool import PooledSession, PreparedStatements, get_pool, pooled, release_pool
+from lookup_cache import LRUCache
+
+# Column contract shared by the CSV import paths (see contacts.csv)
+CSV_COLUMNS = ('first_name', 'last_name', 'email', 'phone_number', 'phone_type')
+
+ALL_CONTACTS_QUERY = """
+SELECT u.user_id, u.first_name, u.last_name, u.email, 
+       p.phone_number, p.phone_type
+FROM users u
+LEFT JOIN phones p ON u.user_id = p.user_id
+ORDER BY u.last_name, u.first_name;
+"""
+
+# One row per contact (primary phone first) in the CSV_COLUMNS layout, so an
+# export can be loaded back with bulk_import_csv / bulk_import_jsonl. The
+# importers take one phone per contact, so contacts without a phone and every
+# other phone are left out; EXPORT_SKIPPED counts them for the export stats.
+EXPORT_SELECT = """
+SELECT DISTINCT ON (u.user_id)
+       u.first_name, u.last_name, u.email, p.phone_number, p.phone_type
+FROM users u
+JOIN phones p ON u.user_id = p.user_id
+ORDER BY u.user_id, p.is_primary IS TRUE DESC, p.phone_id
+"""
+
+EXPORT_SKIPPED = """
+SELECT (SELECT COUNT(*) FROM users u
+        WHERE NOT EXISTS (SELECT 1 FROM phones p WHERE p.user_id = u.user_id)),
+       (SELECT COUNT(*) - COUNT(DISTINCT user_id) FROM phones);
+"""
+
+# JSON Lines go through COPY's csv format with quote/delimiter characters that
+# never occur in json output, so every line is written and read back verbatim
+JSONL_COPY_OPTIONS = "(FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+
+EXPORT_QUERIES = {
+    'csv': f"COPY ({EXPORT_SELECT}) TO STDOUT WITH (FORMAT csv, HEADER)",
+    'jsonl': f"""
+    COPY (
+        SELECT json_build_object('first_name', c.first_name, 'last_name', c.last_name,
+                                 'email', c.email, 'phone_number', c.phone_number,
+                                 'phone_type', c.phone_type)
+        FROM ({EXPORT_SELECT}) c
+    ) TO STDOUT WITH {JSONL_COPY_OPTIONS}
+    """
+}
+
+CONTACT_LOOKUP = """
+SELECT u.user_id, u.first_name, u.last_name, u.email, 
+       p.phone_number, p.phone_type
+FROM users u
+JOIN phones p ON u.user_id = p.user_id
+WHERE {};
+"""
+
+# Hot statements, prepared once per pooled connection (see PreparedStatements)
+STATEMENTS = PreparedStatements('phonebook')
+STATEMENTS.register('insert_user', """
+INSERT INTO users (first_name, last_name, email)
+VALUES (%s, %s, %s) RETURNING user_id;
+""")
+STATEMENTS.register('insert_phone', """
+INSERT INTO phones (user_id, phone_number, phone_type, is_primary)
+VALUES (%s, %s, %s, TRUE);
+""")
+STATEMENTS.register('query_by_name', """
+SELECT u.user_id, u.first_name, u.last_name, u.email, 
+       p.phone_number, p.phone_type
+FROM users u
+LEFT JOIN phones p ON u.user_id = p.user_id
+WHERE u.first_name ILIKE %s OR u.last_name ILIKE %s;
+""")
+STATEMENTS.register('query_by_phone_exact', CONTACT_LOOKUP.format("p.phone_digits = %s"))
+STATEMENTS.register('query_by_phone_suffix', CONTACT_LOOKUP.format("reverse(p.phone_digits) LIKE %s"))
+STATEMENTS.register('query_by_phone_contains', CONTACT_LOOKUP.format("p.phone_number LIKE %s"))
+STATEMENTS.register('lookup_digits', """
+SELECT q.input, u.user_id, u.first_name, u.last_name, u.email, 
+       p.phone_number, p.phone_type
+FROM unnest(%s::text[], %s::text[]) AS q(input, digits)
+JOIN phones p ON p.phone_digits = q.digits
+JOIN users u ON u.user_id = p.user_id;
+""")
+STATEMENTS.register('update_first_name', "UPDATE users SET first_name = %s WHERE user_id = %s;")
+STATEMENTS.register('update_primary_phone', """
+UPDATE phones SET phone_number = %s 
+WHERE user_id = %s AND is_primary = TRUE;
+""")
+STATEMENTS.register('find_user_by_phone', "SELECT user_id FROM phones WHERE phone_number = %s;")
+STATEMENTS.register('delete_user', "DELETE FROM users WHERE user_id = %s;")
+
+# Unique names for server-side (named) cursors
+_stream_ids = itertools.count(1)
+
+
+def normalize_phone(phone):
+    """Canonical E.164 digits (no '+'), same rules as the SQL normalize_phone()"""
+    digits = ''.join(ch for ch in (phone or '') if ch.isdigit())
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if len(digits) == 11 and digits.startswith('8'):
+        # Local trunk prefix: 8 777 ... -> 7 777 ...
+        digits = '7' + digits[1:]
+    elif len(digits) == 10:
+        digits = '7' + digits
+    return digits or None
+
+
+def _open_contacts_file(path, mode):
+    """open() for contact files, transparently gzip-compressed for *.gz"""
+    kwargs = {'newline': ''} if 't' in mode else {}
+    opener = gzip.open if path.endswith('.gz') else open
+    return opener(path, mode, **kwargs)
+
+
+class _CountingWriter:
+    """File wrapper that counts the bytes COPY writes through it"""
+
+    def __init__(self, file):
+        self.file = file
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return self.file.write(data)
+
+
+class _TrackedLines:
+    """Iterator of decoded lines that keeps the byte offset of the next line"""
+
+    def __init__(self, file):
+        self.file = file
+        self.position = file.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        raw = self.file.readline()
+        if not raw:
+            raise StopIteration
+        self.position += len(raw)
+        return raw.decode('utf-8')
+
+
+class _CsvRowFilter:
+    """Readable CSV stream of the rows that have `fields` fields.
+
+    A single row with the wrong number of fields would abort COPY, so such
+    rows are dropped here and counted in self.skipped instead.
+    """
+
+    def __init__(self, file, fields):
+        self.rows = csv.reader(file)
+        self.fields = fields
+        self.skipped = 0
+        self.pending = ''
+
+    def read(self, size=-1):
+        buffer = io.StringIO()
+        buffer.write(self.pending)
+        writer = csv.writer(buffer)
+        for row in self.rows:
+            if len(row) == self.fields:
+                writer.writerow(row)
+            else:
+                self.skipped += 1
+            if 0 <= size <= buffer.tell():
+                break
+        data = buffer.getvalue()
+        if size < 0:
+            size = len(data)
+        self.pending = data[size:]
+        return data[:size]
+
+
+class PhoneBook(PooledSession):
+    statements = STATEMENTS
+
+    def __init__(self, dbname, user, password, host='localhost', port='5432', pool=None,
+                 cache_size=10000, cache_ttl=60.0):
         
+        # Read-through cache for query_by_name / query_by_phone
+        self.cache = LRUCache(cache_size, cache_ttl)
         try:
-            
-            self.conn = psycopg2.connect(
+            # Connections are borrowed per operation from a pool shared with
+            # every other PhoneBook/SnakeGameDB on the same database
+            self._owns_pool = pool is None
+            self.pool = pool or get_pool(
                 dbname=dbname,
                 user="postgres",
                 password="MyNewPassword123!",
@@ -16,12 +203,14 @@ class PhoneBook:
                 client_encoding='UTF8',
                 options='-c client_encoding=UTF8'
             )
-            self.cursor = self.conn.cursor()
+            with self.session():
+                pass
             print("Database connection established successfully")
         except Exception as e:
             print(f"Error connecting to database: {e}")
             raise
 
+    @pooled
     def create_tables(self):
         
         create_users_table = """
@@ -40,19 +229,142 @@ class PhoneBook:
             user_id INTEGER REFERENCES users(user_id) ON DELETE CASCADE,
             phone_number VARCHAR(20) NOT NULL,
             phone_type VARCHAR(20) DEFAULT 'mobile',
-            is_primary BOOLEAN DEFAULT FALSE
+            is_primary BOOLEAN DEFAULT FALSE,
+            phone_digits VARCHAR(20)
+        );
+        """
+        
+        create_checkpoints_table = """
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            source TEXT PRIMARY KEY,
+            byte_offset BIGINT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
         """
         
         try:
             self.cursor.execute(create_users_table)
             self.cursor.execute(create_phones_table)
+            self.cursor.execute(create_checkpoints_table)
             self.conn.commit()
             print("Tables created successfully")
         except Exception as e:
             print(f"Error creating tables: {e}")
             self.conn.rollback()
 
+    @pooled
+    def create_search_indexes(self):
+        """Create pg_trgm GIN indexes used by name/phone pattern search"""
+        index_queries = [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+            "CREATE INDEX IF NOT EXISTS idx_users_first_name_trgm ON users USING gin (first_name gin_trgm_ops);",
+            "CREATE INDEX IF NOT EXISTS idx_users_last_name_trgm ON users USING gin (last_name gin_trgm_ops);",
+            "CREATE INDEX IF NOT EXISTS idx_users_email_trgm ON users USING gin (email gin_trgm_ops);",
+            "CREATE INDEX IF NOT EXISTS idx_phones_number_trgm ON phones USING gin (phone_number gin_trgm_ops);",
+            "CREATE INDEX IF NOT EXISTS idx_phones_user_id ON phones (user_id);",
+        ]
+        try:
+            for query in index_queries:
+                self.cursor.execute(query)
+            self.conn.commit()
+            print("Search indexes created successfully")
+        except Exception as e:
+            print(f"Error creating search indexes: {e}")
+            self.conn.rollback()
+
+    @pooled
+    def migrate_phone_digits(self, batch_size=5000):
+        """Add the normalized phone_digits column, keep it filled by trigger,
+        backfill existing rows in batches and index it for exact/suffix lookups"""
+        try:
+            self.cursor.execute("ALTER TABLE phones ADD COLUMN IF NOT EXISTS phone_digits VARCHAR(20);")
+            self.cursor.execute("""
+            CREATE OR REPLACE FUNCTION normalize_phone(p_phone TEXT)
+            RETURNS TEXT AS $$
+            DECLARE
+                v_digits TEXT := regexp_replace(COALESCE(p_phone, ''), '[^0-9]', '', 'g');
+            BEGIN
+                IF v_digits LIKE '00%' THEN
+                    v_digits := substr(v_digits, 3);
+                END IF;
+                IF length(v_digits) = 11 AND v_digits LIKE '8%' THEN
+                    v_digits := '7' || substr(v_digits, 2);
+                ELSIF length(v_digits) = 10 THEN
+                    v_digits := '7' || v_digits;
+                END IF;
+                RETURN NULLIF(v_digits, '');
+            END;
+            $$ LANGUAGE plpgsql IMMUTABLE;
+            """)
+            self.cursor.execute("""
+            CREATE OR REPLACE FUNCTION phones_set_digits()
+            RETURNS TRIGGER AS $$
+            BEGIN
+                NEW.phone_digits := normalize_phone(NEW.phone_number);
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+            """)
+            self.cursor.execute("DROP TRIGGER IF EXISTS trg_phones_set_digits ON phones;")
+            self.cursor.execute("""
+            CREATE TRIGGER trg_phones_set_digits
+            BEFORE INSERT OR UPDATE OF phone_number ON phones
+            FOR EACH ROW EXECUTE FUNCTION phones_set_digits();
+            """)
+            self.conn.commit()
+        except Exception as e:
+            print(f"Error migrating phones table: {e}")
+            self.conn.rollback()
+            return
+
+        updated = self.backfill_phone_digits(batch_size)
+        self.cache.clear()
+
+        try:
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_phones_digits ON phones (phone_digits);")
+            # Suffix ("last N digits") lookups become prefix scans on the reversed digits
+            self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_phones_digits_rev
+            ON phones (reverse(phone_digits) text_pattern_ops);
+            """)
+            self.conn.commit()
+            print(f"Phone digits migration done ({updated} rows backfilled)")
+        except Exception as e:
+            print(f"Error creating phone digit indexes: {e}")
+            self.conn.rollback()
+
+    @pooled
+    def backfill_phone_digits(self, batch_size=5000):
+        """Fill phone_digits for existing rows, one committed batch at a time"""
+        last_id = 0
+        updated = 0
+        try:
+            while True:
+                self.cursor.execute("""
+                SELECT MAX(phone_id) FROM (
+                    SELECT phone_id FROM phones
+                    WHERE phone_id > %s
+                    ORDER BY phone_id
+                    LIMIT %s
+                ) batch;
+                """, (last_id, batch_size))
+                batch_end = self.cursor.fetchone()[0]
+                if batch_end is None:
+                    break
+                self.cursor.execute("""
+                UPDATE phones
+                SET phone_digits = normalize_phone(phone_number)
+                WHERE phone_id > %s AND phone_id <= %s
+                  AND phone_digits IS DISTINCT FROM normalize_phone(phone_number);
+                """, (last_id, batch_end))
+                updated += self.cursor.rowcount
+                self.conn.commit()
+                last_id = batch_end
+        except Exception as e:
+            print(f"Error backfilling phone digits (stopped after id {last_id}): {e}")
+            self.conn.rollback()
+        return updated
+
     def insert_user_console(self):
         
         print("\n--- Add New Contact ---")
@@ -61,28 +373,26 @@ class PhoneBook:
         email = input("Enter email (optional): ") or None
         phone_number = input("Enter phone number: ")
         phone_type = input("Enter phone type (mobile/home/work) [mobile]: ") or 'mobile'
-        
+        self.insert_user(first_name, last_name, email, phone_number, phone_type)
+
+    @pooled
+    def insert_user(self, first_name, last_name, email, phone_number, phone_type='mobile'):
+        """Insert one contact with its primary phone, return the new user_id"""
         try:
-           
-            insert_user_query = """
-            INSERT INTO users (first_name, last_name, email)
-            VALUES (%s, %s, %s) RETURNING user_id;
-            """
-            self.cursor.execute(insert_user_query, (first_name, last_name, email))
+            self.execute_prepared('insert_user', (first_name, last_name, email))
             user_id = self.cursor.fetchone()[0]
-            
-            insert_phone_query = """
-            INSERT INTO phones (user_id, phone_number, phone_type, is_primary)
-            VALUES (%s, %s, %s, TRUE);
-            """
-            self.cursor.execute(insert_phone_query, (user_id, phone_number, phone_type))
+            self.execute_prepared('insert_phone', (user_id, phone_number, phone_type))
             
             self.conn.commit()
+            self._invalidate_contact(user_id, first_name, last_name, phone_number)
             print(f"Contact added successfully with ID: {user_id}")
+            return user_id
         except Exception as e:
             print(f"Error inserting user: {e}")
             self.conn.rollback()
+            return None
 
+    @pooled
     def insert_from_csv(self, csv_file):
         try:
             with open(csv_file, 'r') as file:
@@ -90,112 +400,491 @@ class PhoneBook:
                 count = 0
                 
                 for row in csv_reader:
-                    # Insert user
-                    insert_user_query = """
-                    INSERT INTO users (first_name, last_name, email)
-                    VALUES (%s, %s, %s) RETURNING user_id;
-                    """
-                    self.cursor.execute(insert_user_query, 
-                                      (row['first_name'], row['last_name'], 
-                                       row.get('email', None)))
+                    self.execute_prepared('insert_user', (row['first_name'], row['last_name'], 
+                                                          row.get('email', None)))
                     user_id = self.cursor.fetchone()[0]
-                    
-                    # Insert phone
-                    insert_phone_query = """
-                    INSERT INTO phones (user_id, phone_number, phone_type, is_primary)
-                    VALUES (%s, %s, %s, %s);
-                    """
-                    self.cursor.execute(insert_phone_query, 
-                                      (user_id, row['phone_number'], 
-                                       row.get('phone_type', 'mobile'), True))
+                    self.execute_prepared('insert_phone', (user_id, row['phone_number'], 
+                                                           row.get('phone_type', 'mobile')))
                     count += 1
                 
                 self.conn.commit()
+                self.cache.clear()
                 print(f"Successfully imported {count} contacts from CSV")
         except Exception as e:
             print(f"Error importing from CSV: {e}")
             self.conn.rollback()
 
+    @pooled
+    def bulk_import_csv(self, csv_file):
+        """Bulk import contacts from CSV (optionally .gz) via COPY into a staging table.
+
+        Rows with the wrong number of fields are counted as rejected.
+        """
+        start = time.perf_counter()
+        try:
+            with _open_contacts_file(csv_file, 'rt') as file:
+                columns = self._parse_csv_header(next(csv.reader(file), None))
+                if columns is None:
+                    return None
+                rows = _CsvRowFilter(file, len(columns))
+                self._create_staging_table()
+                self._copy_into_staging(rows, columns)
+
+            total, rejected = self._load_staged_contacts()
+            total += rows.skipped
+            rejected += rows.skipped
+            self.conn.commit()
+            # Bulk loads can match any cached lookup
+            self.cache.clear()
+        except Exception as e:
+            print(f"Error bulk importing from CSV: {e}")
+            self.conn.rollback()
+            return None
+
+        stats = self._import_stats(total, rejected, time.perf_counter() - start)
+        print(f"Bulk imported {stats['imported']} contacts, rejected {rejected} rows "
+              f"in {stats['elapsed']:.2f}s ({stats['rows_per_sec']:.0f} rows/sec)")
+        return stats
+
+    @pooled
+    def bulk_import_jsonl(self, jsonl_file):
+        """Bulk import contacts from JSON Lines (optionally .gz), e.g. an export_contacts file"""
+        start = time.perf_counter()
+        try:
+            with _open_contacts_file(jsonl_file, 'rb') as file:
+                self._create_staging_table()
+                self.cursor.execute("""
+                CREATE TEMP TABLE contacts_json (
+                    line_num BIGSERIAL,
+                    doc TEXT
+                ) ON COMMIT DROP;
+                """)
+                self.cursor.copy_expert(
+                    f"COPY contacts_json (doc) FROM STDIN WITH {JSONL_COPY_OPTIONS}", file)
+
+            self.cursor.execute("""
+            INSERT INTO contacts_staging (first_name, last_name, email, phone_number, phone_type)
+            SELECT d->>'first_name', d->>'last_name', d->>'email',
+                   d->>'phone_number', d->>'phone_type'
+            FROM (
+                SELECT line_num, doc::jsonb AS d
+                FROM contacts_json
+                WHERE btrim(doc) <> ''
+            ) j
+            ORDER BY line_num;
+            """)
+            total, rejected = self._load_staged_contacts()
+            self.conn.commit()
+            # Bulk loads can match any cached lookup
+            self.cache.clear()
+        except Exception as e:
+            print(f"Error bulk importing from JSON Lines: {e}")
+            self.conn.rollback()
+            return None
+
+        stats = self._import_stats(total, rejected, time.perf_counter() - start)
+        print(f"Bulk imported {stats['imported']} contacts, rejected {rejected} rows "
+              f"in {stats['elapsed']:.2f}s ({stats['rows_per_sec']:.0f} rows/sec)")
+        return stats
+
+    @pooled
+    def export_contacts(self, path, fmt='csv', compress=None):
+        """Stream contacts to a CSV or JSON Lines file with COPY ... TO STDOUT.
+
+        compress=None gzips when the path ends with .gz. Memory use does not
+        depend on the table size: COPY output goes straight to the file.
+
+        Only each contact's primary phone is exported. The stats report the
+        contacts left out for having no phone ('skipped_contacts') and the
+        other phones left out ('skipped_phones').
+        """
+        if fmt not in EXPORT_QUERIES:
+            print(f"Unknown export format: {fmt} (use {', '.join(EXPORT_QUERIES)})")
+            return None
+        if compress is None:
+            compress = path.endswith('.gz')
+        start = time.perf_counter()
+        try:
+            with (gzip.open if compress else open)(path, 'wb') as file:
+                out = _CountingWriter(file)
+                self.cursor.copy_expert(EXPORT_QUERIES[fmt], out)
+            rows = self.cursor.rowcount
+            self.cursor.execute(EXPORT_SKIPPED)
+            skipped_contacts, skipped_phones = self.cursor.fetchone()
+            self.conn.commit()
+        except Exception as e:
+            print(f"Error exporting contacts: {e}")
+            self.conn.rollback()
+            return None
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            'rows': rows,
+            'skipped_contacts': skipped_contacts,
+            'skipped_phones': skipped_phones,
+            'bytes': out.bytes_written,
+            'file_bytes': os.path.getsize(path),
+            'elapsed': elapsed,
+            'rows_per_sec': rows / elapsed if elapsed > 0 else 0.0,
+            'mb_per_sec': out.bytes_written / 1e6 / elapsed if elapsed > 0 else 0.0
+        }
+        print(f"Exported {rows} contacts to {path} in {elapsed:.2f}s "
+              f"({stats['rows_per_sec']:.0f} rows/sec, {stats['mb_per_sec']:.1f} MB/sec, "
+              f"{stats['file_bytes']} bytes on disk)")
+        if skipped_contacts or skipped_phones:
+            print(f"Not exported: {skipped_contacts} contacts without a phone, "
+                  f"{skipped_phones} non-primary phones")
+        return stats
+
+    @pooled
+    def import_csv_chunked(self, csv_file, batch_size=10000):
+        """Import CSV in batches, committing each one and resuming after a crash"""
+        source = os.path.abspath(csv_file)
+        start = time.perf_counter()
+        total = rejected = 0
+        try:
+            self.cursor.execute(
+                "SELECT byte_offset FROM import_checkpoints WHERE source = %s;",
+                (source,))
+            checkpoint = self.cursor.fetchone()
+            self.conn.commit()
+
+            with open(csv_file, 'rb') as file:
+                lines = _TrackedLines(file)
+                columns = self._parse_csv_header(next(csv.reader(lines), None))
+                if columns is None:
+                    return None
+                if checkpoint:
+                    file.seek(checkpoint[0])
+                    lines.position = checkpoint[0]
+                    print(f"Resuming {csv_file} from byte {checkpoint[0]}")
+
+                reader = csv.reader(lines)
+                while True:
+                    batch = list(itertools.islice(reader, batch_size))
+                    if not batch:
+                        break
+                    # Rows with the wrong number of fields would abort COPY
+                    rows = [row for row in batch if len(row) == len(columns)]
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(rows)
+                    buffer.seek(0)
+
+                    self._create_staging_table()
+                    self._copy_into_staging(buffer, columns)
+                    batch_total, batch_rejected = self._load_staged_contacts()
+                    batch_total += len(batch) - len(rows)
+                    batch_rejected += len(batch) - len(rows)
+                    # The checkpoint commits atomically with the batch it describes
+                    self.cursor.execute("""
+                    INSERT INTO import_checkpoints (source, byte_offset, updated_at)
+                    VALUES (%s, %s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (source) DO UPDATE
+                    SET byte_offset = EXCLUDED.byte_offset, updated_at = EXCLUDED.updated_at;
+                    """, (source, lines.position))
+                    self.conn.commit()
+                    self.cache.clear()
+
+                    total += batch_total
+                    rejected += batch_rejected
+                    print(f"Committed batch of {batch_total} rows (byte {lines.position})")
+
+            self.cursor.execute("DELETE FROM import_checkpoints WHERE source = %s;", (source,))
+            self.conn.commit()
+        except Exception as e:
+            print(f"Error in chunked import (committed batches are kept): {e}")
+            self.conn.rollback()
+            return None
+
+        stats = self._import_stats(total, rejected, time.perf_counter() - start)
+        print(f"Chunked import finished: {stats['imported']} imported, {rejected} rejected "
+              f"in {stats['elapsed']:.2f}s ({stats['rows_per_sec']:.0f} rows/sec)")
+        return stats
+
+    def _parse_csv_header(self, header):
+        """Check a CSV header against CSV_COLUMNS, return the column list or None"""
+        if not header:
+            print("CSV file is empty")
+            return None
+        columns = [column.strip() for column in header]
+        missing = [c for c in ('first_name', 'last_name', 'phone_number')
+                   if c not in columns]
+        unknown = [c for c in columns if c not in CSV_COLUMNS]
+        if missing or unknown:
+            print(f"Invalid CSV header (missing: {missing}, unknown: {unknown})")
+            return None
+        return columns
+
+    def _create_staging_table(self):
+        """Create the per-transaction staging table used by the bulk import paths"""
+        self.cursor.execute("""
+        CREATE TEMP TABLE contacts_staging (
+            row_num BIGSERIAL,
+            first_name TEXT,
+            last_name TEXT,
+            email TEXT,
+            phone_number TEXT,
+            phone_type TEXT,
+            user_id INTEGER,
+            reject_reason TEXT
+        ) ON COMMIT DROP;
+        """)
+
+    def _copy_into_staging(self, file, columns):
+        """Stream CSV rows (without header) into contacts_staging"""
+        copy_query = sql.SQL(
+            "COPY contacts_staging ({}) FROM STDIN WITH (FORMAT csv)"
+        ).format(sql.SQL(', ').join(map(sql.Identifier, columns)))
+        self.cursor.copy_expert(copy_query.as_string(self.conn), file)
+
+    def _import_stats(self, total, rejected, elapsed):
+        return {
+            'imported': total - rejected,
+            'rejected': rejected,
+            'elapsed': elapsed,
+            'rows_per_sec': total / elapsed if elapsed > 0 else 0.0
+        }
+
+    def _load_staged_contacts(self):
+        """Validate contacts_staging, move accepted rows into users/phones,
+        return (total, rejected)"""
+        self.cursor.execute("""
+        UPDATE contacts_staging SET
+            first_name = NULLIF(trim(first_name), ''),
+            last_name = NULLIF(trim(last_name), ''),
+            email = NULLIF(trim(email), ''),
+            phone_number = NULLIF(trim(phone_number), ''),
+            phone_type = COALESCE(NULLIF(trim(phone_type), ''), 'mobile');
+        """)
+        self.cursor.execute("""
+        UPDATE contacts_staging SET reject_reason = CASE
+            WHEN first_name IS NULL OR last_name IS NULL THEN 'missing name'
+            WHEN phone_number IS NULL THEN 'missing phone number'
+            WHEN length(first_name) > 50 OR length(last_name) > 50
+                 OR length(email) > 100 OR length(phone_number) > 20
+                 OR length(phone_type) > 20 THEN 'value too long'
+        END;
+        """)
+        # Emails are unique: reject repeats inside the file and ones already stored
+        self.cursor.execute("""
+        UPDATE contacts_staging s SET reject_reason = 'duplicate email'
+        FROM (
+            SELECT row_num,
+                   ROW_NUMBER() OVER (PARTITION BY email ORDER BY row_num) AS rn
+            FROM contacts_staging
+            WHERE reject_reason IS NULL AND email IS NOT NULL
+        ) d
+        WHERE s.row_num = d.row_num AND (
+            d.rn > 1 OR EXISTS (SELECT 1 FROM users u WHERE u.email = s.email)
+        );
+        """)
+        # Names are unique too (uq_users_full_name)
+        self.cursor.execute("""
+        UPDATE contacts_staging s SET reject_reason = 'duplicate name'
+        FROM (
+            SELECT row_num,
+                   ROW_NUMBER() OVER (PARTITION BY first_name, last_name
+                                      ORDER BY row_num) AS rn
+            FROM contacts_staging
+            WHERE reject_reason IS NULL
+        ) d
+        WHERE s.row_num = d.row_num AND (
+            d.rn > 1 OR EXISTS (SELECT 1 FROM users u
+                                WHERE u.first_name = s.first_name
+                                  AND u.last_name = s.last_name)
+        );
+        """)
+        self.cursor.execute("""
+        UPDATE contacts_staging
+        SET user_id = nextval(pg_get_serial_sequence('users', 'user_id'))
+        WHERE reject_reason IS NULL;
+        """)
+        self.cursor.execute("""
+        INSERT INTO users (user_id, first_name, last_name, email)
+        SELECT user_id, first_name, last_name, email
+        FROM contacts_staging WHERE user_id IS NOT NULL
+        ORDER BY row_num;
+        """)
+        self.cursor.execute("""
+        INSERT INTO phones (user_id, phone_number, phone_type, is_primary)
+        SELECT user_id, phone_number, phone_type, TRUE
+        FROM contacts_staging WHERE user_id IS NOT NULL
+        ORDER BY row_num;
+        """)
+        self.cursor.execute("SELECT COUNT(*), COUNT(reject_reason) FROM contacts_staging;")
+        return self.cursor.fetchone()
+
+    @pooled
     def update_user(self, user_id, first_name=None, phone_number=None):
         
         try:
             if first_name:
-                update_query = "UPDATE users SET first_name = %s WHERE user_id = %s;"
-                self.cursor.execute(update_query, (first_name, user_id))
+                self.execute_prepared('update_first_name', (first_name, user_id))
             
             if phone_number:
-                update_query = """
-                UPDATE phones SET phone_number = %s 
-                WHERE user_id = %s AND is_primary = TRUE;
-                """
-                self.cursor.execute(update_query, (phone_number, user_id))
+                self.execute_prepared('update_primary_phone', (phone_number, user_id))
             
             self.conn.commit()
+            self._invalidate_contact(user_id, first_name, None, phone_number)
             print(f"User {user_id} updated successfully")
         except Exception as e:
             print(f"Error updating user: {e}")
             self.conn.rollback()
 
+    @pooled
     def query_all_contacts(self):
         
-        query = """
-        SELECT u.user_id, u.first_name, u.last_name, u.email, 
-               p.phone_number, p.phone_type
-        FROM users u
-        LEFT JOIN phones p ON u.user_id = p.user_id
-        ORDER BY u.last_name, u.first_name;
-        """
-        self.cursor.execute(query)
+        self.cursor.execute(ALL_CONTACTS_QUERY)
         return self.cursor.fetchall()
 
+    def iter_all_contacts(self, itersize=2000):
+        """Yield all contacts from a server-side cursor, itersize rows per round-trip.
+
+        The connection stays borrowed until the generator is exhausted or closed;
+        don't commit on it while iterating (the cursor is not WITH HOLD).
+        """
+        with self.session() as conn:
+            with conn.cursor(name=f"contacts_stream_{next(_stream_ids)}") as cursor:
+                cursor.itersize = itersize
+                cursor.execute(ALL_CONTACTS_QUERY)
+                for row in cursor:
+                    yield row
+
     def query_by_name(self, name):
         
+        hit, contacts = self.cache.get(('name', name))
+        if not hit:
+            contacts = self._query_by_name_db(name)
+            self.cache.put(('name', name), contacts, {row[0] for row in contacts})
+        return list(contacts)
+
+    @pooled
+    def _query_by_name_db(self, name):
+        self.execute_prepared('query_by_name', (f'%{name}%', f'%{name}%'))
+        return self.cursor.fetchall()
+
+    @pooled
+    def search_similar(self, text, limit=20):
+        """Fuzzy search by name, email or phone, best matches first"""
         query = """
+        WITH matches AS (
+            SELECT u.user_id,
+                   GREATEST(word_similarity(%(text)s, u.first_name),
+                            word_similarity(%(text)s, u.last_name),
+                            COALESCE(word_similarity(%(text)s, u.email), 0)) AS score
+            FROM users u
+            WHERE %(text)s <%% u.first_name
+               OR %(text)s <%% u.last_name
+               OR %(text)s <%% u.email
+            UNION ALL
+            SELECT p.user_id, word_similarity(%(text)s, p.phone_number)
+            FROM phones p
+            WHERE %(text)s <%% p.phone_number
+        ),
+        best AS (
+            SELECT user_id, MAX(score) AS score
+            FROM matches
+            GROUP BY user_id
+            ORDER BY score DESC
+            LIMIT %(limit)s
+        )
         SELECT u.user_id, u.first_name, u.last_name, u.email, 
                p.phone_number, p.phone_type
-        FROM users u
+        FROM best b
+        JOIN users u ON u.user_id = b.user_id
         LEFT JOIN phones p ON u.user_id = p.user_id
-        WHERE u.first_name ILIKE %s OR u.last_name ILIKE %s;
+        ORDER BY b.score DESC, u.last_name, u.first_name;
         """
-        self.cursor.execute(query, (f'%{name}%', f'%{name}%'))
+        self.cursor.execute(query, {'text': text, 'limit': limit})
         return self.cursor.fetchall()
 
-    def query_by_phone(self, phone):
-        
-        query = """
-        SELECT u.user_id, u.first_name, u.last_name, u.email, 
-               p.phone_number, p.phone_type
-        FROM users u
-        JOIN phones p ON u.user_id = p.user_id
-        WHERE p.phone_number LIKE %s;
+    def query_by_phone(self, phone, match='suffix'):
+        """Find contacts by phone: 'exact', 'suffix' (last N digits) or 'contains'"""
+        hit, contacts = self.cache.get(('phone', match, phone))
+        if not hit:
+            contacts = self._query_by_phone_db(phone, match)
+            self.cache.put(('phone', match, phone), contacts, {row[0] for row in contacts})
+        return list(contacts)
+
+    def lookup_many(self, phones, chunk_size=5000):
+        """Resolve many phone numbers exactly -> {input number: [contacts]}.
+
+        `phones` may be any iterable (a generator too). Each chunk is one
+        round-trip: the normalized numbers are sent as a single array and
+        joined against phones.phone_digits (index lookups, no LIKE).
+        Results share the cache with query_by_phone(..., 'exact').
         """
-        self.cursor.execute(query, (f'%{phone}%',))
+        phones = list(phones)
+        results = {}
+        pending = {}
+        for phone in phones:
+            if phone in results or phone in pending:
+                continue
+            hit, contacts = self.cache.get(('phone', 'exact', phone))
+            if hit:
+                results[phone] = list(contacts)
+            elif normalize_phone(phone) is None:
+                results[phone] = []
+            else:
+                pending[phone] = normalize_phone(phone)
+
+        inputs = list(pending)
+        for start in range(0, len(inputs), chunk_size):
+            chunk = inputs[start:start + chunk_size]
+            found = self._lookup_digits_db(chunk, [pending[phone] for phone in chunk])
+            for phone in chunk:
+                contacts = found.get(phone, [])
+                self.cache.put(('phone', 'exact', phone), contacts, {row[0] for row in contacts})
+                results[phone] = list(contacts)
+        return {phone: results[phone] for phone in phones}
+
+    @pooled
+    def _lookup_digits_db(self, inputs, digits):
+        self.execute_prepared('lookup_digits', (inputs, digits))
+        found = {}
+        for row in self.cursor.fetchall():
+            found.setdefault(row[0], []).append(row[1:])
+        return found
+
+    @pooled
+    def _query_by_phone_db(self, phone, match):
+        if match == 'exact':
+            param = normalize_phone(phone)
+        elif match == 'suffix':
+            digits = ''.join(ch for ch in phone if ch.isdigit())
+            if not digits:
+                return []
+            param = digits[::-1] + '%'
+        else:
+            match, param = 'contains', f'%{phone}%'
+        self.execute_prepared(f'query_by_phone_{match}', (param,))
         return self.cursor.fetchall()
 
+    @pooled
     def delete_by_user_id(self, user_id):
         
         try:
-            delete_query = "DELETE FROM users WHERE user_id = %s;"
-            self.cursor.execute(delete_query, (user_id,))
+            self.execute_prepared('delete_user', (user_id,))
             self.conn.commit()
+            self._invalidate_contact(user_id)
             print(f"User {user_id} deleted successfully")
         except Exception as e:
             print(f"Error deleting user: {e}")
             self.conn.rollback()
 
+    @pooled
     def delete_by_phone(self, phone_number):
         
         try:
             
-            find_query = "SELECT user_id FROM phones WHERE phone_number = %s;"
-            self.cursor.execute(find_query, (phone_number,))
+            self.execute_prepared('find_user_by_phone', (phone_number,))
             result = self.cursor.fetchone()
             
             if result:
                 user_id = result[0]
-                delete_query = "DELETE FROM users WHERE user_id = %s;"
-                self.cursor.execute(delete_query, (user_id,))
+                self.execute_prepared('delete_user', (user_id,))
                 self.conn.commit()
+                self._invalidate_contact(user_id)
                 print(f"Contact with phone {phone_number} deleted successfully")
             else:
                 print("Phone number not found")
@@ -203,28 +892,62 @@ class PhoneBook:
             print(f"Error deleting by phone: {e}")
             self.conn.rollback()
 
+    def _invalidate_contact(self, user_id=None, first_name=None, last_name=None,
+                            phone_number=None):
+        """Drop cached lookups that contain user_id or would now match the new values"""
+        if user_id is not None:
+            self.cache.invalidate_user(user_id)
+        names = [name.lower() for name in (first_name, last_name) if name]
+        digits = normalize_phone(phone_number) if phone_number else None
+
+        def affected(key):
+            if key[0] == 'name':
+                term = key[1].lower()
+                # ILIKE wildcards in the search term: be conservative
+                return bool(names) and ('%' in term or '_' in term
+                                        or any(term in name for name in names))
+            if phone_number is None:
+                return False
+            match, term = key[1], key[2]
+            if match == 'exact':
+                return normalize_phone(term) == digits
+            if match == 'suffix':
+                term_digits = ''.join(ch for ch in term if ch.isdigit())
+                return bool(term_digits) and (digits or '').endswith(term_digits)
+            return '%' in term or '_' in term or term in phone_number
+
+        if names or phone_number:
+            self.cache.invalidate_where(affected)
+
+    def cache_stats(self):
+        """Hit/miss/eviction counters of the lookup cache"""
+        return self.cache.stats()
+
     def display_contacts(self, contacts):
-        
-        if not contacts:
-            print("No contacts found")
-            return
-        
-        print("\n" + "="*80)
-        print(f"{'ID':<5} {'Name':<25} {'Email':<25} {'Phone':<15} {'Type':<10}")
-        print("="*80)
+        """Print contacts from a list or a generator, one row at a time"""
+        shown = 0
         for contact in contacts:
+            if shown == 0:
+                print("\n" + "="*80)
+                print(f"{'ID':<5} {'Name':<25} {'Email':<25} {'Phone':<15} {'Type':<10}")
+                print("="*80)
+            shown += 1
             user_id, first, last, email, phone, phone_type = contact
             name = f"{first} {last}"
             email = email or "N/A"
             phone = phone or "N/A"
             phone_type = phone_type or "N/A"
             print(f"{user_id:<5} {name:<25} {email:<25} {phone:<15} {phone_type:<10}")
+        
+        if shown == 0:
+            print("No contacts found")
+            return
         print("="*80 + "\n")
 
     def close(self):
         
-        self.cursor.close()
-        self.conn.close()
+        if self._owns_pool:
+            release_pool(self.pool)
         print("Database connection closed")
 
 
@@ -239,6 +962,8 @@ def main():
     
     
     phonebook.create_tables()
+    phonebook.create_search_indexes()
+    phonebook.migrate_phone_digits()
     
     while True:
         print("\n=== PhoneBook Menu ===")
@@ -250,7 +975,8 @@ def main():
         print("6. Search by phone")
         print("7. Delete contact by ID")
         print("8. Delete contact by phone")
-        print("9. Exit")
+        print("9. Export contacts to file")
+        print("10. Exit")
         
         choice = input("\nEnter your choice: ")
         
@@ -259,7 +985,16 @@ def main():
         
         elif choice == '2':
             csv_file = input("Enter CSV file path: ")
-            phonebook.insert_from_csv(csv_file)
+            mode = input("Import mode - (r)ow by row, (b)ulk COPY, (c)hunked/resumable [r]: ")
+            if mode.lower() == 'b' and csv_file.endswith(('.jsonl', '.jsonl.gz')):
+                phonebook.bulk_import_jsonl(csv_file)
+            elif mode.lower() == 'b':
+                phonebook.bulk_import_csv(csv_file)
+            elif mode.lower() == 'c':
+                batch_size = int(input("Batch size [10000]: ") or 10000)
+                phonebook.import_csv_chunked(csv_file, batch_size)
+            else:
+                phonebook.insert_from_csv(csv_file)
         
         elif choice == '3':
             user_id = int(input("Enter user ID to update: "))
@@ -272,17 +1007,23 @@ def main():
             )
         
         elif choice == '4':
-            contacts = phonebook.query_all_contacts()
+            contacts = phonebook.iter_all_contacts()
             phonebook.display_contacts(contacts)
         
         elif choice == '5':
             name = input("Enter name to search: ")
-            contacts = phonebook.query_by_name(name)
+            fuzzy = input("Fuzzy (typo-tolerant) search? (y/n) [n]: ")
+            if fuzzy.lower() == 'y':
+                contacts = phonebook.search_similar(name)
+            else:
+                contacts = phonebook.query_by_name(name)
             phonebook.display_contacts(contacts)
         
         elif choice == '6':
             phone = input("Enter phone to search: ")
-            contacts = phonebook.query_by_phone(phone)
+            match = input("Match - (s)uffix/last digits, (e)xact, (c)ontains [s]: ").lower()
+            match = {'e': 'exact', 'c': 'contains'}.get(match, 'suffix')
+            contacts = phonebook.query_by_phone(phone, match)
             phonebook.display_contacts(contacts)
         
         elif choice == '7':
@@ -294,6 +1035,11 @@ def main():
             phonebook.delete_by_phone(phone)
         
         elif choice == '9':
+            path = input("Enter output file path (.gz to compress): ")
+            fmt = input("Format (csv/jsonl) [csv]: ") or 'csv'
+            phonebook.export_contacts(path, fmt)
+        
+        elif choice == '10':
             phonebook.close()
             print("Goodbye!")
             break
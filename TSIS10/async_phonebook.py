@@ -0,0 +1,138 @@
+import asyncio
+
+import asyncpg
+
+from Phonebook import normalize_phone
+
+CONTACT_COLUMNS = """
+u.user_id, u.first_name, u.last_name, u.email, p.phone_number, p.phone_type
+"""
+
+
+class AsyncPhoneBook:
+    """asyncio counterpart of PhoneBook backed by an asyncpg connection pool.
+
+    Create it with `await AsyncPhoneBook.create(...)`. Every call borrows a
+    pooled connection only for its own statement, so many concurrent lookups
+    share a handful of connections. Rows are returned as plain tuples, the
+    same shape PhoneBook returns.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    @classmethod
+    async def create(cls, dbname, user, password, host='localhost', port='5432',
+                     min_size=2, max_size=10):
+        try:
+            pool = await asyncpg.create_pool(
+                database=dbname,
+                user=user,
+                password=password,
+                host=host,
+                port=int(port),
+                min_size=min_size,
+                max_size=max_size
+            )
+            print("Async database pool established successfully")
+            return cls(pool)
+        except Exception as e:
+            print(f"Error connecting to database: {e}")
+            raise
+
+    async def _fetch(self, query, *args):
+        async with self.pool.acquire() as conn:
+            return [tuple(row) for row in await conn.fetch(query, *args)]
+
+    async def query_by_name(self, name):
+        query = f"""
+        SELECT {CONTACT_COLUMNS}
+        FROM users u
+        LEFT JOIN phones p ON u.user_id = p.user_id
+        WHERE u.first_name ILIKE $1 OR u.last_name ILIKE $1;
+        """
+        return await self._fetch(query, f'%{name}%')
+
+    async def query_by_phone(self, phone, match='suffix'):
+        """Same match modes as PhoneBook.query_by_phone"""
+        if match == 'exact':
+            condition, param = "p.phone_digits = $1", normalize_phone(phone)
+        elif match == 'suffix':
+            digits = ''.join(ch for ch in phone if ch.isdigit())
+            if not digits:
+                return []
+            condition, param = "reverse(p.phone_digits) LIKE $1", digits[::-1] + '%'
+        else:
+            condition, param = "p.phone_number LIKE $1", f'%{phone}%'
+        query = f"""
+        SELECT {CONTACT_COLUMNS}
+        FROM users u
+        JOIN phones p ON u.user_id = p.user_id
+        WHERE {condition};
+        """
+        return await self._fetch(query, param)
+
+    async def query_many(self, lookups):
+        """Run many (method_name, arg) lookups concurrently, results in input order"""
+        return await asyncio.gather(*(getattr(self, method)(arg) for method, arg in lookups))
+
+    async def insert_user(self, first_name, last_name, email, phone_number, phone_type='mobile'):
+        """Insert one contact with its primary phone, return the new user_id"""
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    user_id = await conn.fetchval("""
+                    INSERT INTO users (first_name, last_name, email)
+                    VALUES ($1, $2, $3) RETURNING user_id;
+                    """, first_name, last_name, email)
+                    await conn.execute("""
+                    INSERT INTO phones (user_id, phone_number, phone_type, is_primary)
+                    VALUES ($1, $2, $3, TRUE);
+                    """, user_id, phone_number, phone_type)
+            return user_id
+        except Exception as e:
+            print(f"Error inserting user: {e}")
+            return None
+
+    async def update_user(self, user_id, first_name=None, phone_number=None):
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    if first_name:
+                        await conn.execute(
+                            "UPDATE users SET first_name = $1 WHERE user_id = $2;",
+                            first_name, user_id)
+                    if phone_number:
+                        await conn.execute("""
+                        UPDATE phones SET phone_number = $1
+                        WHERE user_id = $2 AND is_primary = TRUE;
+                        """, phone_number, user_id)
+            return True
+        except Exception as e:
+            print(f"Error updating user: {e}")
+            return False
+
+    async def delete_by_user_id(self, user_id):
+        try:
+            async with self.pool.acquire() as conn:
+                status = await conn.execute("DELETE FROM users WHERE user_id = $1;", user_id)
+            return status != 'DELETE 0'
+        except Exception as e:
+            print(f"Error deleting user: {e}")
+            return False
+
+    async def delete_by_phone(self, phone_number):
+        try:
+            async with self.pool.acquire() as conn:
+                status = await conn.execute("""
+                DELETE FROM users
+                WHERE user_id = (SELECT user_id FROM phones WHERE phone_number = $1 LIMIT 1);
+                """, phone_number)
+            return status != 'DELETE 0'
+        except Exception as e:
+            print(f"Error deleting by phone: {e}")
+            return False
+
+    async def close(self):
+        await self.pool.close()
+        print("Async database pool closed")
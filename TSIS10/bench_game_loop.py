@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+
+import pygame
+
+from game_loop import FixedStepLoop
+
+# How FixedStepLoop copes with load: logic at 100 ticks/s, drawing at 60 fps,
+# with either phase made artificially slow. A slow render should merge ticks
+# into fewer frames and lose none; a slow update cannot keep up, so the loop
+# drops ticks instead of falling further behind.
+# Usage: python bench_game_loop.py [seconds]   (SDL_VIDEODRIVER=dummy works)
+SECONDS = 2.0
+TICK_RATE = 100
+FPS = 60
+
+CASES = [
+    ('steady', 0.0, 0.0),
+    ('slow render (40 ms)', 0.0, 0.04),
+    ('slow update (20 ms/tick)', 0.02, 0.0),
+]
+
+
+def run_case(seconds, update_cost, render_cost):
+    loop = FixedStepLoop(TICK_RATE, fps=FPS, show_stats=False)
+    end = time.perf_counter() + seconds
+    loop.run(lambda: time.perf_counter() < end,
+             lambda: time.sleep(update_cost),
+             lambda alpha: time.sleep(render_cost))
+    return loop
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else SECONDS
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    print(f"{TICK_RATE} ticks/s, {FPS} fps, {seconds:g} s per case "
+          f"(about {TICK_RATE * seconds:.0f} ticks due)")
+    for case, update_cost, render_cost in CASES:
+        print(f"\n{case}")
+        run_case(seconds, update_cost, render_cost).print_stats()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import random
+import sys
+
+from bench_phonebook import measure, report
+from snakebd import SnakeGameDB
+
+# Run against a scratch database: seeding TRUNCATEs users/user_scores.
+# Usage: python bench_leaderboard.py [dbname] [players]
+BENCH_DB = 'snake_bench'
+PLAYERS = 1_000_000
+QUERIES_PER_CASE = 200
+
+
+def seed_players(db, players):
+    """Fill users/user_scores with `players` synthetic players, server side"""
+    db.cursor.execute("TRUNCATE users RESTART IDENTITY CASCADE;")
+    db.cursor.execute("""
+    INSERT INTO users (username)
+    SELECT 'player' || i FROM generate_series(1, %s) AS i;
+    """, (players,))
+    # Row triggers would update the histogram once per row; recount instead
+    db.cursor.execute("ALTER TABLE user_scores DISABLE TRIGGER USER;")
+    db.cursor.execute("""
+    INSERT INTO user_scores (user_id, level, score, high_score)
+    SELECT user_id, 1 + (random() * 9)::int, 0, 10 * (random() * random() * 500)::int
+    FROM users;
+    """)
+    db.cursor.execute("ALTER TABLE user_scores ENABLE TRIGGER USER;")
+    db.cursor.execute("ANALYZE users; ANALYZE user_scores;")
+    db.conn.commit()
+    db.rebuild_leaderboard()
+
+
+def full_scan_rank(db, user_id):
+    """What a rank costs without the leaderboard: a window over every player"""
+    db.cursor.execute("""
+    SELECT rank FROM (
+        SELECT user_id, RANK() OVER (ORDER BY high_score DESC) AS rank
+        FROM user_scores
+    ) ranked WHERE user_id = %s;
+    """, (user_id,))
+    return db.cursor.fetchone()
+
+
+def main():
+    dbname = sys.argv[1] if len(sys.argv) > 1 else BENCH_DB
+    players = int(sys.argv[2]) if len(sys.argv) > 2 else PLAYERS
+
+    db = SnakeGameDB(dbname=dbname, user='postgres', password='your_password')
+    db.create_tables()
+    try:
+        with db.session():
+            print(f"\nSeeding {players:,} players...")
+            seed_players(db, players)
+
+            rng = random.Random(players)
+            user_ids = [rng.randint(1, players) for _ in range(QUERIES_PER_CASE)]
+            report(players, 'top_players(10)', *measure(lambda _: db.top_players(10), user_ids))
+            report(players, 'player_rank', *measure(db.player_rank, user_ids))
+            report(players, 'players_around(5)', *measure(db.players_around, user_ids))
+            report(players, 'rank via full window scan',
+                   *measure(lambda user_id: full_scan_rank(db, user_id), user_ids[:20]))
+
+            # Incremental maintenance: raising scores keeps ranks exact
+            report(players, 'update_high_score', *measure(
+                lambda user_id: db.update_high_score(user_id, rng.randint(0, 5000)), user_ids))
+            user_id = user_ids[0]
+            assert db.player_rank(user_id)[0] == full_scan_rank(db, user_id)[0]
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import asyncio
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from async_phonebook import AsyncPhoneBook
+from Phonebook import CONTACT_LOOKUP, PhoneBook
+
+# Run against a scratch database: every size step TRUNCATEs users/phones.
+# Usage: python bench_phonebook.py [dbname] [size ...]
+BENCH_DB = 'phonebook_bench'
+SIZES = [10_000, 1_000_000, 10_000_000]
+QUERIES_PER_CASE = 200
+CONCURRENT_LOOKUPS = 5000
+WORKERS = 10
+
+FIRST_NAMES = ['Almas', 'Aidar', 'Aigul', 'Bakyt', 'Dana', 'Erlan', 'Gulnara',
+               'Kairat', 'Madina', 'Nurlan', 'Saule', 'Timur', 'Zhanna', 'Arman']
+LAST_NAMES = ['Turysbekov', 'Nurlanov', 'Suleimenova', 'Tolegenov', 'Abenova',
+              'Kassymov', 'Zhumabayev', 'Iskakova', 'Serikbayev', 'Omarova']
+
+
+# pb.cursor/pb.conn only exist inside a session: every helper that uses them
+# borrows one itself (sessions are re-entrant, main() keeps one open)
+
+def seed_contacts(pb, size):
+    """Fill users/phones with `size` synthetic contacts, server side"""
+    with pb.session():
+        pb.cursor.execute("TRUNCATE users RESTART IDENTITY CASCADE;")
+        pb.cursor.execute("""
+        INSERT INTO users (first_name, last_name, email)
+        SELECT (%(first)s::text[])[1 + i %% cardinality(%(first)s::text[])] || (i %% 997),
+               (%(last)s::text[])[1 + i %% cardinality(%(last)s::text[])] || (i %% 1009),
+               'user' || i || '@mail.com'
+        FROM generate_series(1, %(size)s) AS i;
+        """, {'first': FIRST_NAMES, 'last': LAST_NAMES, 'size': size})
+        pb.cursor.execute("""
+        INSERT INTO phones (user_id, phone_number, phone_type, is_primary)
+        SELECT user_id, '+7' || (7000000000 + user_id::bigint * 7919 % 999999999), 'mobile', TRUE
+        FROM users;
+        """)
+        pb.cursor.execute("ANALYZE users; ANALYZE phones;")
+        pb.conn.commit()
+
+
+def drop_search_indexes(pb):
+    with pb.session():
+        for index in ('idx_users_first_name_trgm', 'idx_users_last_name_trgm',
+                      'idx_users_email_trgm', 'idx_phones_number_trgm'):
+            pb.cursor.execute(f"DROP INDEX IF EXISTS {index};")
+        pb.conn.commit()
+
+
+def measure(func, terms):
+    """Run func once per term, return (p50, p99) latency in milliseconds"""
+    timings = []
+    for term in terms:
+        start = time.perf_counter()
+        func(term)
+        timings.append((time.perf_counter() - start) * 1000)
+    cuts = statistics.quantiles(timings, n=100)
+    return cuts[49], cuts[98]
+
+
+def report(size, case, p50, p99):
+    print(f"{size:>11,} | {case:<32} | p50 {p50:9.2f} ms | p99 {p99:9.2f} ms")
+
+
+def bench_search(pb, size):
+    """ILIKE search without/with trigram indexes and ranked similarity search"""
+    rng = random.Random(size)
+    terms = [rng.choice(FIRST_NAMES + LAST_NAMES)[:rng.randint(3, 6)]
+             for _ in range(QUERIES_PER_CASE)]
+
+    drop_search_indexes(pb)
+    report(size, 'query_by_name (seq scan)', *measure(pb.query_by_name, terms))
+    pb.create_search_indexes()
+    with pb.session():
+        pb.cursor.execute("ANALYZE users; ANALYZE phones;")
+        pb.conn.commit()
+    report(size, 'query_by_name (trigram GIN)', *measure(pb.query_by_name, terms))
+    report(size, 'search_similar (trigram GIN)', *measure(pb.search_similar, terms))
+
+
+def bench_prepared(pb, size):
+    """Per-call latency of the exact phone lookup: plain execute vs PREPARE/EXECUTE"""
+    rng = random.Random(size)
+    pb.cursor.execute("SELECT phone_digits FROM phones ORDER BY random() LIMIT 1000;")
+    digits = [row[0] for row in pb.cursor.fetchall()]
+    terms = [rng.choice(digits) for _ in range(QUERIES_PER_CASE * 10)]
+    query = CONTACT_LOOKUP.format("p.phone_digits = %s")
+
+    def plain(term):
+        pb.cursor.execute(query, (term,))
+        pb.cursor.fetchall()
+
+    def prepared(term):
+        pb.execute_prepared('query_by_phone_exact', (term,))
+        pb.cursor.fetchall()
+
+    report(size, 'exact phone (cursor.execute)', *measure(plain, terms))
+    report(size, 'exact phone (prepared)', *measure(prepared, terms))
+
+
+def bench_concurrency(pb, size):
+    """Requests/sec for suffix phone lookups: threaded sync PhoneBook vs AsyncPhoneBook"""
+    rng = random.Random(size)
+    with pb.session():
+        pb.cursor.execute("SELECT phone_number FROM phones ORDER BY random() LIMIT 1000;")
+        numbers = [row[0][-4:] for row in pb.cursor.fetchall()]
+    lookups = [rng.choice(numbers) for _ in range(CONCURRENT_LOOKUPS)]
+
+    # Worker threads borrow their own pooled connections
+    start = time.perf_counter()
+    with ThreadPoolExecutor(WORKERS) as executor:
+        list(executor.map(pb.query_by_phone, lookups))
+    elapsed = time.perf_counter() - start
+    print(f"{size:>11,} | {'threaded sync, ' + str(WORKERS) + ' workers':<32} | "
+          f"{len(lookups) / elapsed:9.0f} req/s")
+
+    async def run_async():
+        apb = await AsyncPhoneBook.create(pb.pool.connect_kwargs['dbname'], 'postgres',
+                                          'MyNewPassword123!', max_size=WORKERS)
+        try:
+            start = time.perf_counter()
+            await apb.query_many([('query_by_phone', number) for number in lookups])
+            return time.perf_counter() - start
+        finally:
+            await apb.close()
+
+    elapsed = asyncio.run(run_async())
+    print(f"{size:>11,} | {'asyncio, ' + str(WORKERS) + ' connections':<32} | "
+          f"{len(lookups) / elapsed:9.0f} req/s")
+
+
+def main():
+    dbname = sys.argv[1] if len(sys.argv) > 1 else BENCH_DB
+    sizes = [int(size) for size in sys.argv[2:]] or SIZES
+
+    # cache_size=0: every lookup must reach the database
+    pb = PhoneBook(dbname=dbname, user='postgres', password='your_password', cache_size=0)
+    pb.create_tables()
+    try:
+        for size in sizes:
+            print(f"\nSeeding {size:,} contacts...")
+            with pb.session():
+                seed_contacts(pb, size)
+                bench_search(pb, size)
+                pb.migrate_phone_digits()
+                bench_prepared(pb, size)
+            bench_concurrency(pb, size)
+    finally:
+        pb.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import os
+import statistics
+import sys
+import time
+
+import pygame
+
+from snake_render import SnakeRenderer
+from snake_sim import SnakeSim
+
+# Frame time of SnakeRenderer against the previous full redraw with a
+# 2000-segment snake. The snake follows a Hamiltonian cycle of a 60x60 board
+# so it never dies; the extra bottom row holds food it never reaches.
+# Usage: python bench_render.py [frames]   (SDL_VIDEODRIVER=dummy works)
+SIZE = 60
+CELL = 10
+LENGTH = 2000
+FRAMES = 2000
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+GRAY = (128, 128, 128)
+
+
+def cycle_cells(size):
+    """Row 0 left to right, serpentine over the rest, back up column 0"""
+    cells = [(x, 0) for x in range(size)]
+    for y in range(1, size):
+        xs = range(size - 1, 0, -1) if y % 2 else range(1, size)
+        cells.extend((x, y) for x in xs)
+    cells.extend((0, y) for y in range(size - 1, 0, -1))
+    return cells
+
+
+def long_snake():
+    cells = cycle_cells(SIZE)
+    following = {cell: (nxt[0] - cell[0], nxt[1] - cell[1])
+                 for cell, nxt in zip(cells, cells[1:] + cells[:1])}
+    sim = SnakeSim(1, seed=0, width=SIZE, height=SIZE + 1)
+    sim.load_state({
+        'snake': cells[LENGTH - 1::-1],
+        'direction': following[cells[LENGTH - 2]],
+        'food': (SIZE // 2, SIZE),
+        'score': 0,
+        'level': 1
+    })
+    return sim, following
+
+
+def full_redraw(screen, font, sim):
+    """The previous SnakeGame.draw: everything, every frame"""
+    screen.fill(BLACK)
+    for wall in sim.level.walls:
+        pygame.draw.rect(screen, GRAY, pygame.Rect(wall[0] * CELL, wall[1] * CELL, CELL, CELL))
+    for segment in sim.snake:
+        pygame.draw.rect(screen, GREEN, pygame.Rect(segment[0] * CELL, segment[1] * CELL,
+                                                    CELL - 2, CELL - 2))
+    if sim.food:
+        pygame.draw.rect(screen, RED, pygame.Rect(sim.food[0] * CELL, sim.food[1] * CELL,
+                                                  CELL - 2, CELL - 2))
+    text = font.render(f"Score: {sim.score} | Level: {sim.current_level} | High: 0", True, WHITE)
+    screen.blit(text, (10, 10))
+    pygame.display.flip()
+
+
+def frame_times(draw, frames):
+    """Step a fresh long snake `frames` times, return draw() times in ms"""
+    sim, following = long_snake()
+    timings = []
+    for _ in range(frames):
+        sim.turn(following[sim.snake[0]])
+        sim.step()
+        start = time.perf_counter()
+        draw(sim)
+        timings.append((time.perf_counter() - start) * 1000)
+    assert not sim.game_over and len(sim.snake) == LENGTH
+    return timings
+
+
+def report(case, timings):
+    cuts = statistics.quantiles(timings, n=100)
+    print(f"{case:<22} | p50 {cuts[49]:>7.3f} ms | p99 {cuts[98]:>7.3f} ms | "
+          f"{1000 / statistics.mean(timings):>8,.0f} frame/s")
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    screen = pygame.display.set_mode((SIZE * CELL, (SIZE + 1) * CELL))
+    font = pygame.font.Font(None, 24)
+    print(f"{LENGTH}-segment snake, {SIZE}x{SIZE} board, {frames} frames")
+    report('full redraw', frame_times(lambda sim: full_redraw(screen, font, sim), frames))
+
+    renderer = SnakeRenderer(screen, CELL, BLACK, GRAY, GREEN, RED)
+    hud = lambda sim: (font, f"Score: {sim.score} | Level: {sim.current_level} | High: 0", WHITE)
+    report('dirty rects', frame_times(lambda sim: renderer.draw(sim, hud(sim)), frames))
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import sys
+import time
+
+from bench_render import cycle_cells
+from replay import encode_replay, start_replay, verify_replay
+from snake_sim import SnakeSim
+
+# Replay size and verification time for long games: a 2000-segment snake
+# resumed from a snapshot, following a Hamiltonian cycle of a 60x60 board
+# (two turns per row). Usage: python bench_replay.py [ticks ...]
+SIZE = 60
+LENGTH = 2000
+TICKS = [10_000, 100_000, 1_000_000]
+
+
+def record(ticks):
+    """Play `ticks` ticks while recording, return (replay bytes, final score,
+    the start state the game was resumed from)"""
+    cells = cycle_cells(SIZE)
+    following = {cell: (nxt[0] - cell[0], nxt[1] - cell[1])
+                 for cell, nxt in zip(cells, cells[1:] + cells[:1])}
+    sim = SnakeSim(1, width=SIZE, height=SIZE + 1)
+    replay = start_replay(sim, 1)
+    state = {
+        'snake': cells[LENGTH - 1::-1],
+        'direction': following[cells[LENGTH - 2]],
+        'food': (SIZE // 2, SIZE),
+        'score': 0,
+        'level': 1
+    }
+    sim.load_state(state)
+    replay['start'] = state
+    for _ in range(ticks):
+        sim.turn(following[sim.snake[0]])
+        sim.step()
+    assert not sim.game_over
+    replay['ticks'], replay['score'] = sim.ticks, sim.score
+    return encode_replay(replay), sim.score, state
+
+
+def main():
+    counts = [int(ticks) for ticks in sys.argv[1:]] or TICKS
+    print(f"{'ticks':>10} | {'replay':>12} | {'verify':>10} | {'re-simulated':>16}")
+    for ticks in counts:
+        data, score, state = record(ticks)
+        start = time.perf_counter()
+        assert verify_replay(data, score, state)
+        elapsed = time.perf_counter() - start
+        print(f"{ticks:>10,} | {len(data):>8,} B  | {elapsed * 1000:>7.1f} ms | "
+              f"{ticks / elapsed:>10,.0f} tick/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import sys
+import time
+
+from snake_sim import EMPTY, RIGHT, SnakeSim
+
+# Ticks per second of SnakeSim against the old list-based rules, with the
+# longest snake that can circle one row forever (level 1 wraps around), and
+# food placement cost as the board fills up.
+# Usage: python bench_snake_sim.py [grid_size ...]
+SIZES = [30, 100, 300, 1000]
+TICKS = 200_000
+FILLS = [0.5, 0.9, 0.99, 0.999]
+PLACEMENTS = 2000
+
+
+def list_ticks(snake, food, width, height, ticks):
+    """The previous move_snake: list membership tests and insert(0, ...)"""
+    walls = []
+    direction = RIGHT
+    for _ in range(ticks):
+        head_x, head_y = snake[0]
+        new_head = (head_x + direction[0], head_y + direction[1])
+        if new_head in walls:
+            return
+        new_head = (new_head[0] % width, new_head[1] % height)
+        if new_head in snake:
+            return
+        snake.insert(0, new_head)
+        if new_head != food:
+            snake.pop()
+
+
+def circling_sim(size):
+    sim = SnakeSim(1, seed=0, width=size, height=size)
+    sim.load_state({
+        'snake': [(x, 0) for x in range(size - 2, -1, -1)],
+        'direction': RIGHT,
+        'food': (0, size // 2),
+        'score': 0,
+        'level': 1
+    })
+    return sim
+
+
+def rejection_food(sim):
+    """The previous generate_food: probe random cells until one is free"""
+    probes = 0
+    while True:
+        probes += 1
+        x = sim.rng.randint(0, sim.width - 1)
+        y = sim.rng.randint(0, sim.height - 1)
+        if sim.grid[y * sim.width + x] == EMPTY:
+            return probes
+
+
+def bench_food(size):
+    """Microseconds per food placement with a body covering part of the board"""
+    print(f"\n{'grid':>11} | {'filled':>7} | {'free-cell set':>16} | {'rejection':>16}")
+    sim = SnakeSim(1, seed=0, width=size, height=size)
+    # Boustrophedon body: every cell is a neighbour of the previous one
+    path = [(x if y % 2 == 0 else size - 1 - x, y) for y in range(size) for x in range(size)]
+    for fill in FILLS:
+        sim.set_body(path[:int(len(path) * fill)])
+        start = time.perf_counter()
+        for _ in range(PLACEMENTS):
+            sim.generate_food()
+        free_us = (time.perf_counter() - start) / PLACEMENTS * 1e6
+        start = time.perf_counter()
+        probes = sum(rejection_food(sim) for _ in range(PLACEMENTS))
+        rejection_us = (time.perf_counter() - start) / PLACEMENTS * 1e6
+        print(f"{size:>5}x{size:<5} | {fill:>7.1%} | {free_us:>13.2f} us | "
+              f"{rejection_us:>13.2f} us  ({probes / PLACEMENTS:.0f} probes)")
+
+
+def rate(func, ticks):
+    start = time.perf_counter()
+    func()
+    return ticks / (time.perf_counter() - start)
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or SIZES
+    print(f"{'grid':>11} | {'snake':>6} | {'SnakeSim':>14} | {'list-based':>14}")
+    for size in sizes:
+        sim = circling_sim(size)
+        length = len(sim.snake)
+
+        def run_sim():
+            step = sim.step
+            for _ in range(TICKS):
+                step()
+
+        sim_rate = rate(run_sim, TICKS)
+        assert not sim.game_over
+        # The list version is O(length) per tick: fewer ticks keep it bounded
+        list_count = max(1000, TICKS * 30 // size)
+        snake = list(circling_sim(size).snake)
+        list_rate = rate(lambda: list_ticks(snake, (0, size // 2), size, size, list_count),
+                         list_count)
+        print(f"{size:>5}x{size:<5} | {length:>6} | {sim_rate:>8,.0f} tick/s | "
+              f"{list_rate:>8,.0f} tick/s")
+
+    for size in sizes:
+        bench_food(size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import json
+import random
+import sys
+import timeit
+
+from game_state import decode_state, encode_state
+
+# Encode/decode cost and size of a save: legacy JSON vs binary snapshots.
+# Usage: python bench_snapshots.py [length ...]
+GRID_WIDTH = GRID_HEIGHT = 30
+LENGTHS = [1, 10, 100, 500, 2000]
+
+
+def random_state(length, rng, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """A body of `length` neighbouring cells (a random walk that may wrap)"""
+    x, y = rng.randrange(width), rng.randrange(height)
+    snake = [(x, y)]
+    for _ in range(length - 1):
+        dx, dy = rng.choice([(0, -1), (0, 1), (-1, 0), (1, 0)])
+        x, y = (x + dx) % width, (y + dy) % height
+        snake.append((x, y))
+    return {
+        'snake': snake,
+        'direction': (1, 0),
+        'food': (rng.randrange(width), rng.randrange(height)),
+        'score': length * 10,
+        'level': 1
+    }
+
+
+def time_per_call(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    lengths = [int(length) for length in sys.argv[1:]] or LENGTHS
+    rng = random.Random(0)
+    print(f"{'length':>7} | {'format':<7} | {'bytes':>7} | {'encode':>10} | {'decode':>10}")
+    for length in lengths:
+        # Larger boards so long bodies fit without overlapping cells mattering
+        side = max(GRID_WIDTH, int(length ** 0.5) + 1)
+        state = random_state(length, rng, side, side)
+        number = max(10, 20000 // length)
+
+        legacy = json.dumps(state)
+        snapshot = encode_state(state, side, side)
+        packed = encode_state(state, side, side, moves=True)
+        assert decode_state(snapshot) == decode_state(packed) == decode_state(legacy) == state
+
+        for name, data, encode, decode in (
+            ('json', legacy, lambda: json.dumps(state), lambda: decode_state(legacy)),
+            ('xy8', snapshot, lambda: encode_state(state, side, side),
+             lambda: decode_state(snapshot)),
+            ('moves', packed, lambda: encode_state(state, side, side, moves=True),
+             lambda: decode_state(packed)),
+        ):
+            size = len(data.encode('utf-8')) if isinstance(data, str) else len(data)
+            print(f"{length:>7} | {name:<7} | {size:>7} | "
+                  f"{time_per_call(encode, number):>7.1f} us | "
+                  f"{time_per_call(decode, number):>7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import functools
+import itertools
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions, pool
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the acquire timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 pool with health checks and an acquire timeout"""
+
+    def __init__(self, minconn=1, maxconn=10, acquire_timeout=5.0,
+                 health_check_interval=30.0, **connect_kwargs):
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.connect_kwargs = connect_kwargs
+        self._pool = pool.ThreadedConnectionPool(minconn, maxconn, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+        self.users = 0
+
+    def getconn(self, timeout=None):
+        """Borrow a healthy connection, waiting at most `timeout` seconds"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolTimeout(f"no free database connection after {timeout}s")
+        try:
+            # Every idle connection may have gone stale together (server
+            # restart); once they are used up the pool connects afresh, and
+            # that failing raises instead
+            conn = self._pool.getconn()
+            while not self._is_healthy(conn):
+                self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, close=False):
+        """Return a borrowed connection, discarding any open transaction"""
+        try:
+            if not conn.closed and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            close = True
+        self._last_used[id(conn)] = time.monotonic()
+        try:
+            self._pool.putconn(conn, close=close or bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """with pool.connection() as conn: ... -- always returns the connection"""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(minconn=1, maxconn=10, acquire_timeout=5.0, health_check_interval=30.0,
+             **connect_kwargs):
+    """Shared pool per set of connection parameters (one per database/user);
+    the pool options only apply when the pool is first created"""
+    key = tuple(sorted((k, str(v)) for k, v in connect_kwargs.items()))
+    with _pools_lock:
+        shared = _pools.get(key)
+        if shared is None:
+            shared = ConnectionPool(minconn, maxconn, acquire_timeout, health_check_interval,
+                                    **connect_kwargs)
+            _pools[key] = shared
+        shared.users += 1
+        return shared
+
+
+def release_pool(shared):
+    """Drop one user of a shared pool, closing it when nobody uses it anymore"""
+    with _pools_lock:
+        shared.users -= 1
+        if shared.users <= 0:
+            for key, value in list(_pools.items()):
+                if value is shared:
+                    del _pools[key]
+            shared.closeall()
+
+
+class PreparedStatements:
+    """Registry of hot statements, PREPAREd once per connection and EXECUTEd by name.
+
+    Statements are written with %s placeholders like any other query. A
+    connection is identified by object and backend pid, so connections the
+    pool replaces (health check, reconnect) get their statements prepared
+    again on first use.
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._statements = {}   # name -> (prepared name, SQL with $n placeholders, n)
+        self._prepared = {}     # (id(conn), backend pid) -> set of prepared names
+        self._lock = threading.Lock()
+
+    def register(self, name, query):
+        counter = itertools.count(1)
+        body = query.strip().rstrip(';')
+        count = body.count('%s')
+        body = re.sub(r'%s', lambda match: f"${next(counter)}", body)
+        self._statements[name] = (f"{self.namespace}_{name}", body, count)
+
+    def __contains__(self, name):
+        return name in self._statements
+
+    def execute(self, cursor, name, params=()):
+        prepared_name, body, count = self._statements[name]
+        conn = cursor.connection
+        key = (id(conn), conn.info.backend_pid)
+        with self._lock:
+            prepared = self._prepared.setdefault(key, set())
+            needs_prepare = prepared_name not in prepared
+        if needs_prepare:
+            cursor.execute(f"PREPARE {prepared_name} AS {body};")
+            with self._lock:
+                prepared.add(prepared_name)
+        if count:
+            placeholders = ', '.join(['%s'] * count)
+            cursor.execute(f"EXECUTE {prepared_name} ({placeholders});", tuple(params))
+        else:
+            cursor.execute(f"EXECUTE {prepared_name};")
+
+
+class PooledSession:
+    """Exposes a borrowed connection as self.conn / self.cursor per thread.
+
+    Subclasses set self.pool; methods decorated with @pooled borrow a
+    connection for the duration of the call and give it back afterwards.
+    """
+
+    def _session_state(self):
+        local = self.__dict__.get('_local')
+        if local is None:
+            local = self.__dict__.setdefault('_local', threading.local())
+        return local
+
+    @property
+    def conn(self):
+        return getattr(self._session_state(), 'conn', None)
+
+    @property
+    def cursor(self):
+        return getattr(self._session_state(), 'cursor', None)
+
+    def execute_prepared(self, name, params=()):
+        """Run a statement from self.statements on the borrowed cursor"""
+        self.statements.execute(self.cursor, name, params)
+
+    @contextmanager
+    def session(self):
+        """Borrow a connection for a block of calls (re-entrant)"""
+        state = self._session_state()
+        if getattr(state, 'conn', None) is not None:
+            yield state.conn
+            return
+        with self.pool.connection() as conn:
+            state.conn = conn
+            state.cursor = conn.cursor()
+            try:
+                yield conn
+            finally:
+                state.cursor.close()
+                state.conn = state.cursor = None
+
+
+def pooled(method):
+    """Run a PooledSession method with a borrowed connection"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.session():
+            return method(self, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,133 @@
+import os
+import time
+from collections import deque
+
+import pygame
+
+# Fixed-timestep game loop: game logic advances in ticks of exactly
+# 1 / tick_rate seconds, while drawing happens at the display frame rate.
+#
+# Each frame the real time that passed is added to an accumulator and as
+# many logic ticks as fit are run before drawing, so the game keeps the same
+# speed whatever the frame rate. When a frame ran late, the ticks it owes
+# are merged into the next frame instead of being drawn one by one; when
+# even that cannot keep up (more than max_ticks owed), the excess is dropped
+# and the game slows down rather than spiralling. render(alpha) gets how far
+# (0..1) the clock is between the last tick and the next one, for drawing
+# moving things in between.
+#
+# Frame timings are kept for stats(); set GAME_LOOP_STATS=1 to have every
+# loop print them when it ends.
+
+PHASES = ('events', 'update', 'render', 'idle')
+SHOW_STATS = os.environ.get('GAME_LOOP_STATS', '') not in ('', '0')
+
+
+class FixedStepLoop:
+    def __init__(self, tick_rate, fps=60, max_ticks=5, max_frame_time=0.25, history=300,
+                 show_stats=SHOW_STATS):
+        self.tick_rate = tick_rate
+        self.fps = fps
+        self.max_ticks = max_ticks
+        self.max_frame_time = max_frame_time
+        self.clock = pygame.time.Clock()
+        self.running = False
+        self.accumulator = 0.0
+        self.frames = 0
+        self.ticks = 0
+        self.merged_frames = 0      # frames that ran more than one tick
+        self.dropped_ticks = 0
+        self.timings = {phase: deque(maxlen=history) for phase in PHASES}
+        self.show_stats = show_stats
+
+    def stop(self):
+        self.running = False
+
+    def run(self, events, update, render):
+        """Loop until stop() is called or events() returns False.
+
+        events() handles input once per frame, update() advances the game by
+        one tick, render(alpha) draws it. With show_stats the timings are
+        printed when the loop ends, including through sys.exit().
+        """
+        try:
+            self._run(events, update, render)
+        finally:
+            if self.show_stats:
+                self.print_stats()
+
+    def _run(self, events, update, render):
+        self.running = True
+        self.accumulator = 0.0
+        timings = self.timings
+        previous = time.perf_counter()
+        while self.running:
+            start = time.perf_counter()
+            # A long stall (window dragged, debugger) counts as one slow frame
+            self.accumulator += min(start - previous, self.max_frame_time)
+            previous = start
+
+            if events() is False:
+                self.running = False
+            after_events = time.perf_counter()
+
+            step = 1.0 / self.tick_rate
+            ticks = 0
+            while self.running and self.accumulator >= step:
+                if ticks == self.max_ticks:
+                    dropped = int(self.accumulator // step)
+                    self.dropped_ticks += dropped
+                    self.accumulator -= dropped * step
+                    break
+                update()
+                self.accumulator -= step
+                ticks += 1
+                # update() may change the rate (snake levels speed up)
+                step = 1.0 / self.tick_rate
+            self.ticks += ticks
+            if ticks > 1:
+                self.merged_frames += 1
+            after_update = time.perf_counter()
+
+            if self.running:
+                render(min(self.accumulator / step, 1.0))
+            after_render = time.perf_counter()
+            self.clock.tick(self.fps)
+            self.frames += 1
+
+            timings['events'].append(after_events - start)
+            timings['update'].append(after_update - after_events)
+            timings['render'].append(after_render - after_update)
+            timings['idle'].append(time.perf_counter() - after_render)
+
+    def stats(self):
+        """Counters plus mean and worst time per phase (ms) over recent frames"""
+        stats = {
+            'frames': self.frames,
+            'ticks': self.ticks,
+            'merged_frames': self.merged_frames,
+            'dropped_ticks': self.dropped_ticks
+        }
+        for phase, samples in self.timings.items():
+            if samples:
+                stats[phase] = {'mean_ms': sum(samples) / len(samples) * 1000,
+                                'max_ms': max(samples) * 1000}
+        return stats
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"\n{stats['frames']} frames, {stats['ticks']} ticks, "
+              f"{stats['merged_frames']} merged frames, {stats['dropped_ticks']} dropped ticks")
+        for phase in PHASES:
+            if phase in stats:
+                print(f"{phase:>8}: mean {stats[phase]['mean_ms']:7.2f} ms | "
+                      f"max {stats[phase]['max_ms']:7.2f} ms")
+
+
+def interpolate(previous, current, alpha, max_jump=None):
+    """Point between two ticks' positions; jumps over max_jump (respawns) snap"""
+    dx = current[0] - previous[0]
+    dy = current[1] - previous[1]
+    if max_jump is not None and abs(dx) + abs(dy) > max_jump:
+        return current
+    return (round(previous[0] + dx * alpha), round(previous[1] + dy * alpha))
@@ -0,0 +1,134 @@
+import json
+import struct
+import sys
+from array import array
+from itertools import accumulate
+
+# Saved snake games as compact binary snapshots (user_scores.snapshot BYTEA).
+#
+# Version 1 layout, little-endian:
+#   header  magic b'SG', version, body encoding, grid width, grid height,
+#           level, score, direction code, food x, food y, body length
+#   body    BODY_XY8:    all x as uint8, then all y as uint8
+#           BODY_XY16:   all x as uint16, then all y as uint16
+#           BODY_MOVES:  head x, head y (uint16), then one 2-bit move code
+#                        per following segment, four per byte
+# BODY_XY8 (any grid up to 256x256) is what saves use: 2 bytes per segment
+# and cheap to pack. BODY_MOVES is ~8x smaller again but costs a Python step
+# per segment; bodies that are not a chain of neighbouring cells cannot use it.
+
+MAGIC = b'SG'
+VERSION = 1
+BODY_XY8 = 0
+BODY_XY16 = 1
+BODY_MOVES = 2
+NO_FOOD = 0xFFFF
+
+HEADER = struct.Struct('<2sBBHHHIBHHI')
+CELL = struct.Struct('<HH')
+
+DIRECTIONS = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+
+# byte -> its four move codes, low bits first
+_BYTE_CODES = [(byte & 3, byte >> 2 & 3, byte >> 4 & 3, byte >> 6) for byte in range(256)]
+
+
+def encode_state(state, width, height, moves=False):
+    """Game state dict (as SnakeGame.get_game_state returns it) -> bytes
+
+    moves=True packs the body as 2-bit moves when it can (smallest output).
+    """
+    snake = [tuple(segment) for segment in state['snake']]
+    food = state.get('food')
+    food_x, food_y = (NO_FOOD, NO_FOOD) if food is None else food
+    direction = DIRECTION_CODES.get(tuple(state.get('direction', (1, 0))), 3)
+
+    body = _pack_moves(snake, width, height) if moves else None
+    if body is not None:
+        encoding = BODY_MOVES
+    elif width <= 256 and height <= 256:
+        encoding = BODY_XY8
+        body = bytes([x for x, _ in snake]) + bytes([y for _, y in snake])
+    else:
+        encoding = BODY_XY16
+        coords = array('H', [x for x, _ in snake] + [y for _, y in snake])
+        if sys.byteorder == 'big':
+            coords.byteswap()
+        body = coords.tobytes()
+    header = HEADER.pack(MAGIC, VERSION, encoding, width, height, state.get('level', 1),
+                         state.get('score', 0), direction, food_x, food_y, len(snake))
+    return header + body
+
+
+def decode_state(data):
+    """bytes from encode_state, or a legacy JSON document -> game state dict"""
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    if isinstance(data, str) or not data.startswith(MAGIC):
+        return _decode_legacy(data)
+
+    (_, version, encoding, width, height, level, score, direction,
+     food_x, food_y, length) = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    body = data[HEADER.size:]
+    if encoding == BODY_XY8:
+        snake = list(zip(body[:length], body[length:2 * length]))
+    elif encoding == BODY_XY16:
+        coords = array('H', body[:4 * length])
+        if sys.byteorder == 'big':
+            coords.byteswap()
+        snake = list(zip(coords[:length], coords[length:]))
+    elif encoding == BODY_MOVES:
+        snake = _unpack_moves(body, length, width, height)
+    else:
+        raise ValueError(f"unknown body encoding {encoding}")
+    return {
+        'snake': snake,
+        'direction': DIRECTIONS[direction],
+        'food': None if food_x == NO_FOOD else (food_x, food_y),
+        'score': score,
+        'level': level
+    }
+
+
+def _decode_legacy(data):
+    state = json.loads(data)
+    state['snake'] = [tuple(segment) for segment in state.get('snake', [])]
+    if state.get('direction') is not None:
+        state['direction'] = tuple(state['direction'])
+    if state.get('food') is not None:
+        state['food'] = tuple(state['food'])
+    return state
+
+
+def _pack_moves(snake, width, height):
+    """Head cell + 2-bit move codes, or None if the body does not pack"""
+    if not snake or width >= NO_FOOD or height >= NO_FOOD:
+        return None
+    if not all(0 <= x < width and 0 <= y < height for x, y in snake):
+        return None
+    # Moves wrap around the grid, so level 1 bodies crossing an edge still pack
+    move_codes = {(0, height - 1): 0, (0, 1): 1, (width - 1, 0): 2, (1, 0): 3}
+    codes = [move_codes.get(((x1 - x0) % width, (y1 - y0) % height))
+             for (x0, y0), (x1, y1) in zip(snake, snake[1:])]
+    if None in codes:
+        return None
+    codes += [0] * (-len(codes) % 4)
+    packed = bytearray(CELL.pack(*snake[0]))
+    packed.extend(a | b << 2 | c << 4 | d << 6 for a, b, c, d in zip(*[iter(codes)] * 4))
+    return bytes(packed)
+
+
+def _unpack_moves(body, length, width, height):
+    if length == 0:
+        return []
+    x, y = CELL.unpack_from(body)
+    codes = [code for byte in body[CELL.size:CELL.size + (length + 2) // 4]
+             for code in _BYTE_CODES[byte]][:length - 1]
+    dxs = (0, 0, width - 1, 1)
+    dys = (height - 1, 1, 0, 0)
+    xs = accumulate((dxs[code] for code in codes), lambda a, d: (a + d) % width, initial=x)
+    ys = accumulate((dys[code] for code in codes), lambda a, d: (a + d) % height, initial=y)
+    return list(zip(xs, ys))
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Size- and TTL-bounded LRU cache whose entries can be tagged with user ids.
+
+    Tags let writers drop exactly the cached results that contain a given
+    contact; invalidate_where() covers results that a write could newly match.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires_at, value, user_ids)
+        self._tagged = {}               # user_id -> set of keys
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return (True, value) on a fresh hit, (False, None) otherwise"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, key, value, user_ids=()):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            user_ids = frozenset(user_ids)
+            self._entries[key] = (time.monotonic() + self.ttl, value, user_ids)
+            for user_id in user_ids:
+                self._tagged.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        """Drop every cached result that contains user_id"""
+        with self._lock:
+            for key in list(self._tagged.get(user_id, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_where(self, predicate):
+        """Drop every cached result whose key satisfies predicate(key)"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._tagged.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+    def _remove(self, key):
+        _, _, user_ids = self._entries.pop(key)
+        for user_id in user_ids:
+            keys = self._tagged.get(user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[user_id]
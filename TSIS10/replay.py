@@ -0,0 +1,187 @@
+import struct
+import sys
+import time
+
+from game_state import DIRECTION_CODES, DIRECTIONS, decode_state, encode_state
+from snake_sim import SnakeSim
+
+# Replays: everything needed to re-simulate one game tick for tick.
+#
+# Version 1 layout, little-endian:
+#   header  magic b'SR', version, game, grid width, grid height, start level,
+#           seed, ticks played, final score, start snapshot size, move count
+#   start   optional game_state snapshot the game was resumed from
+#   moves   one varint per direction change: (ticks since the previous
+#           change << 2) | direction code
+# A game steered every few ticks costs about a byte per turn, so a long game
+# is a few hundred bytes.
+
+MAGIC = b'SR'
+VERSION = 1
+GAME_SNAKE = 0      # SnakeGame / SnakeSim (TSIS10)
+GAME_SNAKE2 = 1     # TSIS9/snake2/snake_2.py
+
+HEADER = struct.Struct('<2sBBHHHIIIII')
+
+# Verifying re-simulates every tick, so a replay claiming more than this is
+# rejected unread: about a million ticks is hours of play at any level speed
+# and a few seconds to verify.
+MAX_TICKS = 1_000_000
+
+
+def start_replay(sim, level, game=GAME_SNAKE):
+    """Start logging the direction changes of `sim`, a SnakeSim just created
+    with `level` (or any game that fills replay['moves'] the same way)"""
+    sim.moves = []
+    return {
+        'game': game,
+        'seed': sim.seed,
+        'level': level,
+        'width': sim.width,
+        'height': sim.height,
+        'start': None,
+        'moves': sim.moves,
+        'ticks': 0,
+        'score': 0
+    }
+
+
+def encode_replay(replay):
+    """Replay dict -> bytes"""
+    start = b''
+    if replay.get('start'):
+        start = encode_state(replay['start'], replay['width'], replay['height'])
+    moves = bytearray()
+    previous = 0
+    for tick, direction in replay['moves']:
+        value = (tick - previous) << 2 | DIRECTION_CODES[tuple(direction)]
+        previous = tick
+        while value > 0x7F:
+            moves.append(value & 0x7F | 0x80)
+            value >>= 7
+        moves.append(value)
+    header = HEADER.pack(MAGIC, VERSION, replay.get('game', GAME_SNAKE),
+                         replay['width'], replay['height'], replay['level'], replay['seed'],
+                         replay['ticks'], replay['score'], len(start), len(replay['moves']))
+    return header + start + bytes(moves)
+
+
+def decode_replay(data):
+    """bytes from encode_replay -> replay dict; ValueError when malformed"""
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    if len(data) < HEADER.size or not data.startswith(MAGIC):
+        raise ValueError("not a replay")
+    (_, version, game, width, height, level, seed, ticks, score,
+     start_size, count) = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"unsupported replay version {version}")
+    if ticks > MAX_TICKS:
+        raise ValueError(f"{ticks} ticks is over the {MAX_TICKS} limit")
+    offset = HEADER.size + start_size
+    start = decode_state(data[HEADER.size:offset]) if start_size else None
+
+    moves = []
+    tick = value = shift = 0
+    for byte in data[offset:]:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        tick += value >> 2
+        moves.append((tick, DIRECTIONS[value & 3]))
+        value = shift = 0
+    if shift or len(moves) != count:
+        raise ValueError("truncated replay")
+    if tick > ticks:
+        raise ValueError("direction change after the last tick")
+    return {
+        'game': game,
+        'seed': seed,
+        'level': level,
+        'width': width,
+        'height': height,
+        'start': start,
+        'moves': moves,
+        'ticks': ticks,
+        'score': score
+    }
+
+
+def run_replay(replay):
+    """Re-simulate a SnakeGame replay without drawing, return the SnakeSim"""
+    if replay['game'] != GAME_SNAKE:
+        raise ValueError("not a SnakeGame replay")
+    sim = SnakeSim(replay['level'], seed=replay['seed'],
+                   width=replay['width'], height=replay['height'])
+    if replay['start']:
+        sim.load_state(replay['start'])
+    # Stop where the game ends: a replay that claims to go on after that is
+    # forged, and verifying it should not cost the ticks it claims
+    step, turn = sim.step, sim.turn
+    done = 0
+    for tick, direction in replay['moves']:
+        for _ in range(tick - done - 1):
+            step()
+            if sim.game_over:
+                return sim
+        turn(direction)
+        step()
+        if sim.game_over:
+            return sim
+        done = tick
+    for _ in range(replay['ticks'] - done):
+        step()
+        if sim.game_over:
+            break
+    return sim
+
+
+def verify_replay(data, score, saved=None):
+    """True when the replay in `data` really plays `score` in the ticks it claims.
+
+    A replay of a resumed game carries its start state, which it cannot
+    vouch for itself: that start must equal `saved`, the game state stored
+    for the player (None when there is none). New games start from score 0.
+    """
+    try:
+        replay = decode_replay(data)
+        start = replay['start']
+        if start is not None and (saved is None or _state_key(start) != _state_key(saved)):
+            print("Invalid replay: it does not start from the saved game")
+            return False
+        sim = run_replay(replay)
+    except (ValueError, KeyError, IndexError, TypeError, struct.error) as e:
+        print(f"Invalid replay: {e}")
+        return False
+    if sim.ticks < replay['ticks']:
+        print(f"Invalid replay: the game ended at tick {sim.ticks}, not {replay['ticks']}")
+        return False
+    return sim.ticks == replay['ticks'] and sim.score == replay['score'] == score
+
+
+def _state_key(state):
+    food = state.get('food')
+    return ([tuple(segment) for segment in state.get('snake') or []],
+            tuple(state.get('direction') or ()), tuple(food) if food else None,
+            state.get('score', 0), state.get('level', 1))
+
+
+def main():
+    """python replay.py FILE...: re-simulate saved replays and check their scores"""
+    for path in sys.argv[1:]:
+        with open(path, 'rb') as f:
+            data = f.read()
+        replay = decode_replay(data)
+        start = time.perf_counter()
+        sim = run_replay(replay)
+        elapsed = time.perf_counter() - start
+        ok = sim.ticks == replay['ticks'] and sim.score == replay['score']
+        print(f"{path}: {len(data)} bytes, {len(replay['moves'])} turns, "
+              f"{sim.ticks} ticks, score {sim.score} (claimed {replay['score']}) "
+              f"{'OK' if ok else 'MISMATCH'} in {elapsed * 1000:.1f} ms "
+              f"({sim.ticks / max(elapsed, 1e-9):,.0f} ticks/s)")
+
+
+if __name__ == "__main__":
+    main()
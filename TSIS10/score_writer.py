@@ -0,0 +1,104 @@
+import atexit
+import threading
+
+
+class ScoreWriter:
+    """Background write-behind queue for per-user game state and high scores.
+
+    Updates are coalesced per user: the latest saved state wins and high
+    scores keep their maximum. Pending rows are handed to `flush(rows)` (one
+    multi-row UPDATE) every `interval` seconds, or as soon as `max_items`
+    users are waiting. close() -- also run at interpreter exit -- writes
+    whatever is still pending.
+    """
+
+    def __init__(self, flush, interval=0.2, max_items=100):
+        self._write = flush
+        self.interval = interval
+        self.max_items = max_items
+        self._pending = {}              # user_id -> {field: value}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.queued = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failures = 0
+        self._thread = threading.Thread(target=self._run, name='score-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def save_state(self, user_id, level, score, snapshot, last_played):
+        self._put(user_id, {'level': level, 'score': score,
+                            'snapshot': snapshot, 'last_played': last_played})
+
+    def raise_high_score(self, user_id, score):
+        self._put(user_id, {'high_score': score})
+
+    def _put(self, user_id, fields):
+        if self._closed:
+            raise RuntimeError("score writer is closed")
+        with self._lock:
+            self._merge(user_id, fields)
+            self.queued += 1
+            full = len(self._pending) >= self.max_items
+        if full:
+            self._wake.set()
+
+    def _merge(self, user_id, fields):
+        entry = self._pending.setdefault(user_id, {})
+        for name, value in fields.items():
+            if name == 'high_score':
+                value = max(value, entry.get('high_score', value))
+            entry[name] = value
+
+    def flush(self):
+        """Write everything pending now; failed rows stay queued for the next try"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return True
+            try:
+                self._write([(user_id, fields) for user_id, fields in batch.items()])
+            except Exception as e:
+                print(f"Error flushing score updates: {e}")
+                self.failures += 1
+                with self._lock:
+                    # Anything queued meanwhile is newer than the failed batch
+                    newer, self._pending = self._pending, {}
+                    for source in (batch, newer):
+                        for user_id, fields in source.items():
+                            self._merge(user_id, fields)
+                return False
+            self.flushes += 1
+            self.rows_written += len(batch)
+            return True
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background thread and flush what is left"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        atexit.unregister(self.close)
+        if not self.flush():
+            print(f"Lost score updates for {len(self._pending)} user(s)")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'queued': self.queued,
+                'flushes': self.flushes,
+                'rows_written': self.rows_written,
+                'failures': self.failures
+            }
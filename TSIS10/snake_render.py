@@ -0,0 +1,146 @@
+import weakref
+
+import pygame
+
+from snake_sim import BODY
+
+
+class SnakeRenderer:
+    """Draws a SnakeSim with a cached static layer and dirty-rect updates.
+
+    The background and walls of each Level are baked once into a surface.
+    After a full frame only the cells the sim reports in sim.changes (new
+    head, vacated tail), the old and new food cells, the HUD and the overlay
+    are repainted, and just those rects are pushed to the display. A new
+    level, a loaded game or a change of overlay repaints the whole screen.
+    Text surfaces are re-rendered only when their text changes.
+    """
+
+    def __init__(self, screen, grid_size, background, wall_color, body_color, food_color):
+        self.screen = screen
+        self.grid_size = grid_size
+        self.background = background
+        self.wall_color = wall_color
+        self.body_color = body_color
+        self.food_color = food_color
+        self._static = weakref.WeakKeyDictionary()   # Level -> baked surface
+        self._texts = {}                              # (font, color, text) -> surface
+        self._sim = None
+        self._generation = None
+        self._food = None
+        self._overlay = None
+        self._hud = None
+        self._hud_rect = None
+
+    def static_layer(self, level):
+        """Background and walls of `level`, rendered once per Level"""
+        surface = self._static.get(level)
+        if surface is None:
+            surface = pygame.Surface(self.screen.get_size()).convert()
+            surface.fill(self.background)
+            size = self.grid_size
+            for x, y in level.walls:
+                surface.fill(self.wall_color, (x * size, y * size, size, size))
+            self._static[level] = surface
+        return surface
+
+    def text(self, font, text, color):
+        """Rendered text surface, cached until a different text is asked for"""
+        key = (font, color, text)
+        surface = self._texts.get(key)
+        if surface is None:
+            # Keep only the current text of each font/color pair
+            for old in [old for old in self._texts if old[:2] == key[:2]]:
+                del self._texts[old]
+            surface = self._texts[key] = font.render(text, True, color)
+        return surface
+
+    def draw(self, sim, hud, overlay=()):
+        """Draw one frame.
+
+        hud is (font, text, color) shown at the top left; overlay is a list
+        of (font, text, color, center) lines drawn over the board.
+        """
+        if sim is not self._sim:
+            self._sim = sim
+            sim.changes = []
+            self._generation = None
+        overlay = tuple(overlay)
+        if sim.generation != self._generation or overlay != self._overlay:
+            self._draw_full(sim, hud, overlay)
+            return
+
+        layer = self.static_layer(sim.level)
+        rects = []
+        cells = set(sim.changes)
+        sim.changes.clear()
+        if sim.food != self._food:
+            if self._food:
+                cells.add(self._food)
+            if sim.food:
+                cells.add(sim.food)
+            self._food = sim.food
+        for cell in cells:
+            rects.append(self._draw_cell(sim, layer, cell))
+
+        hud_surface = self.text(*hud)
+        hud_rect = hud_surface.get_rect(topleft=(10, 10))
+        if hud != self._hud or self._hud_rect.collidelist(rects) != -1:
+            # Repaint what the old text covered, then the board under the new one
+            area = hud_rect.union(self._hud_rect)
+            self.screen.blit(layer, area, area)
+            for cell in self._cells_in(sim, area):
+                self._draw_cell(sim, layer, cell, restore=False)
+            self.screen.blit(hud_surface, hud_rect)
+            self._hud = hud
+            self._hud_rect = hud_rect
+            rects.append(area)
+
+        if overlay and rects:
+            rects.extend(self._draw_overlay(overlay))
+        if rects:
+            pygame.display.update(rects)
+
+    def _draw_full(self, sim, hud, overlay):
+        self.screen.blit(self.static_layer(sim.level), (0, 0))
+        size = self.grid_size
+        for x, y in sim.snake:
+            self.screen.fill(self.body_color, (x * size, y * size, size - 2, size - 2))
+        if sim.food:
+            x, y = sim.food
+            self.screen.fill(self.food_color, (x * size, y * size, size - 2, size - 2))
+        hud_surface = self.text(*hud)
+        self._hud = hud
+        self._hud_rect = self.screen.blit(hud_surface, (10, 10))
+        self._draw_overlay(overlay)
+        pygame.display.flip()
+        sim.changes.clear()
+        self._generation = sim.generation
+        self._food = sim.food
+        self._overlay = overlay
+
+    def _draw_cell(self, sim, layer, cell, restore=True):
+        """Repaint one cell from the static layer plus whatever occupies it now"""
+        size = self.grid_size
+        x, y = cell
+        rect = pygame.Rect(x * size, y * size, size, size)
+        if restore:
+            self.screen.blit(layer, rect, rect)
+        if sim.grid[y * sim.width + x] == BODY:
+            self.screen.fill(self.body_color, (rect.x, rect.y, size - 2, size - 2))
+        elif cell == sim.food:
+            self.screen.fill(self.food_color, (rect.x, rect.y, size - 2, size - 2))
+        return rect
+
+    def _cells_in(self, sim, area):
+        size = self.grid_size
+        for y in range(area.top // size, min(sim.height, (area.bottom - 1) // size + 1)):
+            for x in range(area.left // size, min(sim.width, (area.right - 1) // size + 1)):
+                yield (x, y)
+
+    def _draw_overlay(self, overlay):
+        rects = []
+        for font, text, color, center in overlay:
+            surface = self.text(font, text, color)
+            rects.append(self.screen.blit(surface, surface.get_rect(center=center)))
+        return rects
@@ -0,0 +1,290 @@
+import random
+from array import array
+from collections import deque
+
+# Snake rules without pygame: movement, collisions, food and level-ups.
+# Everything random comes from the simulation's own seeded Random, so the
+# same seed, level and inputs always replay the same game.
+
+GRID_WIDTH = 30
+GRID_HEIGHT = 30
+
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+
+# Tick results
+MOVED = 'moved'
+ATE = 'ate'
+LEVEL_UP = 'level_up'
+GAME_OVER = 'game_over'
+BOARD_FULL = 'board_full'
+
+# Occupancy grid cell values
+EMPTY = 0
+WALL = 1
+BODY = 2
+
+POINTS_PER_FOOD = 10
+POINTS_PER_LEVEL = 50
+
+
+class FreeCells:
+    """Set of cell indices with O(1) add, remove and uniform random choice.
+
+    Members are kept densely in self.cells; self.position maps a cell index
+    to its slot there (-1 when absent), so removal swaps in the last member.
+    """
+
+    def __init__(self, size, cells=None):
+        if cells is None:
+            self.cells = array('i', range(size))
+            self.position = array('i', range(size))
+        else:
+            self.cells = array('i')
+            self.position = array('i', [-1]) * size
+            for index in cells:
+                self.add(index)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, index):
+        return self.position[index] >= 0
+
+    def add(self, index):
+        if self.position[index] < 0:
+            self.position[index] = len(self.cells)
+            self.cells.append(index)
+
+    def remove(self, index):
+        slot = self.position[index]
+        if slot < 0:
+            return
+        last = self.cells.pop()
+        if last != index:
+            self.cells[slot] = last
+            self.position[last] = slot
+        self.position[index] = -1
+
+    def choice(self, rng):
+        """Uniformly random member, None when the set is empty"""
+        if not self.cells:
+            return None
+        return self.cells[rng.randrange(len(self.cells))]
+
+
+class Level:
+    def __init__(self, level_num, rng=random, width=GRID_WIDTH, height=GRID_HEIGHT, keep_clear=()):
+        self.level_num = level_num
+        self.width = width
+        self.height = height
+        self.speed = 8 + (level_num - 1) * 2  # Increase speed with level
+        self.walls = self.generate_walls(rng, keep_clear)
+
+    def generate_walls(self, rng=random, keep_clear=()):
+        """Generate walls based on level"""
+        walls = []
+
+        if self.level_num == 1:
+            # No walls
+            pass
+
+        elif self.level_num == 2:
+            # Border walls
+            for x in range(self.width):
+                walls.append((x, 0))
+                walls.append((x, self.height - 1))
+            for y in range(self.height):
+                walls.append((0, y))
+                walls.append((self.width - 1, y))
+
+        elif self.level_num == 3:
+            # Cross pattern
+            mid_x = self.width // 2
+            mid_y = self.height // 2
+            for i in range(5, self.width - 5):
+                walls.append((i, mid_y))
+            for i in range(5, self.height - 5):
+                walls.append((mid_x, i))
+
+        elif self.level_num >= 4:
+            # Random obstacles: distinct cells away from the border and
+            # off `keep_clear` (the snake's start cell)
+            num_walls = 20 + (self.level_num - 4) * 5
+            width = self.width
+            candidates = FreeCells(width * self.height, (
+                y * width + x
+                for y in range(2, self.height - 2)
+                for x in range(2, width - 2)))
+            for x, y in keep_clear:
+                candidates.remove(y * width + x)
+            for _ in range(num_walls):
+                index = candidates.choice(rng)
+                if index is None:
+                    break
+                candidates.remove(index)
+                walls.append((index % width, index // width))
+
+        return walls
+
+
+class SnakeSim:
+    """One snake game as plain data; step() advances it by one tick.
+
+    seed=None picks a fresh seed, which is kept in self.seed so the game can
+    be replayed. No display, clock or global random state is touched.
+
+    The body is a deque (head first) mirrored in self.grid, a bytearray with
+    one EMPTY/WALL/BODY byte per cell at y * width + x, and in self.free,
+    the FreeCells of every EMPTY cell. A tick, including placing food, costs
+    the same whatever the snake length or board size.
+
+    A renderer that sets self.changes to a list gets every cell the body
+    enters or leaves appended to it; self.generation increases whenever the
+    whole board is rebuilt (new level, reset, loaded game). Likewise a list
+    in self.moves logs (tick, direction) for every change of direction, which
+    with the seed is all a replay needs.
+    """
+
+    def __init__(self, level=1, seed=None, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.width = width
+        self.height = height
+        self.changes = None
+        self.moves = None
+        self.generation = 0
+        self.reset(level)
+
+    def reset(self, level=1):
+        """Start a new game at `level`"""
+        self.current_level = level
+        self.score = 0
+        self.ticks = 0
+        self.game_over = False
+        self.board_full = False
+        self.start_level(level)
+
+    def start_level(self, level_num):
+        """Fresh walls, snake back in the centre heading right, new food"""
+        self.current_level = level_num
+        start = (self.width // 2, self.height // 2)
+        self.level = Level(level_num, self.rng, self.width, self.height, keep_clear=[start])
+        self.set_body([start])
+        self.direction = RIGHT
+        self.next_direction = RIGHT
+        self.food = self.generate_food()
+
+    def set_body(self, cells):
+        """Replace the snake (head first) and rebuild the occupancy grid"""
+        self.generation += 1
+        width = self.width
+        self.grid = bytearray(width * self.height)
+        self.free = FreeCells(width * self.height)
+        for x, y in self.level.walls:
+            self.grid[y * width + x] = WALL
+            self.free.remove(y * width + x)
+        self.snake = deque(cells)
+        for x, y in self.snake:
+            self.grid[y * width + x] = BODY
+            self.free.remove(y * width + x)
+
+    def turn(self, direction):
+        """Queue a direction for the next tick; reversing onto the body is ignored"""
+        if (direction[0] + self.direction[0], direction[1] + self.direction[1]) != (0, 0):
+            self.next_direction = direction
+
+    def generate_food(self):
+        """Uniformly random free cell, None when the board is full"""
+        index = self.free.choice(self.rng)
+        if index is None:
+            return None
+        return (index % self.width, index // self.width)
+
+    def step(self):
+        """Advance one tick, return MOVED, ATE, LEVEL_UP, GAME_OVER or BOARD_FULL"""
+        if self.game_over:
+            return GAME_OVER
+        self.ticks += 1
+        direction = self.next_direction
+        if direction != self.direction and self.moves is not None:
+            self.moves.append((self.ticks, direction))
+        self.direction = direction
+        head_x, head_y = self.snake[0]
+        x, y = head_x + direction[0], head_y + direction[1]
+        width, height = self.width, self.height
+
+        # Check collision with boundaries (level 1 only wraps)
+        if not (0 <= x < width and 0 <= y < height):
+            if self.current_level != 1:
+                self.game_over = True
+                return GAME_OVER
+            x, y = x % width, y % height
+
+        # Check collision with walls and self (the tail has not moved yet)
+        grid = self.grid
+        index = y * width + x
+        if grid[index] != EMPTY:
+            self.game_over = True
+            return GAME_OVER
+
+        new_head = (x, y)
+        self.snake.appendleft(new_head)
+        grid[index] = BODY
+        self.free.remove(index)
+        changes = self.changes
+        if changes is not None:
+            changes.append(new_head)
+
+        if new_head != self.food:
+            tail = self.snake.pop()
+            index = tail[1] * width + tail[0]
+            grid[index] = EMPTY
+            self.free.add(index)
+            if changes is not None:
+                changes.append(tail)
+            return MOVED
+
+        self.score += POINTS_PER_FOOD
+        if self.score % POINTS_PER_LEVEL == 0:
+            self.start_level(self.current_level + 1)
+            return LEVEL_UP
+        self.food = self.generate_food()
+        if self.food is None:
+            # Nowhere left to put food: the snake fills the board
+            self.game_over = True
+            self.board_full = True
+            return BOARD_FULL
+        return ATE
+
+    def run(self, directions):
+        """Step once per item of `directions` (a direction or None to keep going)
+        until the game ends; return the total number of ticks played"""
+        for direction in directions:
+            if direction is not None:
+                self.turn(direction)
+            self.step()
+            if self.game_over:
+                break
+        return self.ticks
+
+    def get_state(self):
+        """Current game state for saving"""
+        return {
+            'snake': list(self.snake),
+            'direction': self.direction,
+            'food': self.food,
+            'score': self.score,
+            'level': self.current_level
+        }
+
+    def load_state(self, state):
+        """Continue a saved game (walls of random levels are generated anew)"""
+        self.reset(state.get('level', 1))
+        self.set_body([tuple(pos) for pos in state.get('snake') or self.snake])
+        self.direction = tuple(state.get('direction') or RIGHT)
+        self.next_direction = self.direction
+        self.food = tuple(state['food']) if state.get('food') else self.generate_food()
+        self.score = state.get('score', 0)
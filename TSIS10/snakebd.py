@@ -4,10 +4,78 @@ import sys
 os.environ['PGCLIENTENCODING'] = 'UTF8'
 
 import pygame
-import random
-import psycopg2
 from datetime import datetime
-import json
+
+from psycopg2.extras import execute_values
+
+from db_pool import PooledSession, PreparedStatements, get_pool, pooled, release_pool
+from game_loop import FixedStepLoop
+from game_state import decode_state, encode_state
+from replay import encode_replay, start_replay, verify_replay
+from score_writer import ScoreWriter
+from snake_render import SnakeRenderer
+from snake_sim import DOWN, LEFT, RIGHT, UP, SnakeSim
+
+# Statements run on every login, level-up and save
+SNAKE_STATEMENTS = PreparedStatements('snake')
+SNAKE_STATEMENTS.register('find_user', "SELECT user_id FROM users WHERE username = %s;")
+SNAKE_STATEMENTS.register('insert_user', "INSERT INTO users (username) VALUES (%s) RETURNING user_id;")
+SNAKE_STATEMENTS.register('insert_score', """
+INSERT INTO user_scores (user_id, level, score, high_score)
+VALUES (%s, 1, 0, 0);
+""")
+SNAKE_STATEMENTS.register('user_stats', """
+SELECT level, high_score, snapshot, game_state 
+FROM user_scores WHERE user_id = %s;
+""")
+SNAKE_STATEMENTS.register('save_game_state', """
+UPDATE user_scores 
+SET level = %s, score = %s, snapshot = %s, game_state = NULL, last_played = %s
+WHERE user_id = %s;
+""")
+SNAKE_STATEMENTS.register('update_high_score', """
+UPDATE user_scores 
+SET high_score = GREATEST(high_score, %s)
+WHERE user_id = %s;
+""")
+SNAKE_STATEMENTS.register('top_players', """
+SELECT RANK() OVER (ORDER BY s.high_score DESC), u.username, s.high_score
+FROM (
+    SELECT user_id, high_score FROM user_scores
+    ORDER BY high_score DESC, user_id DESC
+    LIMIT %s
+) s
+JOIN users u ON u.user_id = s.user_id
+ORDER BY s.high_score DESC, s.user_id DESC;
+""")
+SNAKE_STATEMENTS.register('player_rank', """
+SELECT 1 + (SELECT COALESCE(SUM(h.players), 0) FROM score_histogram h
+            WHERE h.high_score > s.high_score),
+       s.high_score
+FROM user_scores s WHERE s.user_id = %s;
+""")
+# Up to `radius` players on each side of the user in leaderboard order
+SNAKE_STATEMENTS.register('players_around', """
+WITH me AS (
+    SELECT user_id, high_score FROM user_scores WHERE user_id = %s
+), nearby AS (
+    (SELECT s.user_id, s.high_score FROM user_scores s, me
+     WHERE (s.high_score, s.user_id) > (me.high_score, me.user_id)
+     ORDER BY s.high_score, s.user_id LIMIT %s)
+    UNION ALL
+    SELECT user_id, high_score FROM me
+    UNION ALL
+    (SELECT s.user_id, s.high_score FROM user_scores s, me
+     WHERE (s.high_score, s.user_id) < (me.high_score, me.user_id)
+     ORDER BY s.high_score DESC, s.user_id DESC LIMIT %s)
+)
+SELECT 1 + (SELECT COALESCE(SUM(h.players), 0) FROM score_histogram h
+            WHERE h.high_score > n.high_score),
+       u.username, n.high_score, n.user_id = (SELECT user_id FROM me)
+FROM nearby n
+JOIN users u ON u.user_id = n.user_id
+ORDER BY n.high_score DESC, n.user_id DESC;
+""")
 
 
 pygame.init()
@@ -17,6 +85,8 @@ WIDTH, HEIGHT = 600, 600
 GRID_SIZE = 20
 GRID_WIDTH = WIDTH // GRID_SIZE
 GRID_HEIGHT = HEIGHT // GRID_SIZE
+FPS = 60  # Drawing and input; the snake itself moves at level.speed
+REPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'replays')
 
 # Colors
 BLACK = (0, 0, 0)
@@ -26,23 +96,34 @@ GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
 GRAY = (128, 128, 128)
 
-class SnakeGameDB:
-    def __init__(self, dbname, user, password, host='localhost', port='5432'):
-        """Initialize database connection"""
+KEY_DIRECTIONS = {
+    pygame.K_UP: UP,
+    pygame.K_DOWN: DOWN,
+    pygame.K_LEFT: LEFT,
+    pygame.K_RIGHT: RIGHT
+}
+
+class SnakeGameDB(PooledSession):
+    statements = SNAKE_STATEMENTS
+
+    def __init__(self, dbname, user, password, host='localhost', port='5432', pool=None,
+                 write_behind=False, flush_interval=0.2, flush_items=100):
+        """Initialize database connection pool (and the background score writer)"""
         try:
-            os.environ['PGHOST'] = host
-            os.environ['PGPORT'] = str(port)
-            os.environ['PGDATABASE'] = dbname
-            os.environ['PGUSER'] = user
-            os.environ['PGPASSWORD'] = password
-            os.environ['PGCLIENTENCODING'] = 'UTF8'
-            
-            self.conn = psycopg2.connect('')
-            
-            self.conn.set_client_encoding('UTF8')
-            self.cursor = self.conn.cursor()
-            self.cursor.execute("SET client_encoding TO 'UTF8';")
-            self.conn.commit()
+            self.writer = None
+            self._owns_pool = pool is None
+            self.pool = pool or get_pool(
+                dbname=dbname,
+                user=user,
+                password=password,
+                host=host,
+                port=str(port),
+                client_encoding='UTF8'
+            )
+            with self.session():
+                pass
+            if write_behind:
+                self.writer = ScoreWriter(self.write_score_updates, flush_interval, flush_items)
             
             print("Database connection established")
             
@@ -52,6 +133,7 @@ class SnakeGameDB:
 
     # ... остальные методы класса без изменений ...
 
+    @pooled
     def create_tables(self):
         """Create user and user_score tables"""
         create_user_table = """
@@ -70,25 +152,106 @@ class SnakeGameDB:
             score INTEGER DEFAULT 0,
             high_score INTEGER DEFAULT 0,
             game_state TEXT,
+            snapshot BYTEA,
             last_played TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
         """
         
+        # Leaderboard order is (high_score DESC, user_id DESC): top-N and
+        # neighbour queries are short scans of this index
+        create_score_indexes = """
+        CREATE INDEX IF NOT EXISTS idx_user_scores_user_id ON user_scores (user_id);
+        CREATE INDEX IF NOT EXISTS idx_user_scores_leaderboard
+            ON user_scores (high_score DESC, user_id DESC);
+        """
+        
+        # Saves are binary snapshots (game_state.py); game_state keeps legacy JSON
+        add_snapshot_column = """
+        ALTER TABLE user_scores ADD COLUMN IF NOT EXISTS snapshot BYTEA;
+        """
+        
         try:
             self.cursor.execute(create_user_table)
             self.cursor.execute(create_score_table)
+            self.cursor.execute(add_snapshot_column)
+            self.cursor.execute(create_score_indexes)
             self.conn.commit()
+            self.create_leaderboard()
             print("Tables created successfully")
         except Exception as e:
             print(f"Error creating tables: {e}")
             self.conn.rollback()
 
+    @pooled
+    def create_leaderboard(self):
+        """Players per high score, kept current by triggers on user_scores.
+
+        A rank is 1 + the number of players with a higher score, i.e. a sum
+        over the (few) distinct scores above it instead of a count over
+        every player ahead.
+        """
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS score_histogram (
+            high_score INTEGER PRIMARY KEY,
+            players BIGINT NOT NULL
+        );
+        
+        CREATE OR REPLACE FUNCTION score_histogram_sync()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.high_score IS NOT NULL THEN
+                UPDATE score_histogram SET players = players - 1
+                WHERE high_score = OLD.high_score;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.high_score IS NOT NULL THEN
+                INSERT INTO score_histogram (high_score, players)
+                VALUES (NEW.high_score, 1)
+                ON CONFLICT (high_score) DO UPDATE
+                SET players = score_histogram.players + 1;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """)
+        self.cursor.execute("""
+        SELECT COUNT(*) FROM pg_trigger
+        WHERE tgrelid = 'user_scores'::regclass AND tgname LIKE 'trg_score_histogram_%';
+        """)
+        if self.cursor.fetchone()[0] < 2:
+            self.cursor.execute("""
+            DROP TRIGGER IF EXISTS trg_score_histogram_rows ON user_scores;
+            CREATE TRIGGER trg_score_histogram_rows
+            AFTER INSERT OR DELETE ON user_scores
+            FOR EACH ROW EXECUTE FUNCTION score_histogram_sync();
+            
+            DROP TRIGGER IF EXISTS trg_score_histogram_update ON user_scores;
+            CREATE TRIGGER trg_score_histogram_update
+            AFTER UPDATE OF high_score ON user_scores
+            FOR EACH ROW WHEN (OLD.high_score IS DISTINCT FROM NEW.high_score)
+            EXECUTE FUNCTION score_histogram_sync();
+            """)
+            self.rebuild_leaderboard()
+        self.conn.commit()
+
+    @pooled
+    def rebuild_leaderboard(self):
+        """Recount score_histogram from user_scores (after bulk loads)"""
+        self.cursor.execute("""
+        LOCK TABLE user_scores IN SHARE ROW EXCLUSIVE MODE;
+        TRUNCATE score_histogram;
+        INSERT INTO score_histogram (high_score, players)
+        SELECT high_score, COUNT(*) FROM user_scores
+        WHERE high_score IS NOT NULL
+        GROUP BY high_score;
+        """)
+        self.conn.commit()
+
+    @pooled
     def get_or_create_user(self, username):
         """Get existing user or create new one"""
         try:
             # Check if user exists
-            select_query = "SELECT user_id FROM users WHERE username = %s;"
-            self.cursor.execute(select_query, (username,))
+            self.execute_prepared('find_user', (username,))
             result = self.cursor.fetchone()
             
             if result:
@@ -96,18 +259,11 @@ class SnakeGameDB:
                 print(f"Welcome back, {username}!")
             else:
                 # Create new user
-                insert_query = """
-                INSERT INTO users (username) VALUES (%s) RETURNING user_id;
-                """
-                self.cursor.execute(insert_query, (username,))
+                self.execute_prepared('insert_user', (username,))
                 user_id = self.cursor.fetchone()[0]
                 
                 # Create initial score record
-                score_query = """
-                INSERT INTO user_scores (user_id, level, score, high_score)
-                VALUES (%s, 1, 0, 0);
-                """
-                self.cursor.execute(score_query, (user_id,))
+                self.execute_prepared('insert_score', (user_id,))
                 self.conn.commit()
                 print(f"New user created: {username}")
             
@@ -117,21 +273,22 @@ class SnakeGameDB:
             self.conn.rollback()
             return None
 
+    @pooled
     def get_user_stats(self, user_id):
         """Get user's current level and high score"""
+        if self.writer:
+            # Read our own queued writes
+            self.writer.flush()
         try:
-            query = """
-            SELECT level, high_score, game_state 
-            FROM user_scores WHERE user_id = %s;
-            """
-            self.cursor.execute(query, (user_id,))
+            self.execute_prepared('user_stats', (user_id,))
             result = self.cursor.fetchone()
             
             if result:
+                # Snapshot bytes, or the JSON text of an old save; decode_state reads both
                 return {
                     'level': result[0],
                     'high_score': result[1],
-                    'game_state': result[2]
+                    'game_state': bytes(result[2]) if result[2] is not None else result[3]
                 }
             return {'level': 1, 'high_score': 0, 'game_state': None}
         except Exception as e:
@@ -139,299 +296,273 @@ class SnakeGameDB:
             return {'level': 1, 'high_score': 0, 'game_state': None}
 
     def save_game_state(self, user_id, level, score, game_state):
-        """Save current game state"""
+        """Save current game state (queued when write-behind is on)"""
+        if self.writer:
+            self.writer.save_state(user_id, level, score,
+                                   encode_state(game_state, GRID_WIDTH, GRID_HEIGHT),
+                                   datetime.now())
+        else:
+            self._save_game_state_now(user_id, level, score, game_state)
+
+    @pooled
+    def _save_game_state_now(self, user_id, level, score, game_state):
         try:
-            update_query = """
-            UPDATE user_scores 
-            SET level = %s, score = %s, game_state = %s, last_played = %s
-            WHERE user_id = %s;
-            """
-            self.cursor.execute(update_query, 
-                              (level, score, json.dumps(game_state), 
-                               datetime.now(), user_id))
+            self.execute_prepared('save_game_state',
+                                  (level, score,
+                                   encode_state(game_state, GRID_WIDTH, GRID_HEIGHT),
+                                   datetime.now(), user_id))
             self.conn.commit()
             print("Game state saved successfully")
         except Exception as e:
             print(f"Error saving game state: {e}")
             self.conn.rollback()
 
-    def update_high_score(self, user_id, score):
-        """Update high score if current score is higher"""
+    def update_high_score(self, user_id, score, replay=None):
+        """Update high score if current score is higher (queued when write-behind is on).
+
+        With a replay (replay.py) the score is only accepted if re-simulating
+        the game ends with exactly that score, starting either from a new
+        game or from the save stored for this user.
+        """
+        if replay is not None:
+            saved = self.get_user_stats(user_id)['game_state']
+            try:
+                saved = decode_state(saved) if saved else None
+            except Exception:
+                saved = None
+            if not verify_replay(replay, score, saved):
+                print(f"High score {score} rejected: the replay does not reproduce it")
+                return
+        if self.writer:
+            self.writer.raise_high_score(user_id, score)
+        else:
+            self._update_high_score_now(user_id, score)
+
+    @pooled
+    def _update_high_score_now(self, user_id, score):
         try:
-            query = """
-            UPDATE user_scores 
-            SET high_score = GREATEST(high_score, %s)
-            WHERE user_id = %s;
-            """
-            self.cursor.execute(query, (score, user_id))
+            self.execute_prepared('update_high_score', (score, user_id))
             self.conn.commit()
         except Exception as e:
             print(f"Error updating high score: {e}")
             self.conn.rollback()
 
-    def close(self):
-        """Close database connection"""
-        self.cursor.close()
-        self.conn.close()
+    @pooled
+    def write_score_updates(self, rows):
+        """Apply coalesced (user_id, fields) updates in one multi-row UPDATE.
 
+        Fields missing from a row keep their stored value; errors propagate
+        so the writer can keep the rows queued.
+        """
+        values = [(user_id, fields.get('level'), fields.get('score'),
+                   fields.get('snapshot'), fields.get('last_played'),
+                   fields.get('high_score'))
+                  for user_id, fields in sorted(rows, key=lambda row: row[0])]
+        try:
+            execute_values(self.cursor, """
+            UPDATE user_scores s SET
+                level = COALESCE(v.level, s.level),
+                score = COALESCE(v.score, s.score),
+                snapshot = COALESCE(v.snapshot, s.snapshot),
+                game_state = CASE WHEN v.snapshot IS NULL THEN s.game_state END,
+                last_played = COALESCE(v.last_played, s.last_played),
+                high_score = GREATEST(s.high_score, v.high_score)
+            FROM (VALUES %s) AS v(user_id, level, score, snapshot, last_played, high_score)
+            WHERE s.user_id = v.user_id;
+            """, values,
+                template="(%s::int, %s::int, %s::int, %s::bytea, %s::timestamp, %s::int)",
+                page_size=len(values))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
 
-class Level:
-    def __init__(self, level_num):
-        self.level_num = level_num
-        self.speed = 8 + (level_num - 1) * 2  # Increase speed with level
-        self.walls = self.generate_walls()
-    
-    def generate_walls(self):
-        """Generate walls based on level"""
-        walls = []
-        
-        if self.level_num == 1:
-            # No walls
-            pass
-        
-        elif self.level_num == 2:
-            # Border walls
-            for x in range(GRID_WIDTH):
-                walls.append((x, 0))
-                walls.append((x, GRID_HEIGHT - 1))
-            for y in range(GRID_HEIGHT):
-                walls.append((0, y))
-                walls.append((GRID_WIDTH - 1, y))
-        
-        elif self.level_num == 3:
-            # Cross pattern
-            mid_x = GRID_WIDTH // 2
-            mid_y = GRID_HEIGHT // 2
-            for i in range(5, GRID_WIDTH - 5):
-                walls.append((i, mid_y))
-            for i in range(5, GRID_HEIGHT - 5):
-                walls.append((mid_x, i))
-        
-        elif self.level_num >= 4:
-            # Random obstacles
-            num_walls = 20 + (self.level_num - 4) * 5
-            for _ in range(num_walls):
-                x = random.randint(2, GRID_WIDTH - 3)
-                y = random.randint(2, GRID_HEIGHT - 3)
-                if (x, y) not in walls:
-                    walls.append((x, y))
-        
-        return walls
+    @pooled
+    def top_players(self, limit=10):
+        """[(rank, username, high_score)] for the best `limit` players"""
+        if self.writer:
+            self.writer.flush()
+        self.execute_prepared('top_players', (limit,))
+        return self.cursor.fetchall()
+
+    @pooled
+    def player_rank(self, user_id):
+        """(rank, high_score) of a user, None for an unknown user"""
+        if self.writer:
+            self.writer.flush()
+        self.execute_prepared('player_rank', (user_id,))
+        return self.cursor.fetchone()
+
+    @pooled
+    def players_around(self, user_id, radius=5):
+        """[(rank, username, high_score, is_user)] for the user and up to
+        `radius` players directly above and below"""
+        if self.writer:
+            self.writer.flush()
+        self.execute_prepared('players_around', (user_id, radius, radius))
+        return self.cursor.fetchall()
+
+    def print_leaderboard(self, user_id, limit=5):
+        """Show the top players and the user's neighbourhood"""
+        print("\nLeaderboard:")
+        for rank, username, high_score in self.top_players(limit):
+            print(f"{rank:>6}. {username:<20} {high_score:>8}")
+        print("\nAround you:")
+        for rank, username, high_score, is_user in self.players_around(user_id, 2):
+            marker = "->" if is_user else "  "
+            print(f"{marker}{rank:>4}. {username:<20} {high_score:>8}")
+
+    def close(self):
+        """Flush queued score updates and release the database connection pool"""
+        if self.writer:
+            self.writer.close()
+        if self._owns_pool:
+            release_pool(self.pool)
 
 
 class SnakeGame:
+    """pygame front-end: turns key presses into SnakeSim.turn() and draws the sim"""
+
     def __init__(self, db, user_id, username):
         self.db = db
         self.user_id = user_id
         self.username = username
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption(f"Snake Game - {username}")
-        self.clock = pygame.time.Clock()
         self.font = pygame.font.Font(None, 36)
         self.small_font = pygame.font.Font(None, 24)
+        self.renderer = SnakeRenderer(self.screen, GRID_SIZE, BLACK, GRAY, GREEN, RED)
         
         # Get user stats
         stats = db.get_user_stats(user_id)
-        self.current_level = stats['level']
         self.high_score = stats['high_score']
+        self.sim = SnakeSim(stats['level'], width=GRID_WIDTH, height=GRID_HEIGHT)
+        self.replay = start_replay(self.sim, stats['level'])
         
         # Load saved game state if available
         if stats['game_state']:
             try:
-                saved_state = json.loads(stats['game_state'])
+                saved_state = decode_state(stats['game_state'])
                 self.load_game_state(saved_state)
             except:
                 self.init_game()
-        else:
-            self.init_game()
         
         self.paused = False
+        self.loop = FixedStepLoop(self.sim.level.speed, fps=FPS)
+
+    @property
+    def score(self):
+        return self.sim.score
+
+    @property
+    def current_level(self):
+        return self.sim.current_level
 
     def init_game(self):
-        """Initialize new game"""
-        self.level = Level(self.current_level)
-        self.snake = [(GRID_WIDTH // 2, GRID_HEIGHT // 2)]
-        self.direction = (1, 0)
-        self.next_direction = (1, 0)
-        self.food = self.generate_food()
-        self.score = 0
-        self.game_over = False
-
-    def generate_food(self):
-        """Generate food at random position"""
-        while True:
-            food = (random.randint(0, GRID_WIDTH - 1),
-                   random.randint(0, GRID_HEIGHT - 1))
-            if food not in self.snake and food not in self.level.walls:
-                return food
-
-    def move_snake(self):
-        """Move snake in current direction"""
-        self.direction = self.next_direction
-        head_x, head_y = self.snake[0]
-        new_head = (head_x + self.direction[0], head_y + self.direction[1])
-        
-        # Check collision with walls
-        if new_head in self.level.walls:
-            self.game_over = True
-            return
-        
-        # Check collision with boundaries (level 1 only wraps)
-        if self.current_level == 1:
-            new_head = (new_head[0] % GRID_WIDTH, new_head[1] % GRID_HEIGHT)
-        else:
-            if (new_head[0] < 0 or new_head[0] >= GRID_WIDTH or
-                new_head[1] < 0 or new_head[1] >= GRID_HEIGHT):
-                self.game_over = True
-                return
-        
-        # Check collision with self
-        if new_head in self.snake:
-            self.game_over = True
-            return
-        
-        self.snake.insert(0, new_head)
-        
-        # Check if food eaten
-        if new_head == self.food:
-            self.score += 10
-            self.food = self.generate_food()
-            
-            # Level up every 50 points
-            if self.score % 50 == 0:
-                self.current_level += 1
-                self.level = Level(self.current_level)
-                self.snake = [(GRID_WIDTH // 2, GRID_HEIGHT // 2)]
-                self.direction = (1, 0)
-                self.next_direction = (1, 0)
-        else:
-            self.snake.pop()
+        """Initialize new game (with a fresh seed, so it gets its own replay)"""
+        level = self.sim.current_level
+        self.sim = SnakeSim(level, width=GRID_WIDTH, height=GRID_HEIGHT)
+        self.replay = start_replay(self.sim, level)
 
     def draw(self):
-        """Draw game elements"""
-        self.screen.fill(BLACK)
-        
-        # Draw walls
-        for wall in self.level.walls:
-            rect = pygame.Rect(wall[0] * GRID_SIZE, wall[1] * GRID_SIZE,
-                             GRID_SIZE, GRID_SIZE)
-            pygame.draw.rect(self.screen, GRAY, rect)
+        """Draw game elements (only what changed since the last frame)"""
+        hud = (self.small_font,
+               f"Score: {self.score} | Level: {self.current_level} | High: {self.high_score}",
+               WHITE)
+        overlay = []
+        center = (WIDTH // 2, HEIGHT // 2)
+        below = (WIDTH // 2, HEIGHT // 2 + 40)
         
-        # Draw snake
-        for segment in self.snake:
-            rect = pygame.Rect(segment[0] * GRID_SIZE, segment[1] * GRID_SIZE,
-                             GRID_SIZE - 2, GRID_SIZE - 2)
-            pygame.draw.rect(self.screen, GREEN, rect)
-        
-        # Draw food
-        food_rect = pygame.Rect(self.food[0] * GRID_SIZE, self.food[1] * GRID_SIZE,
-                               GRID_SIZE - 2, GRID_SIZE - 2)
-        pygame.draw.rect(self.screen, RED, food_rect)
-        
-        # Draw score and level
-        score_text = self.small_font.render(
-            f"Score: {self.score} | Level: {self.current_level} | High: {self.high_score}",
-            True, WHITE)
-        self.screen.blit(score_text, (10, 10))
-        
-        # Draw pause message
+        # Pause message
         if self.paused:
-            pause_text = self.font.render("PAUSED", True, WHITE)
-            rect = pause_text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-            self.screen.blit(pause_text, rect)
-            
-            help_text = self.small_font.render("Press P to resume, S to save & quit", 
-                                              True, WHITE)
-            rect2 = help_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 40))
-            self.screen.blit(help_text, rect2)
+            overlay.append((self.font, "PAUSED", WHITE, center))
+            overlay.append((self.small_font, "Press P to resume, S to save & quit", WHITE, below))
         
-        # Draw game over
-        if self.game_over:
-            game_over_text = self.font.render("GAME OVER", True, RED)
-            rect = game_over_text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-            self.screen.blit(game_over_text, rect)
-            
-            restart_text = self.small_font.render("Press R to restart, Q to quit",
-                                                  True, WHITE)
-            rect2 = restart_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 40))
-            self.screen.blit(restart_text, rect2)
+        # Game over (there is no food left once the snake fills the board)
+        if self.sim.game_over:
+            message = "BOARD FULL" if self.sim.board_full else "GAME OVER"
+            overlay.append((self.font, message, RED, center))
+            overlay.append((self.small_font, "Press R to restart, Q to quit", WHITE, below))
         
-        pygame.display.flip()
+        self.renderer.draw(self.sim, hud, overlay)
 
     def get_game_state(self):
         """Get current game state for saving"""
-        return {
-            'snake': self.snake,
-            'direction': self.direction,
-            'food': self.food,
-            'score': self.score,
-            'level': self.current_level
-        }
+        return self.sim.get_state()
 
     def load_game_state(self, state):
         """Load saved game state"""
         try:
-            self.current_level = state.get('level', 1)
-            self.level = Level(self.current_level)
-            self.snake = [tuple(pos) for pos in state.get('snake', [(GRID_WIDTH // 2, GRID_HEIGHT // 2)])]
-            self.direction = tuple(state.get('direction', [1, 0]))
-            self.next_direction = self.direction
-            self.food = tuple(state.get('food', self.generate_food()))
-            self.score = state.get('score', 0)
-            self.game_over = False
+            self.sim.load_state(state)
+            self.replay['start'] = state
         except:
             self.init_game()
 
+    def finish_replay(self):
+        """Replay of the current game as bytes; a copy goes to REPLAY_DIR"""
+        self.replay['ticks'] = self.sim.ticks
+        self.replay['score'] = self.sim.score
+        data = encode_replay(self.replay)
+        try:
+            os.makedirs(REPLAY_DIR, exist_ok=True)
+            path = os.path.join(REPLAY_DIR, f"{self.username}-{self.sim.seed}.snr")
+            with open(path, 'wb') as f:
+                f.write(data)
+        except OSError as e:
+            print(f"Error writing replay: {e}")
+        return data
+
     def save_and_quit(self):
         """Save game state and quit"""
+        # The replay is checked against the save it started from: submit it
+        # before that save is overwritten
+        self.db.update_high_score(self.user_id, self.score, self.finish_replay())
         game_state = self.get_game_state()
         self.db.save_game_state(self.user_id, self.current_level, 
                                self.score, game_state)
-        self.db.update_high_score(self.user_id, self.score)
         return True
 
-    def run(self):
-        """Main game loop"""
-        running = True
-        
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.save_and_quit()
-                    running = False
-                
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_p:
-                        self.paused = not self.paused
-                    
-                    elif event.key == pygame.K_s and self.paused:
-                        if self.save_and_quit():
-                            print("Game saved successfully!")
-                            running = False
-                    
-                    elif self.game_over:
-                        if event.key == pygame.K_r:
-                            self.init_game()
-                        elif event.key == pygame.K_q:
-                            self.db.update_high_score(self.user_id, self.score)
-                            running = False
-                    
-                    elif not self.paused:
-                        if event.key == pygame.K_UP and self.direction != (0, 1):
-                            self.next_direction = (0, -1)
-                        elif event.key == pygame.K_DOWN and self.direction != (0, -1):
-                            self.next_direction = (0, 1)
-                        elif event.key == pygame.K_LEFT and self.direction != (1, 0):
-                            self.next_direction = (-1, 0)
-                        elif event.key == pygame.K_RIGHT and self.direction != (-1, 0):
-                            self.next_direction = (1, 0)
+    def handle_events(self):
+        """Process input once per frame; False ends the game"""
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.save_and_quit()
+                return False
             
-            if not self.paused and not self.game_over:
-                self.move_snake()
-            
-            self.draw()
-            self.clock.tick(self.level.speed)
-        
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_p:
+                    self.paused = not self.paused
+                
+                elif event.key == pygame.K_s and self.paused:
+                    if self.save_and_quit():
+                        print("Game saved successfully!")
+                        return False
+                
+                elif self.sim.game_over:
+                    if event.key == pygame.K_r:
+                        self.finish_replay()
+                        self.init_game()
+                    elif event.key == pygame.K_q:
+                        self.db.update_high_score(self.user_id, self.score,
+                                                  self.finish_replay())
+                        return False
+                
+                elif not self.paused:
+                    direction = KEY_DIRECTIONS.get(event.key)
+                    if direction:
+                        self.sim.turn(direction)
+        return True
+
+    def update(self):
+        """One simulation tick at the level's speed"""
+        if not self.paused:
+            self.sim.step()
+        self.loop.tick_rate = self.sim.level.speed
+
+    def run(self):
+        """Main game loop: the snake moves level.speed times a second while
+        input and drawing run at the display frame rate"""
+        self.loop.run(self.handle_events, self.update, lambda alpha: self.draw())
         return True
 
 
@@ -441,7 +572,8 @@ def main():
         dbname='snake_game_db',
         user='postgres',
         password='your_password',
-        host='localhost'
+        host='localhost',
+        write_behind=True
     )
     
     # Create tables
@@ -474,6 +606,7 @@ def main():
     # Start game
     game = SnakeGame(db, user_id, username)
     game.run()
+    db.print_leaderboard(user_id)
     
     # Close database
     db.close()
@@ -0,0 +1,92 @@
+from replay import HEADER, MAX_TICKS, decode_replay, encode_replay, start_replay, verify_replay
+from snake_sim import DOWN, LEFT, RIGHT, UP, SnakeSim
+
+# Record a few games with SnakeSim, then check verify_replay accepts them
+# and rejects the usual forgeries. Run with pytest or python test_replay.py.
+
+SQUARE = [RIGHT] * 3 + [DOWN] * 3 + [LEFT] * 3 + [UP] * 3
+
+
+def play(sim, replay, ticks):
+    for tick in range(ticks):
+        sim.turn(SQUARE[tick % len(SQUARE)])
+        sim.step()
+    replay['ticks'], replay['score'] = sim.ticks, sim.score
+    return encode_replay(replay)
+
+
+def fresh_game(ticks=500):
+    sim = SnakeSim(1, seed=7)
+    replay = start_replay(sim, 1)
+    return play(sim, replay, ticks), sim
+
+
+def resumed_game(ticks=500):
+    state = {
+        'snake': [(5, 5), (4, 5), (3, 5)],
+        'direction': RIGHT,
+        'food': (10, 10),
+        'score': 40,
+        'level': 1
+    }
+    sim = SnakeSim(1, seed=7)
+    replay = start_replay(sim, 1)
+    sim.load_state(state)
+    replay['start'] = state
+    return play(sim, replay, ticks), sim, state
+
+
+def test_fresh_replay():
+    data, sim = fresh_game()
+    assert not sim.game_over
+    assert verify_replay(data, sim.score)
+    assert not verify_replay(data, sim.score + 10)
+
+
+def test_resumed_replay():
+    data, sim, state = resumed_game()
+    assert not sim.game_over
+    assert sim.score >= 40
+    assert verify_replay(data, sim.score, state)
+    # The start state has to be the one stored for the player
+    assert not verify_replay(data, sim.score)
+    assert not verify_replay(data, sim.score, dict(state, score=0))
+
+
+def test_ticks_after_game_over():
+    sim = SnakeSim(1, seed=7)
+    replay = start_replay(sim, 1)
+    # Turning back into a 5-long body ends the game within a few ticks
+    sim.load_state({'snake': [(5, 5), (4, 5), (3, 5), (2, 5), (1, 5)],
+                    'direction': RIGHT, 'food': (20, 20), 'score': 0, 'level': 1})
+    replay['start'] = sim.get_state()
+    for direction in (UP, LEFT, DOWN):
+        sim.turn(direction)
+        sim.step()
+    assert sim.game_over
+    start = replay['start']
+    replay['ticks'], replay['score'] = sim.ticks, sim.score
+    assert verify_replay(encode_replay(replay), sim.score, start)
+    replay['ticks'] = MAX_TICKS
+    assert not verify_replay(encode_replay(replay), sim.score, start)
+
+
+def test_tick_limit():
+    data, sim = fresh_game(10)
+    fields = list(HEADER.unpack_from(data))
+    fields[7] = MAX_TICKS + 1     # ticks played
+    forged = HEADER.pack(*fields) + data[HEADER.size:]
+    try:
+        decode_replay(forged)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("replay over MAX_TICKS decoded")
+    assert not verify_replay(forged, sim.score)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✓ {name}")
@@ -17,20 +17,26 @@ $$
 language sql;
 """)
 #2 updating if exist inserting if not
+# Rows from before the index (plain INSERTs) may repeat a person: report
+# them and keep the last row of each (highest ctid) so the index can be built
+cur.execute("SELECT to_regclass('phonebook_surname_name_key')")
+if cur.fetchone()[0] is None:
+     cur.execute("""SELECT surname, name, COUNT(*) FROM PhoneBook
+     WHERE surname IS NOT NULL AND name IS NOT NULL
+     GROUP BY surname, name HAVING COUNT(*) > 1""")
+     duplicates=cur.fetchall()
+     for surname, name, count in duplicates:
+          print(f"Duplicate contact {surname} {name}: {count} rows, keeping one")
+     if duplicates:
+          cur.execute("""DELETE FROM PhoneBook p USING PhoneBook newer
+          WHERE p.surname=newer.surname AND p.name=newer.name AND p.ctid<newer.ctid""")
+cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS phonebook_surname_name_key ON PhoneBook (surname, name)")
 cur.execute("""CREATE OR REPLACE PROCEDURE insert_to_pb(a character varying, b character varying, c integer)
 LANGUAGE plpgsql
 AS $$
-DECLARE v_exists INTEGER;
 BEGIN
-    SELECT into v_exists (SELECT count(*) FROM public.PhoneBook WHERE name = b AND surname=a);
-    IF v_exists=0 THEN
-        INSERT INTO public.PhoneBook (surname, name, number) values(a, b, c);
-    END IF;
-	IF v_exists IS NOT NULL THEN
-        UPDATE public.PhoneBook
-		SET number = c
-		WHERE surname = a AND name=b;
-    END IF;
+    INSERT INTO public.PhoneBook (surname, name, number) values(a, b, c)
+    ON CONFLICT (surname, name) DO UPDATE SET number = EXCLUDED.number;
 END;
 $$;
 """)
@@ -47,7 +53,8 @@ BEGIN
    FOREACH m SLICE 1 IN ARRAY arr
    LOOP
       SELECT INTO num CAST(m[3] AS INTEGER);
-      INSERT INTO PhoneBook (surname, name, number) values(m[1],m[2],num);
+      INSERT INTO PhoneBook (surname, name, number) values(m[1],m[2],num)
+      ON CONFLICT (surname, name) DO UPDATE SET number = EXCLUDED.number;
    END LOOP;
 END
 $$;""")
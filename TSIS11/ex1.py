@@ -1,65 +1,70 @@
+import os
+import sys
+
 import psycopg2 as pgsql
 
+from query_builder import PREFIX_INDEXES, PhoneBookQuery
+
+# Prepared statement registry lives next to PhoneBook in TSIS10
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'TSIS10'))
+from db_pool import PreparedStatements
+
 connection=pgsql.connect(host="localhost", dbname="postgres", user="postgres", password="MyNewPassword123!", port=5432)
 cur=connection.cursor()
+# (surname, name) identifies a person, insert() upserts on it
+# Rows from before the index (plain INSERTs) may repeat a person: report
+# them and keep the last row of each (highest ctid) so the index can be built
+cur.execute("SELECT to_regclass('phonebook_surname_name_key')")
+if cur.fetchone()[0] is None:
+     cur.execute("""SELECT surname, name, COUNT(*) FROM PhoneBook
+     WHERE surname IS NOT NULL AND name IS NOT NULL
+     GROUP BY surname, name HAVING COUNT(*) > 1""")
+     duplicates=cur.fetchall()
+     for surname, name, count in duplicates:
+          print(f"Duplicate contact {surname} {name}: {count} rows, keeping one")
+     if duplicates:
+          cur.execute("""DELETE FROM PhoneBook p USING PhoneBook newer
+          WHERE p.surname=newer.surname AND p.name=newer.name AND p.ctid<newer.ctid""")
+cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS phonebook_surname_name_key ON PhoneBook (surname, name)")
+for index in PREFIX_INDEXES:
+     cur.execute(index)
+statements=PreparedStatements("ex1")
+
+
+MATCHES={1:"equals", 2:"prefix", 3:"suffix", 4:"contains"}
+
+
+def execute(name, query, params):
+    # every query shape is PREPAREd once and then only EXECUTEd with new values
+    if name not in statements:
+         statements.register(name, query.as_string(connection))
+    statements.execute(cur, name, params)
 
 
 def createpattern():
-    global query
-    query="""SELECT * FROM PhoneBook
-    WHERE """
     print(r"Do you want to search by surname(0)/name(1)/break(any num) enter the number:")
     mode=int(input())
     if mode==0:
-            query+="surname"
-            print("Enter string")
-            substr=input()
-            print("""Select option:
-            1-surname is equal to string
-            2-surname starts with the string
-            3-surname ends with the string
-            4-surname contains the string""")
-            mode1=int(input())
-            if mode1==1:
-                query+="='{}'".format(substr)
-            elif mode1==2:
-                query+=" iLIKE '{}%'".format(substr)
-            elif mode1==3:
-                query+=" iLIKE '%{}'".format(substr)
-            else:
-                query+=" iLIKE '%{}%'".format(substr)
+         field="surname"
     elif mode==1:
-            query+="""name"""
-            print("Enter string")
-            substr=input()
-            print("""Select option:
-            1-name is equal to string
-            2-name starts with the string
-            3-name ends with the string
-            4-name contains the string""")
-            mode1=int(input())
-            if mode1==1:
-                query+="='{}'".format(substr)
-            elif mode1==2:
-                query+=" iLIKE '{}%'".format(substr)
-            elif mode1==3:
-                query+=" iLIKE '%{}'".format(substr)
-            else:
-                query+=" iLIKE '%{}%'".format(substr)
+         field="name"
     else:
-         return "error"
-    return query
+         return None
+    print("Enter string")
+    substr=input()
+    print("""Select option:
+            1-{0} is equal to string
+            2-{0} starts with the string
+            3-{0} ends with the string
+            4-{0} contains the string""".format(field))
+    mode1=int(input())
+    return PhoneBookQuery().where(field, substr, MATCHES.get(mode1, "contains"))
 
 
 def insert(surname, name, phone):
-    cur.execute("SELECT count(*) FROM PhoneBook WHERE surname='{}' AND name='{}'".format(surname, name))
-    if cur.fetchone()[0]==0:
-         cur.execute("""INSERT INTO PhoneBook VALUES ('{}','{}', {})""".format(surname, name, phone))
-    else:
-         cur.execute("""UPDATE PhoneBook
-         SET number={}
-         WHERE surname='{}' AND name='{}'
-         """.format(phone,surname, name))
+    # one atomic statement: no window between the lookup and the write
+    cur.execute("""INSERT INTO PhoneBook (surname, name, number) VALUES (%s, %s, %s)
+    ON CONFLICT (surname, name) DO UPDATE SET number=EXCLUDED.number""", (surname, name, phone))
 
 def loopinsert():
     banned=[]
@@ -87,54 +92,47 @@ def loopinsert():
 
 def pagination():
     query=createpattern()
-    if query=="error":
-        return "error"
+    if query is None:
+        return None
+    query.order_by("surname", "name")
     print("Need offset? yes/no:")
     mode=input()
     if mode=="yes":
          print("Enter offset:")
-         offset=int(input())
-         query+=" OFFSET {}".format(offset)
+         query.offset(int(input()))
     print("Need limit? yes/no:")
     mode=input()
     if mode=="yes":
          print("Enter limit:")
-         limit=int(input())
-         query+=" LIMIT {}".format(limit)
-    query +=";"
+         query.limit(int(input()))
     return query
 
 def delete():
-    query="""DELETE FROM PhoneBook
-    WHERE """
     cur.execute("SELECT * from PhoneBook")
     print(cur.fetchall())
     print("Do you wanna delete by surname(0)/name(1)/number(2) enter the number")
     mode=int(input())
     if mode==0:
          print("Enter surname to delete:")
-         surname=input()
-         query+="surname='{}'".format(surname)
+         query=PhoneBookQuery().where("surname", input())
     elif mode==1:
          print("Enter name to delete:")
-         name=input()
-         query+="name='{}'".format(name)
+         query=PhoneBookQuery().where("name", input())
     else:
          print("Enter number to delete:")
-         number=input()
-         query+="number={}".format(number)
-    cur.execute(query)
+         query=PhoneBookQuery().where("number", input())
+    execute(query.key("delete"), *query.delete())
          
 
-s1=createpattern()
-if s1!="error":
-     cur.execute(s1+";")
+q1=createpattern()
+if q1 is not None:
+     execute(q1.key(), *q1.select())
      print(cur.fetchall())
 insert("Berik", "Serik", 12345)
 loopinsert()
-s1=pagination()
-if s1!="error":
-     cur.execute(s1+";")
+q1=pagination()
+if q1 is not None:
+     execute(q1.key(), *q1.select())
      print(cur.fetchall())
 delete()
 
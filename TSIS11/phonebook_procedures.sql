@@ -5,6 +5,64 @@
 -- Connect to phonebook_db
 \c phonebook_db
 
+
+-- ============================================================================
+-- SCHEMA: Trigram indexes for pattern and similarity search
+-- ============================================================================
+-- GIN trigram indexes serve ILIKE '%x%' (3+ characters) as well as the
+-- similarity operators used by search_contacts_ranked
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_users_first_name_trgm ON users USING gin (first_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_last_name_trgm ON users USING gin (last_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_email_trgm ON users USING gin (email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_phones_number_trgm ON phones USING gin (phone_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_phones_user_id ON phones (user_id);
+
+-- ============================================================================
+-- SCHEMA: Natural keys for upserts
+-- ============================================================================
+-- A contact is identified by (first_name, last_name) and has at most one
+-- primary phone. These are the conflict targets of upsert_user_phone and
+-- upsert_users_phones; without them concurrent callers could both miss the
+-- lookup and insert the same person twice.
+-- Databases created before these keys may hold duplicates:
+-- * extra primary phones are demoted (the oldest phone stays primary);
+-- * duplicate names are reported and left alone, since merging people is a
+--   manual decision; uq_users_full_name is created once they are merged
+--   (re-run this file), until then the upsert functions fail.
+
+UPDATE phones p SET is_primary = FALSE
+WHERE p.is_primary AND EXISTS (
+    SELECT 1 FROM phones o
+    WHERE o.user_id = p.user_id AND o.is_primary AND o.phone_id < p.phone_id
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_phones_primary ON phones (user_id) WHERE is_primary;
+
+DO $$
+DECLARE
+    dup RECORD;
+    dup_count INTEGER := 0;
+BEGIN
+    FOR dup IN
+        SELECT first_name, last_name, array_agg(user_id ORDER BY user_id) AS user_ids
+        FROM users
+        GROUP BY first_name, last_name
+        HAVING COUNT(*) > 1
+    LOOP
+        dup_count := dup_count + 1;
+        RAISE NOTICE 'Duplicate contact % % (user_id %)', dup.first_name, dup.last_name, dup.user_ids;
+    END LOOP;
+
+    IF dup_count = 0 THEN
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_users_full_name ON users (first_name, last_name);
+    ELSE
+        RAISE WARNING 'uq_users_full_name not created: % duplicate name(s) must be merged first', dup_count;
+    END IF;
+END $$;
+
 -- ============================================================================
 -- 1. FUNCTION: Search records by pattern
 -- ============================================================================
@@ -20,22 +78,37 @@ RETURNS TABLE (
     phone_type VARCHAR(20)
 ) AS $$
 BEGIN
+    -- One branch per table so each side can use its trigram indexes
+    -- instead of filtering the whole users/phones join
     RETURN QUERY
-    SELECT 
-        u.user_id,
-        u.first_name,
-        u.last_name,
-        u.email,
-        p.phone_number,
-        p.phone_type
-    FROM users u
-    LEFT JOIN phones p ON u.user_id = p.user_id
-    WHERE 
-        u.first_name ILIKE '%' || search_pattern || '%'
-        OR u.last_name ILIKE '%' || search_pattern || '%'
-        OR u.email ILIKE '%' || search_pattern || '%'
-        OR p.phone_number ILIKE '%' || search_pattern || '%'
-    ORDER BY u.last_name, u.first_name;
+    SELECT m.user_id, m.first_name, m.last_name, m.email, m.phone_number, m.phone_type
+    FROM (
+        SELECT 
+            u.user_id,
+            u.first_name,
+            u.last_name,
+            u.email,
+            p.phone_number,
+            p.phone_type
+        FROM users u
+        LEFT JOIN phones p ON u.user_id = p.user_id
+        WHERE 
+            u.first_name ILIKE '%' || search_pattern || '%'
+            OR u.last_name ILIKE '%' || search_pattern || '%'
+            OR u.email ILIKE '%' || search_pattern || '%'
+        UNION
+        SELECT 
+            u.user_id,
+            u.first_name,
+            u.last_name,
+            u.email,
+            p.phone_number,
+            p.phone_type
+        FROM phones p
+        JOIN users u ON u.user_id = p.user_id
+        WHERE p.phone_number ILIKE '%' || search_pattern || '%'
+    ) m
+    ORDER BY m.last_name, m.first_name;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -48,7 +121,9 @@ $$ LANGUAGE plpgsql;
 -- ============================================================================
 -- 2. PROCEDURE: Insert new user or update phone if exists
 -- ============================================================================
--- If user exists, updates their primary phone; otherwise creates new user
+-- If user exists, updates their primary phone; otherwise creates new user.
+-- Both steps are INSERT ... ON CONFLICT on the natural keys, chained in one
+-- statement, so concurrent callers can neither race nor duplicate a contact.
 
 CREATE OR REPLACE PROCEDURE upsert_user_phone(
     p_first_name VARCHAR(50),
@@ -61,49 +136,30 @@ LANGUAGE plpgsql
 AS $$
 DECLARE
     v_user_id INTEGER;
-    v_phone_id INTEGER;
+    v_created BOOLEAN;
 BEGIN
-    -- Check if user exists by first name and last name
-    SELECT user_id INTO v_user_id
-    FROM users
-    WHERE first_name = p_first_name AND last_name = p_last_name
-    LIMIT 1;
-    
-    IF v_user_id IS NULL THEN
-        -- User doesn't exist, create new user
+    WITH u AS (
+        -- The no-op update locks the existing row and makes RETURNING see it
         INSERT INTO users (first_name, last_name, email)
         VALUES (p_first_name, p_last_name, p_email)
-        RETURNING user_id INTO v_user_id;
-        
-        -- Insert phone number
+        ON CONFLICT (first_name, last_name)
+        DO UPDATE SET first_name = EXCLUDED.first_name
+        RETURNING user_id, (xmax = 0) AS created
+    ), p AS (
         INSERT INTO phones (user_id, phone_number, phone_type, is_primary)
-        VALUES (v_user_id, p_phone_number, p_phone_type, TRUE);
-        
+        SELECT user_id, p_phone_number, p_phone_type, TRUE FROM u
+        ON CONFLICT (user_id) WHERE is_primary
+        DO UPDATE SET phone_number = EXCLUDED.phone_number,
+                      phone_type = EXCLUDED.phone_type
+    )
+    SELECT user_id, created INTO v_user_id, v_created FROM u;
+    
+    IF v_created THEN
         RAISE NOTICE 'New user created: % % (ID: %)', p_first_name, p_last_name, v_user_id;
     ELSE
-        -- User exists, update their primary phone
-        SELECT phone_id INTO v_phone_id
-        FROM phones
-        WHERE user_id = v_user_id AND is_primary = TRUE
-        LIMIT 1;
-        
-        IF v_phone_id IS NOT NULL THEN
-            -- Update existing primary phone
-            UPDATE phones
-            SET phone_number = p_phone_number, phone_type = p_phone_type
-            WHERE phone_id = v_phone_id;
-            
-            RAISE NOTICE 'Phone updated for user: % % (ID: %)', p_first_name, p_last_name, v_user_id;
-        ELSE
-            -- No primary phone exists, insert new one
-            INSERT INTO phones (user_id, phone_number, phone_type, is_primary)
-            VALUES (v_user_id, p_phone_number, p_phone_type, TRUE);
-            
-            RAISE NOTICE 'Phone added for user: % % (ID: %)', p_first_name, p_last_name, v_user_id;
-        END IF;
+        RAISE NOTICE 'Phone updated for user: % % (ID: %)', p_first_name, p_last_name, v_user_id;
     END IF;
-    
-    COMMIT;
+    -- No COMMIT here: clients CALL this inside their own transaction
 END;
 $$;
 
@@ -112,6 +168,61 @@ $$;
 -- CALL upsert_user_phone('John', 'Doe', 'john@example.com', '+77779999999', 'work');
 
 
+-- ============================================================================
+-- 2b. FUNCTION: Upsert many users and primary phones in one statement
+-- ============================================================================
+-- Batched upsert_user_phone. When a name occurs several times in the batch
+-- the last occurrence wins (one row cannot be upserted twice per statement).
+-- Rows are written in natural-key order, so concurrent batches lock the same
+-- contacts in the same order and cannot deadlock each other.
+
+CREATE OR REPLACE FUNCTION upsert_users_phones(
+    p_users JSONB  -- Format: '[{"first_name": ..., "last_name": ..., "email": ..., "phone_number": ..., "phone_type": ...}, ...]'
+)
+RETURNS TABLE (
+    users_created INTEGER,
+    users_updated INTEGER
+) AS $$
+    WITH batch AS (
+        SELECT DISTINCT ON (r.first_name, r.last_name)
+            r.first_name,
+            r.last_name,
+            r.email,
+            r.phone_number,
+            COALESCE(r.phone_type, 'mobile') AS phone_type
+        FROM ROWS FROM (
+            jsonb_to_recordset(p_users)
+            AS (first_name VARCHAR(50), last_name VARCHAR(50), email VARCHAR(100),
+                phone_number VARCHAR(20), phone_type VARCHAR(20))
+        ) WITH ORDINALITY AS r(first_name, last_name, email, phone_number, phone_type, ord)
+        ORDER BY r.first_name, r.last_name, r.ord DESC
+    ), u AS (
+        INSERT INTO users (first_name, last_name, email)
+        SELECT first_name, last_name, email FROM batch
+        ORDER BY first_name, last_name
+        ON CONFLICT (first_name, last_name)
+        DO UPDATE SET first_name = EXCLUDED.first_name
+        RETURNING user_id, first_name, last_name, (xmax = 0) AS created
+    ), p AS (
+        INSERT INTO phones (user_id, phone_number, phone_type, is_primary)
+        SELECT u.user_id, b.phone_number, b.phone_type, TRUE
+        FROM u
+        JOIN batch b ON b.first_name = u.first_name AND b.last_name = u.last_name
+        ORDER BY u.user_id
+        ON CONFLICT (user_id) WHERE is_primary
+        DO UPDATE SET phone_number = EXCLUDED.phone_number,
+                      phone_type = EXCLUDED.phone_type
+    )
+    SELECT (COUNT(*) FILTER (WHERE created))::INTEGER,
+           (COUNT(*) FILTER (WHERE NOT created))::INTEGER
+    FROM u;
+$$ LANGUAGE sql;
+
+-- Usage example:
+-- SELECT * FROM upsert_users_phones('[{"first_name": "John", "last_name": "Doe", "phone_number": "+77771234567"},
+--                                     {"first_name": "Jane", "last_name": "Doe", "phone_number": "+77772345678", "phone_type": "work"}]');
+
+
 -- ============================================================================
 -- 3. PROCEDURE: Insert multiple users with validation
 -- ============================================================================
@@ -195,6 +306,12 @@ BEGIN
             v_error_message := 'Phone number already exists';
         END IF;
         
+        -- Check if contact already exists (use upsert_user_phone to update it)
+        IF EXISTS (SELECT 1 FROM users WHERE first_name = v_first_name AND last_name = v_last_name) THEN
+            v_is_valid := FALSE;
+            v_error_message := 'Contact already exists';
+        END IF;
+        
         -- Insert or log error
         IF v_is_valid THEN
             -- Insert user
@@ -235,15 +352,131 @@ $$;
 -- SELECT * FROM invalid_phones_log ORDER BY logged_at DESC;
 
 
+-- ============================================================================
+-- 3b. PROCEDURE: Set-based bulk insert from a JSON array
+-- ============================================================================
+-- Same validation rules as insert_multiple_users, but all records are checked
+-- in one pass and written with one INSERT ... SELECT per table.
+-- The caller commits (no COMMIT inside, so it can run in a client transaction).
+
+CREATE OR REPLACE PROCEDURE insert_users_json(
+    p_users JSONB  -- Format: '[{"first_name": ..., "last_name": ..., "email": ..., "phone_number": ..., "phone_type": ...}, ...]'
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_success_count INTEGER;
+    v_error_count INTEGER;
+BEGIN
+    -- Clear previous invalid logs
+    DELETE FROM invalid_phones_log WHERE logged_at < NOW() - INTERVAL '1 hour';
+    
+    DROP TABLE IF EXISTS pg_temp.users_batch;
+    CREATE TEMP TABLE users_batch ON COMMIT DROP AS
+    SELECT 
+        r.ord,
+        NULLIF(trim(r.first_name), '') AS first_name,
+        NULLIF(trim(r.last_name), '') AS last_name,
+        NULLIF(trim(r.email), '') AS email,
+        NULLIF(trim(r.phone_number), '') AS phone_number,
+        COALESCE(NULLIF(trim(r.phone_type), ''), 'mobile') AS phone_type,
+        NULL::INTEGER AS user_id,
+        NULL::TEXT AS error_message
+    FROM ROWS FROM (
+        jsonb_to_recordset(p_users)
+        AS (first_name TEXT, last_name TEXT, email TEXT, phone_number TEXT, phone_type TEXT)
+    ) WITH ORDINALITY AS r(first_name, last_name, email, phone_number, phone_type, ord);
+    
+    -- Validate everything in one pass; later checks win, as in insert_multiple_users
+    UPDATE users_batch b SET error_message = CASE
+        WHEN b.first_name IS NULL OR b.last_name IS NULL OR b.phone_number IS NULL
+            THEN 'Invalid data format'
+        WHEN length(b.first_name) > 50 OR length(b.last_name) > 50 OR length(b.email) > 100
+            THEN 'Invalid data format'
+        WHEN d.name_rank > 1 OR EXISTS (
+                SELECT 1 FROM users u
+                WHERE u.first_name = b.first_name AND u.last_name = b.last_name)
+            THEN 'Contact already exists'
+        -- users.email is UNIQUE: repeats in the batch (any case) or stored already
+        WHEN b.email IS NOT NULL AND (d.email_rank > 1 OR EXISTS (
+                SELECT 1 FROM users u WHERE u.email = b.email))
+            THEN 'Email already exists'
+        WHEN d.phone_rank > 1 OR EXISTS (SELECT 1 FROM phones p WHERE p.phone_number = b.phone_number)
+            THEN 'Phone number already exists'
+        WHEN length(b.phone_number) < 10
+            THEN 'Phone number too short (minimum 10 digits)'
+        WHEN b.phone_number !~ '^\+?[0-9]{10,15}$'
+            THEN 'Invalid phone format (should be +XXXXXXXXXXX)'
+    END
+    FROM (
+        SELECT ord,
+               ROW_NUMBER() OVER (PARTITION BY phone_number ORDER BY ord) AS phone_rank,
+               ROW_NUMBER() OVER (PARTITION BY first_name, last_name ORDER BY ord) AS name_rank,
+               ROW_NUMBER() OVER (PARTITION BY lower(email) ORDER BY ord) AS email_rank
+        FROM users_batch
+    ) d
+    WHERE b.ord = d.ord;
+    
+    -- Log every invalid record with a single statement
+    INSERT INTO invalid_phones_log (first_name, last_name, phone_number, error_message)
+    SELECT 
+        COALESCE(left(first_name, 50), 'UNKNOWN'),
+        COALESCE(left(last_name, 50), 'UNKNOWN'),
+        COALESCE(left(phone_number, 20), 'UNKNOWN'),
+        error_message
+    FROM users_batch
+    WHERE error_message IS NOT NULL
+    ORDER BY ord;
+    GET DIAGNOSTICS v_error_count = ROW_COUNT;
+    
+    -- Pre-allocate ids so phones can reference users without RETURNING per row
+    UPDATE users_batch
+    SET user_id = nextval(pg_get_serial_sequence('users', 'user_id'))
+    WHERE error_message IS NULL;
+    
+    INSERT INTO users (user_id, first_name, last_name, email)
+    SELECT user_id, first_name, last_name, email
+    FROM users_batch
+    WHERE user_id IS NOT NULL
+    ORDER BY ord;
+    GET DIAGNOSTICS v_success_count = ROW_COUNT;
+    
+    INSERT INTO phones (user_id, phone_number, phone_type, is_primary)
+    SELECT user_id, phone_number, left(phone_type, 20), TRUE
+    FROM users_batch
+    WHERE user_id IS NOT NULL
+    ORDER BY ord;
+    
+    -- Summary
+    RAISE NOTICE '========================================';
+    RAISE NOTICE 'Insertion complete!';
+    RAISE NOTICE 'Successfully inserted: % users', v_success_count;
+    RAISE NOTICE 'Failed (invalid): % records', v_error_count;
+    RAISE NOTICE 'Check invalid_phones_log table for details';
+    RAISE NOTICE '========================================';
+END;
+$$;
+
+-- Usage example:
+-- CALL insert_users_json('[{"first_name": "Alice", "last_name": "Smith", "email": "alice@mail.com", "phone_number": "+77771111111"},
+--                          {"first_name": "Invalid", "last_name": "User", "phone_number": "123"}]');
+-- SELECT * FROM invalid_phones_log ORDER BY logged_at DESC;
+
+
 -- ============================================================================
 -- 4. FUNCTION: Query with pagination
 -- ============================================================================
--- Returns paginated results from users and phones tables
+-- Returns paginated results from users and phones tables.
+-- total_count comes from the trigger-maintained counter (p_exact_count) or
+-- from the planner estimate, never from a COUNT over users per page.
+
+DROP FUNCTION IF EXISTS get_contacts_paginated(INTEGER, INTEGER, VARCHAR);
 
 CREATE OR REPLACE FUNCTION get_contacts_paginated(
     p_limit INTEGER DEFAULT 10,
     p_offset INTEGER DEFAULT 0,
-    p_order_by VARCHAR DEFAULT 'last_name'  -- Options: 'last_name', 'first_name', 'created_at'
+    p_order_by VARCHAR DEFAULT 'last_name',  -- Options: 'last_name', 'first_name', 'created_at'
+    p_exact_count BOOLEAN DEFAULT TRUE
 )
 RETURNS TABLE (
     user_id INTEGER,
@@ -255,12 +488,10 @@ RETURNS TABLE (
     created_at TIMESTAMP,
     total_count BIGINT
 ) AS $$
+DECLARE
+    v_total BIGINT := get_contacts_count(p_exact_count);
 BEGIN
     RETURN QUERY
-    WITH total AS (
-        SELECT COUNT(DISTINCT u.user_id) as cnt
-        FROM users u
-    )
     SELECT 
         u.user_id,
         u.first_name,
@@ -269,10 +500,9 @@ BEGIN
         p.phone_number,
         p.phone_type,
         u.created_at,
-        t.cnt as total_count
+        v_total as total_count
     FROM users u
     LEFT JOIN phones p ON u.user_id = p.user_id
-    CROSS JOIN total t
     ORDER BY 
         CASE 
             WHEN p_order_by = 'last_name' THEN u.last_name
@@ -289,6 +519,83 @@ $$ LANGUAGE plpgsql;
 -- SELECT * FROM get_contacts_paginated(5, 0);  -- First 5 records
 -- SELECT * FROM get_contacts_paginated(5, 5);  -- Next 5 records (page 2)
 -- SELECT * FROM get_contacts_paginated(10, 0, 'first_name');  -- Order by first name
+-- SELECT * FROM get_contacts_paginated(10, 0, 'last_name', FALSE);  -- Approximate total
+
+
+-- ============================================================================
+-- 4b. FUNCTION: Keyset (cursor) pagination
+-- ============================================================================
+-- Returns the page of contacts that comes after the given sort key instead of
+-- skipping OFFSET rows, so every page is an index range scan of p_limit users.
+-- Pass NULL p_after_user_id for the first page; for the next page pass the
+-- sort columns and user_id of the last row returned.
+
+CREATE INDEX IF NOT EXISTS idx_users_last_first_id ON users (last_name, first_name, user_id);
+CREATE INDEX IF NOT EXISTS idx_users_first_last_id ON users (first_name, last_name, user_id);
+CREATE INDEX IF NOT EXISTS idx_users_created_id ON users (created_at, user_id);
+
+CREATE OR REPLACE FUNCTION get_contacts_keyset(
+    p_limit INTEGER DEFAULT 10,
+    p_order_by VARCHAR DEFAULT 'last_name',  -- Options: 'last_name', 'first_name', 'created_at'
+    p_after_user_id INTEGER DEFAULT NULL,
+    p_after_first_name VARCHAR DEFAULT NULL,
+    p_after_last_name VARCHAR DEFAULT NULL,
+    p_after_created_at TIMESTAMP DEFAULT NULL
+)
+RETURNS TABLE (
+    user_id INTEGER,
+    first_name VARCHAR(50),
+    last_name VARCHAR(50),
+    email VARCHAR(100),
+    phone_number VARCHAR(20),
+    phone_type VARCHAR(20),
+    created_at TIMESTAMP
+) AS $$
+DECLARE
+    sort_columns TEXT;
+    after_values TEXT;
+    page_filter TEXT := '';
+BEGIN
+    -- Sort key per order, each matching its composite index; USING passes
+    -- $1 limit, $2 user_id, $3 first_name, $4 last_name, $5 created_at
+    IF p_order_by = 'first_name' THEN
+        sort_columns := 'first_name, last_name, user_id';
+        after_values := '$3, $4, $2';
+    ELSIF p_order_by = 'created_at' THEN
+        sort_columns := 'created_at, user_id';
+        after_values := '$5, $2';
+    ELSE
+        sort_columns := 'last_name, first_name, user_id';
+        after_values := '$4, $3, $2';
+    END IF;
+
+    -- The first page and the pages after a cursor are separate statements.
+    -- A static "p_after_user_id IS NULL OR (key) > (cursor)" ends up in a
+    -- cached generic plan that filters instead of seeking; EXECUTE plans
+    -- each page with its cursor, so the row comparison is an index range seek.
+    IF p_after_user_id IS NOT NULL THEN
+        page_filter := format('WHERE (%s) > (%s)', sort_columns, after_values);
+    END IF;
+
+    RETURN QUERY EXECUTE format('
+        SELECT u.user_id, u.first_name, u.last_name, u.email,
+               p.phone_number, p.phone_type, u.created_at
+        FROM (
+            SELECT * FROM users
+            %s
+            ORDER BY %s
+            LIMIT $1
+        ) u
+        LEFT JOIN phones p ON u.user_id = p.user_id
+        ORDER BY %s',
+        page_filter, sort_columns, 'u.' || replace(sort_columns, ', ', ', u.'))
+    USING p_limit, p_after_user_id, p_after_first_name, p_after_last_name, p_after_created_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Usage examples:
+-- SELECT * FROM get_contacts_keyset(5);  -- First 5 contacts
+-- SELECT * FROM get_contacts_keyset(5, 'last_name', 42, 'Alice', 'Johnson');  -- Page after Johnson Alice (ID 42)
 
 
 -- ============================================================================
@@ -352,17 +659,164 @@ $$;
 -- CALL delete_contact(p_first_name => 'John', p_last_name => 'Doe');
 
 
+-- ============================================================================
+-- 6. FUNCTION: Ranked similarity search
+-- ============================================================================
+-- Fuzzy search over name, email and phone number using pg_trgm word
+-- similarity; best matches first. Served by the trigram GIN indexes above.
+
+CREATE OR REPLACE FUNCTION search_contacts_ranked(
+    search_text VARCHAR,
+    p_limit INTEGER DEFAULT 20
+)
+RETURNS TABLE (
+    user_id INTEGER,
+    first_name VARCHAR(50),
+    last_name VARCHAR(50),
+    email VARCHAR(100),
+    phone_number VARCHAR(20),
+    phone_type VARCHAR(20),
+    similarity_score REAL
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH matches AS (
+        SELECT 
+            u.user_id AS match_user_id,
+            GREATEST(
+                word_similarity(search_text, u.first_name),
+                word_similarity(search_text, u.last_name),
+                COALESCE(word_similarity(search_text, u.email), 0)
+            ) AS score
+        FROM users u
+        WHERE search_text <% u.first_name
+           OR search_text <% u.last_name
+           OR search_text <% u.email
+        UNION ALL
+        SELECT p.user_id, word_similarity(search_text, p.phone_number)
+        FROM phones p
+        WHERE search_text <% p.phone_number
+    ),
+    best AS (
+        SELECT m.match_user_id, MAX(m.score) AS score
+        FROM matches m
+        GROUP BY m.match_user_id
+        ORDER BY score DESC
+        LIMIT p_limit
+    )
+    SELECT 
+        u.user_id,
+        u.first_name,
+        u.last_name,
+        u.email,
+        p.phone_number,
+        p.phone_type,
+        b.score
+    FROM best b
+    JOIN users u ON u.user_id = b.match_user_id
+    LEFT JOIN phones p ON u.user_id = p.user_id
+    ORDER BY b.score DESC, u.last_name, u.first_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Usage example:
+-- SELECT * FROM search_contacts_ranked('jonh');      -- typo still finds John
+-- SELECT * FROM search_contacts_ranked('gmail', 5);
+
+
+-- ============================================================================
+-- HELPER: Cached contacts counter
+-- ============================================================================
+-- Single-row counter kept up to date by statement-level triggers on users,
+-- so reading the total is O(1) instead of a full COUNT(*)
+
+CREATE TABLE IF NOT EXISTS contacts_counter (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    total BIGINT NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION contacts_counter_on_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE contacts_counter SET total = total + (SELECT COUNT(*) FROM new_rows);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION contacts_counter_on_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE contacts_counter SET total = total - (SELECT COUNT(*) FROM old_rows);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION contacts_counter_on_truncate()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE contacts_counter SET total = 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Seed the counter and attach the triggers atomically
+BEGIN;
+LOCK TABLE users IN SHARE ROW EXCLUSIVE MODE;
+
+INSERT INTO contacts_counter (id, total)
+SELECT TRUE, COUNT(*) FROM users
+ON CONFLICT (id) DO UPDATE SET total = EXCLUDED.total;
+
+DROP TRIGGER IF EXISTS trg_contacts_counter_insert ON users;
+CREATE TRIGGER trg_contacts_counter_insert
+AFTER INSERT ON users
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION contacts_counter_on_insert();
+
+DROP TRIGGER IF EXISTS trg_contacts_counter_delete ON users;
+CREATE TRIGGER trg_contacts_counter_delete
+AFTER DELETE ON users
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION contacts_counter_on_delete();
+
+DROP TRIGGER IF EXISTS trg_contacts_counter_truncate ON users;
+CREATE TRIGGER trg_contacts_counter_truncate
+AFTER TRUNCATE ON users
+FOR EACH STATEMENT EXECUTE FUNCTION contacts_counter_on_truncate();
+COMMIT;
+
+-- Exact count from the counter, or the planner's estimate (pg_class.reltuples)
+-- when p_exact is FALSE; falls back to the counter if users was never analyzed
+CREATE OR REPLACE FUNCTION get_contacts_count(p_exact BOOLEAN DEFAULT TRUE)
+RETURNS BIGINT AS $$
+DECLARE
+    v_count BIGINT;
+BEGIN
+    IF NOT p_exact THEN
+        SELECT reltuples::BIGINT INTO v_count
+        FROM pg_class
+        WHERE oid = 'users'::regclass;
+        IF v_count >= 0 THEN
+            RETURN v_count;
+        END IF;
+    END IF;
+    SELECT total INTO v_count FROM contacts_counter;
+    RETURN COALESCE(v_count, 0);
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Usage: SELECT get_contacts_count();        -- exact
+--        SELECT get_contacts_count(FALSE);   -- approximate
+
+
 -- ============================================================================
 -- HELPER FUNCTION: Get total contacts count
 -- ============================================================================
 
 CREATE OR REPLACE FUNCTION get_total_contacts_count()
 RETURNS INTEGER AS $$
-DECLARE
-    v_count INTEGER;
 BEGIN
-    SELECT COUNT(*) INTO v_count FROM users;
-    RETURN v_count;
+    RETURN get_contacts_count(TRUE)::INTEGER;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -396,13 +850,18 @@ $$ LANGUAGE plpgsql;
 
 -- Test 3: Insert multiple users
 -- CALL insert_multiple_users('Alice,Smith,alice@mail.com,+77771111111;Bob,Jones,bob@mail.com,+77772222222;Charlie,Brown,charlie@mail.com,+77773333333');
+-- CALL insert_users_json('[{"first_name": "Dana", "last_name": "Abenova", "phone_number": "+77774444444"}]');
 
 -- Test 4: Pagination
 -- SELECT * FROM get_contacts_paginated(5, 0);
+-- SELECT * FROM get_contacts_keyset(5);
 
 -- Test 5: Delete contact
 -- CALL delete_contact(p_first_name => 'Test', p_last_name => 'User');
 
+-- Test 6: Ranked similarity search
+-- SELECT * FROM search_contacts_ranked('alic');
+
 -- View invalid phones log
 -- SELECT * FROM invalid_phones_log ORDER BY logged_at DESC;
 
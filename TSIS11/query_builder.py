@@ -0,0 +1,105 @@
+from psycopg2 import sql
+
+FIELDS = ('surname', 'name', 'number')
+MATCH_MODES = ('equals', 'prefix', 'suffix', 'contains')
+
+# Serve case-insensitive prefix search: lower(field) LIKE 'abc%' uses these
+PREFIX_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS phonebook_surname_prefix_idx ON PhoneBook (lower(surname) text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS phonebook_name_prefix_idx ON PhoneBook (lower(name) text_pattern_ops)",
+]
+
+
+def escape_like(text):
+    """Make %, _ and \\ in user input match literally inside a LIKE pattern"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class PhoneBookQuery:
+    """Composable SELECT/DELETE on the PhoneBook table.
+
+    Identifiers are composed with psycopg2.sql and every value is a bind
+    parameter, so the statement text only depends on the shape of the query
+    (fields and match modes). key() names that shape, which lets callers
+    PREPARE each shape once and reuse its plan.
+    """
+
+    def __init__(self, table='phonebook'):
+        self.table = table
+        self._conditions = []   # (field, match, sql.Composed)
+        self._params = []
+        self._order_by = []
+        self._limit = None
+        self._offset = None
+
+    def where(self, field, value, match='equals'):
+        if field not in FIELDS:
+            raise ValueError(f"unknown field: {field}")
+        if match not in MATCH_MODES:
+            raise ValueError(f"unknown match mode: {match}")
+        column = sql.Identifier(field)
+        if field == 'number' and match != 'equals':
+            column = sql.SQL("{}::text").format(column)
+        value = str(value)
+        if match == 'equals':
+            condition = sql.SQL("{} = %s").format(column)
+        elif match == 'prefix':
+            # Same expression as the lower(...) text_pattern_ops indexes
+            condition = sql.SQL("lower({}) LIKE %s").format(column)
+            value = escape_like(value.lower()) + '%'
+        elif match == 'suffix':
+            condition = sql.SQL("{} ILIKE %s").format(column)
+            value = '%' + escape_like(value)
+        else:
+            condition = sql.SQL("{} ILIKE %s").format(column)
+            value = '%' + escape_like(value) + '%'
+        self._conditions.append((field, match, condition))
+        self._params.append(value)
+        return self
+
+    def order_by(self, *fields):
+        for field in fields:
+            if field not in FIELDS:
+                raise ValueError(f"unknown field: {field}")
+        self._order_by = list(fields)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def offset(self, offset):
+        self._offset = offset
+        return self
+
+    def key(self, action='select'):
+        """Stable name for the statement shape, usable as a prepared statement name"""
+        parts = [action] + [f"{field}_{match}" for field, match, _ in self._conditions]
+        if action == 'select':
+            parts += [f"by_{field}" for field in self._order_by]
+        return '_'.join(parts)
+
+    def select(self):
+        """(query, params) for SELECT * with the conditions, order, limit and offset"""
+        query = sql.SQL("SELECT * FROM {}").format(sql.Identifier(self.table))
+        query += self._where_clause()
+        if self._order_by:
+            query += sql.SQL(" ORDER BY {}").format(
+                sql.SQL(', ').join(map(sql.Identifier, self._order_by)))
+        # Always bound: LIMIT NULL / OFFSET NULL mean "no limit" / "no offset",
+        # so paging does not change the statement text
+        query += sql.SQL(" LIMIT %s OFFSET %s")
+        return query, self._params + [self._limit, self._offset]
+
+    def delete(self):
+        """(query, params) for DELETE with the conditions; refuses to delete everything"""
+        if not self._conditions:
+            raise ValueError("delete needs at least one condition")
+        query = sql.SQL("DELETE FROM {}").format(sql.Identifier(self.table))
+        return query + self._where_clause(), list(self._params)
+
+    def _where_clause(self):
+        if not self._conditions:
+            return sql.SQL("")
+        return sql.SQL(" WHERE ") + sql.SQL(" AND ").join(
+            condition for _, _, condition in self._conditions)
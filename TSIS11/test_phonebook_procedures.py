@@ -1,28 +1,72 @@
+import base64
+import json
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 os.environ['PGCLIENTENCODING'] = 'UTF8'
 
+# Shared connection pool lives next to PhoneBook in TSIS10
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'TSIS10'))
+
 import psycopg2
 from psycopg2 import sql
 
-class PhoneBookProcedures:
-    def __init__(self, dbname, user, password, host='localhost', port='5432'):
-        """Initialize database connection"""
+from db_pool import PooledSession, get_pool, pooled, release_pool
+
+def encode_page_cursor(order_by, row):
+    """Opaque "after" cursor for the row a keyset page ended on"""
+    user_id, first, last, email, phone, ptype, created = row[:7]
+    created = created.isoformat() if created else None
+    payload = json.dumps([order_by, user_id, first, last, created])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_page_cursor(cursor):
+    """Inverse of encode_page_cursor -> (order_by, user_id, first, last, created_at)"""
+    order_by, user_id, first, last, created = json.loads(
+        base64.urlsafe_b64decode(cursor.encode('ascii')))
+    created = datetime.fromisoformat(created) if created else None
+    return order_by, user_id, first, last, created
+
+
+def parse_users_data(users_data):
+    """'First,Last,Email,Phone;...' -> list of dicts for insert_users_json"""
+    users = []
+    for record in users_data.split(';'):
+        if not record.strip():
+            continue
+        parts = [part.strip() for part in record.split(',')] + [''] * 4
+        users.append({
+            'first_name': parts[0],
+            'last_name': parts[1],
+            'email': parts[2],
+            'phone_number': parts[3]
+        })
+    return users
+
+
+class PhoneBookProcedures(PooledSession):
+    def __init__(self, dbname, user, password, host='localhost', port='5432', pool=None):
+        """Initialize database connection pool"""
         try:
-            os.environ['PGHOST'] = host
-            os.environ['PGPORT'] = str(port)
-            os.environ['PGDATABASE'] = dbname
-            os.environ['PGUSER'] = user
-            os.environ['PGPASSWORD'] = password
-            os.environ['PGCLIENTENCODING'] = 'UTF8'
-            
-            self.conn = psycopg2.connect('')
-            self.conn.set_client_encoding('UTF8')
-            self.cursor = self.conn.cursor()
+            self._owns_pool = pool is None
+            self.pool = pool or get_pool(
+                dbname=dbname,
+                user=user,
+                password=password,
+                host=host,
+                port=str(port),
+                client_encoding='UTF8'
+            )
+            with self.session():
+                pass
             print("✓ Database connection established")
         except Exception as e:
             print(f"✗ Error connecting to database: {e}")
             raise
 
+    @pooled
     def search_by_pattern(self, pattern):
         """Test search_contacts_by_pattern function"""
         print(f"\n{'='*80}")
@@ -48,6 +92,32 @@ class PhoneBookProcedures:
         except Exception as e:
             print(f"✗ Error: {e}")
 
+    @pooled
+    def search_ranked(self, text, limit=20):
+        """Test search_contacts_ranked function"""
+        print(f"\n{'='*80}")
+        print(f"🔍 RANKED SEARCH FOR: '{text}'")
+        print('='*80)
+        
+        try:
+            self.cursor.execute("SELECT * FROM search_contacts_ranked(%s, %s);", (text, limit))
+            results = self.cursor.fetchall()
+            
+            if results:
+                print(f"{'ID':<5} {'First Name':<15} {'Last Name':<15} {'Email':<25} {'Phone':<18} {'Score':<6}")
+                print('-'*80)
+                for row in results:
+                    user_id, first, last, email, phone, ptype, score = row
+                    email = email or "N/A"
+                    phone = phone or "N/A"
+                    print(f"{user_id:<5} {first:<15} {last:<15} {email:<25} {phone:<18} {score:<6.2f}")
+                print(f"\nFound {len(results)} result(s)")
+            else:
+                print("No results found")
+        except Exception as e:
+            print(f"✗ Error: {e}")
+
+    @pooled
     def upsert_user(self, first_name, last_name, email, phone, phone_type='mobile'):
         """Test upsert_user_phone procedure"""
         print(f"\n{'='*80}")
@@ -70,6 +140,23 @@ class PhoneBookProcedures:
             print(f"✗ Error: {e}")
             self.conn.rollback()
 
+    @pooled
+    def upsert_many(self, users):
+        """Test upsert_users_phones function (list of dicts with CSV column names)"""
+        print(f"\n{'='*80}")
+        print(f"📝 UPSERTING {len(users)} USERS (single statement)")
+        print('='*80)
+        
+        try:
+            self.cursor.execute("SELECT * FROM upsert_users_phones(%s::jsonb);", (json.dumps(users),))
+            created, updated = self.cursor.fetchone()
+            self.conn.commit()
+            print(f"✓ Created: {created}, updated: {updated}")
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            self.conn.rollback()
+
+    @pooled
     def insert_multiple(self, users_data):
         """Test insert_multiple_users procedure"""
         print(f"\n{'='*80}")
@@ -84,48 +171,73 @@ class PhoneBookProcedures:
             for notice in self.conn.notices:
                 print(f"📢 {notice.strip()}")
             
-            # Show invalid records
-            print(f"\n{'='*80}")
-            print("❌ INVALID RECORDS LOG:")
-            print('='*80)
+            self._show_invalid_log()
+                
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            self.conn.rollback()
+
+    @pooled
+    def insert_multiple_json(self, users):
+        """Test insert_users_json procedure (list of dicts with CSV column names)"""
+        print(f"\n{'='*80}")
+        print(f"📦 BULK INSERTING {len(users)} USERS (JSON, set-based)")
+        print('='*80)
+        
+        try:
+            self.cursor.execute("CALL insert_users_json(%s::jsonb);", (json.dumps(users),))
+            self.conn.commit()
             
-            self.cursor.execute("""
-                SELECT first_name, last_name, phone_number, error_message, logged_at
-                FROM invalid_phones_log
-                ORDER BY logged_at DESC
-                LIMIT 10;
-            """)
+            # Get notices
+            for notice in self.conn.notices:
+                print(f"📢 {notice.strip()}")
             
-            invalid_records = self.cursor.fetchall()
-            if invalid_records:
-                print(f"{'First':<15} {'Last':<15} {'Phone':<18} {'Error':<30} {'Time':<20}")
-                print('-'*80)
-                for row in invalid_records:
-                    first, last, phone, error, logged = row
-                    print(f"{first:<15} {last:<15} {phone:<18} {error:<30} {str(logged)[:19]}")
-            else:
-                print("No invalid records")
+            self._show_invalid_log()
                 
         except Exception as e:
             print(f"✗ Error: {e}")
             self.conn.rollback()
 
-    def get_paginated(self, limit=10, offset=0, order_by='last_name'):
-        """Test get_contacts_paginated function"""
+    def _show_invalid_log(self):
+        """Print the latest entries of invalid_phones_log"""
+        print(f"\n{'='*80}")
+        print("❌ INVALID RECORDS LOG:")
+        print('='*80)
+        
+        self.cursor.execute("""
+            SELECT first_name, last_name, phone_number, error_message, logged_at
+            FROM invalid_phones_log
+            ORDER BY logged_at DESC
+            LIMIT 10;
+        """)
+        
+        invalid_records = self.cursor.fetchall()
+        if invalid_records:
+            print(f"{'First':<15} {'Last':<15} {'Phone':<18} {'Error':<30} {'Time':<20}")
+            print('-'*80)
+            for row in invalid_records:
+                first, last, phone, error, logged = row
+                print(f"{first:<15} {last:<15} {phone:<18} {error:<30} {str(logged)[:19]}")
+        else:
+            print("No invalid records")
+
+    @pooled
+    def get_paginated(self, limit=10, offset=0, order_by='last_name', exact_count=True):
+        """Test get_contacts_paginated function (exact_count=False uses the planner estimate)"""
         print(f"\n{'='*80}")
         print(f"📄 PAGINATED RESULTS (Limit: {limit}, Offset: {offset}, Order: {order_by})")
         print('='*80)
         
         try:
             self.cursor.execute(
-                "SELECT * FROM get_contacts_paginated(%s, %s, %s);",
-                (limit, offset, order_by)
+                "SELECT * FROM get_contacts_paginated(%s, %s, %s, %s);",
+                (limit, offset, order_by, exact_count)
             )
             results = self.cursor.fetchall()
             
             if results:
                 total_count = results[0][7] if results else 0
-                print(f"Total records: {total_count}")
+                print(f"Total records: {'' if exact_count else '~'}{total_count}")
                 print(f"Showing: {offset + 1} to {min(offset + limit, total_count)}")
                 print()
                 
@@ -144,6 +256,46 @@ class PhoneBookProcedures:
         except Exception as e:
             print(f"✗ Error: {e}")
 
+    @pooled
+    def get_total_count(self, exact=True):
+        """Total number of contacts from the cached counter or the planner estimate"""
+        self.cursor.execute("SELECT get_contacts_count(%s);", (exact,))
+        return self.cursor.fetchone()[0]
+
+    @pooled
+    def get_page(self, limit=10, after=None, order_by='last_name'):
+        """Test get_contacts_keyset function, returns (rows, next cursor)"""
+        print(f"\n{'='*80}")
+        print(f"📄 KEYSET PAGE (Limit: {limit}, Order: {order_by}, After: {after or 'start'})")
+        print('='*80)
+        
+        try:
+            after_id = after_first = after_last = after_created = None
+            if after:
+                order_by, after_id, after_first, after_last, after_created = decode_page_cursor(after)
+            self.cursor.execute(
+                "SELECT * FROM get_contacts_keyset(%s, %s, %s, %s, %s, %s);",
+                (limit, order_by, after_id, after_first, after_last, after_created)
+            )
+            results = self.cursor.fetchall()
+            
+            if results:
+                print(f"{'ID':<5} {'First':<12} {'Last':<12} {'Email':<22} {'Phone':<16} {'Type':<8}")
+                print('-'*80)
+                
+                for row in results:
+                    user_id, first, last, email, phone, ptype, created = row
+                    email = (email or "N/A")[:20]
+                    phone = phone or "N/A"
+                    ptype = ptype or "N/A"
+                    print(f"{user_id:<5} {first:<12} {last:<12} {email:<22} {phone:<16} {ptype:<8}")
+                return results, encode_page_cursor(order_by, results[-1])
+            print("No more results")
+        except Exception as e:
+            print(f"✗ Error: {e}")
+        return [], None
+
+    @pooled
     def delete_contact(self, first_name=None, last_name=None, phone_number=None):
         """Test delete_contact procedure"""
         print(f"\n{'='*80}")
@@ -177,6 +329,7 @@ class PhoneBookProcedures:
             print(f"✗ Error: {e}")
             self.conn.rollback()
 
+    @pooled
     def show_all_contacts(self):
         """Show all contacts"""
         print(f"\n{'='*80}")
@@ -209,9 +362,9 @@ class PhoneBookProcedures:
             print(f"✗ Error: {e}")
 
     def close(self):
-        """Close connection"""
-        self.cursor.close()
-        self.conn.close()
+        """Release connection pool"""
+        if self._owns_pool:
+            release_pool(self.pool)
         print("\n✓ Connection closed")
 
 
@@ -235,14 +388,18 @@ def main():
         print("5. Delete contact")
         print("6. Show all contacts")
         print("7. Run demo tests")
-        print("8. Exit")
+        print("8. Run concurrent upsert test")
+        print("9. Exit")
         print("="*80)
         
         choice = input("\nEnter your choice: ")
         
         if choice == '1':
             pattern = input("Enter search pattern: ")
-            pb.search_by_pattern(pattern)
+            if input("Ranked fuzzy search? (y/n) [n]: ").lower() == 'y':
+                pb.search_ranked(pattern)
+            else:
+                pb.search_by_pattern(pattern)
         
         elif choice == '2':
             first = input("First name: ")
@@ -257,13 +414,24 @@ def main():
             print("Separate multiple users with semicolon (;)")
             print("Example: John,Doe,john@mail.com,+77771234567;Jane,Smith,jane@mail.com,+77772345678")
             users_data = input("\nUsers data: ")
-            pb.insert_multiple(users_data)
+            if input("Update contacts that already exist (upsert)? (y/n) [n]: ").lower() == 'y':
+                pb.upsert_many(parse_users_data(users_data))
+            elif input("Set-based bulk insert (JSON)? (y/n) [y]: ").lower() != 'n':
+                pb.insert_multiple_json(parse_users_data(users_data))
+            else:
+                pb.insert_multiple(users_data)
         
         elif choice == '4':
             limit = int(input("Limit (default 10): ") or 10)
-            offset = int(input("Offset (default 0): ") or 0)
             order = input("Order by (last_name/first_name/created_at) [last_name]: ") or 'last_name'
-            pb.get_paginated(limit, offset, order)
+            if input("Keyset (cursor) pagination? (y/n) [y]: ").lower() != 'n':
+                rows, cursor = pb.get_page(limit, None, order)
+                while cursor and input("Next page? (y/n) [y]: ").lower() != 'n':
+                    rows, cursor = pb.get_page(limit, cursor)
+            else:
+                offset = int(input("Offset (default 0): ") or 0)
+                exact = input("Exact total count? (y/n) [y]: ").lower() != 'n'
+                pb.get_paginated(limit, offset, order, exact)
         
         elif choice == '5':
             print("\nDelete by:")
@@ -286,6 +454,9 @@ def main():
             run_demo_tests(pb)
         
         elif choice == '8':
+            run_concurrency_test(pb)
+        
+        elif choice == '9':
             pb.close()
             print("\n👋 Goodbye!")
             break
@@ -341,5 +512,64 @@ def run_demo_tests(pb):
     print("="*80)
 
 
+def run_concurrency_test(pb, writers=8, rounds=50, contacts=5):
+    """Parallel writers upsert the same few contacts; each must end up stored once"""
+    print("\n" + "="*80)
+    print(f"🧵 CONCURRENT UPSERT TEST: {writers} writers x {rounds} rounds")
+    print("="*80)
+    
+    names = [('Race', f'Condition{i}') for i in range(contacts)]
+    
+    def writer(worker):
+        errors = 0
+        with pb.session():
+            for i in range(rounds):
+                first, last = names[(worker + i) % contacts]
+                phone = f"+7700{worker:03d}{i:04d}"
+                try:
+                    if i % 2:
+                        # Batched path, overlapping with other writers' rows
+                        batch = [{'first_name': f, 'last_name': l, 'phone_number': phone}
+                                 for f, l in names]
+                        pb.cursor.execute("SELECT * FROM upsert_users_phones(%s::jsonb);",
+                                          (json.dumps(batch),))
+                    else:
+                        pb.cursor.execute("CALL upsert_user_phone(%s, %s, %s, %s, %s);",
+                                          (first, last, None, phone, 'mobile'))
+                    pb.conn.commit()
+                except psycopg2.Error as e:
+                    print(f"✗ Writer {worker}: {e}")
+                    pb.conn.rollback()
+                    errors += 1
+        return errors
+    
+    with ThreadPoolExecutor(writers) as executor:
+        errors = sum(executor.map(writer, range(writers)))
+    
+    with pb.session():
+        pb.cursor.execute("""
+            SELECT u.first_name, u.last_name, COUNT(DISTINCT u.user_id),
+                   COUNT(p.phone_id) FILTER (WHERE p.is_primary)
+            FROM users u
+            LEFT JOIN phones p ON p.user_id = u.user_id
+            WHERE u.first_name = 'Race'
+            GROUP BY u.first_name, u.last_name
+            ORDER BY u.last_name;
+        """)
+        results = pb.cursor.fetchall()
+        
+        passed = errors == 0 and len(results) == contacts
+        for first, last, users, primaries in results:
+            print(f"{first} {last}: {users} user(s), {primaries} primary phone(s)")
+            passed = passed and users == 1 and primaries == 1
+        
+        # Clean up the test contacts
+        pb.cursor.execute("DELETE FROM users WHERE first_name = 'Race';")
+        pb.conn.commit()
+    
+    print(f"\n{'✅ PASSED' if passed else '❌ FAILED'} ({errors} failed statement(s))")
+    return passed
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
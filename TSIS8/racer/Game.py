@@ -1,11 +1,14 @@
-import pygame, sys
+import pygame, sys, os
 from pygame.locals import *
 import random, time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'TSIS10'))
+from game_loop import FixedStepLoop, interpolate
+
 pygame.init()
 
-FPS = 60
-FramePerSec = pygame.time.Clock()
+FPS = 60        # Frames drawn per second
+TICK_RATE = 60  # Game logic steps per second; speeds below are per step
 
 BLUE  = (0, 0, 255)
 RED   = (255, 0, 0)
@@ -35,6 +38,7 @@ class Enemy(pygame.sprite.Sprite):
         self.image = pygame.image.load("Enemy.png")
         self.rect = self.image.get_rect()
         self.rect.center = (random.randint(40,SCREEN_WIDTH-40), 0)
+        self.previous = self.rect.topleft
 
       def move(self):
         global SCORE
@@ -51,6 +55,7 @@ class Player(pygame.sprite.Sprite):
         self.image = pygame.image.load("Player.png")
         self.rect = self.image.get_rect()
         self.rect.center = (160, 520)
+        self.previous = self.rect.topleft
        
     def move(self):
         pressed_keys = pygame.key.get_pressed()
@@ -75,8 +80,8 @@ all_sprites.add(E1)
 INC_SPEED = pygame.USEREVENT + 1
 pygame.time.set_timer(INC_SPEED, 1000)
 
-while True:
- 
+def handle_events():
+    global SPEED
     for event in pygame.event.get():
         if event.type == INC_SPEED:
               SPEED += 0.5      
@@ -84,14 +89,10 @@ while True:
             pygame.quit()
             sys.exit()
 
-
-    DISPLAYSURF.blit(background, (0,0))
-    scores = font_small.render(str(SCORE), True, BLACK)
-    DISPLAYSURF.blit(scores, (10,10))
-
+def update():
     for entity in all_sprites:
+        entity.previous = entity.rect.topleft
         entity.move()
-        DISPLAYSURF.blit(entity.image, entity.rect)
         
     if pygame.sprite.spritecollideany(P1, enemies):
           pygame.mixer.Sound('crash.wav').play()
@@ -106,6 +107,18 @@ while True:
           time.sleep(2)
           pygame.quit()
           sys.exit()        
+
+def render(alpha):
+    DISPLAYSURF.blit(background, (0,0))
+    scores = font_small.render(str(SCORE), True, BLACK)
+    DISPLAYSURF.blit(scores, (10,10))
+
+    # Draw between the last two logic steps; respawns at the top snap
+    for entity in all_sprites:
+        position = interpolate(entity.previous, entity.rect.topleft, alpha, SCREEN_HEIGHT // 2)
+        DISPLAYSURF.blit(entity.image, position)
         
     pygame.display.update()
-    FramePerSec.tick(FPS)
+
+loop = FixedStepLoop(TICK_RATE, fps=FPS)
+loop.run(handle_events, update, render)
@@ -1,11 +1,14 @@
-import pygame, sys
+import pygame, sys, os
 from pygame.locals import *
 import random, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'TSIS10'))
+from game_loop import FixedStepLoop, interpolate
  
 pygame.init()
  
-FPS = 60
-FramePerSec = pygame.time.Clock()
+FPS = 60        # Frames drawn per second
+TICK_RATE = 60  # Game logic steps per second; speeds below are per step
  
 BLUE  = (0, 0, 255)
 RED   = (255, 0, 0)
@@ -35,6 +38,7 @@ class Enemy(pygame.sprite.Sprite):
         self.image = pygame.image.load("Enemy.png")
         self.rect = self.image.get_rect()
         self.rect.center = (random.randint(40, SCREEN_WIDTH-40), 0)  
+        self.previous = self.rect.topleft
  
       def move(self):
         global SCORE
@@ -50,6 +54,7 @@ class Coin(pygame.sprite.Sprite):
         self.image = pygame.image.load("coin.jpg")
         self.rect = self.image.get_rect()
         self.rect.center = (random.randint(40, SCREEN_WIDTH-40), 0)  
+        self.previous = self.rect.topleft
  
       def move(self):
         global coinScore
@@ -70,6 +75,7 @@ class Player(pygame.sprite.Sprite):
         self.image = pygame.image.load("Player.png")
         self.rect = self.image.get_rect()
         self.rect.center = (160, 520)
+        self.previous = self.rect.topleft
         
     def move(self):
         pressed_keys = pygame.key.get_pressed()
@@ -101,26 +107,20 @@ all_sprites.add(C1)
 INC_SPEED = pygame.USEREVENT + 1
 pygame.time.set_timer(INC_SPEED, 1000)
  
-while True:
-       
+def handle_events():
+    global SPEED
     for event in pygame.event.get():
         if event.type == INC_SPEED:
               SPEED += 0.5     
         if event.type == QUIT:
             pygame.quit()
             sys.exit()
- 
-    DISPLAYSURF.blit(background, (0,0))
-    scores = font_small.render(str(SCORE), True, BLACK)
-    coin_scores = font_small.render(str(coinScore), True, RED)
-    DISPLAYSURF.blit(scores, (10,10))
-    DISPLAYSURF.blit(coin_scores, (SCREEN_WIDTH-20,10))
-    
+
+def update():
     for entity in all_sprites:
-        DISPLAYSURF.blit(entity.image, entity.rect)
+        entity.previous = entity.rect.topleft
         entity.move()
     for entity in coin:
-        DISPLAYSURF.blit(entity.image, entity.rect)
         entity.move()
  
     if pygame.sprite.spritecollideany(P1, enemies):
@@ -136,6 +136,20 @@ while True:
           time.sleep(2)
           pygame.quit()
           sys.exit()
+
+def render(alpha):
+    DISPLAYSURF.blit(background, (0,0))
+    scores = font_small.render(str(SCORE), True, BLACK)
+    coin_scores = font_small.render(str(coinScore), True, RED)
+    DISPLAYSURF.blit(scores, (10,10))
+    DISPLAYSURF.blit(coin_scores, (SCREEN_WIDTH-20,10))
+    
+    # Draw between the last two logic steps; respawns at the top snap
+    for entity in all_sprites:
+        position = interpolate(entity.previous, entity.rect.topleft, alpha, SCREEN_HEIGHT // 2)
+        DISPLAYSURF.blit(entity.image, position)
                
     pygame.display.update()
-    FramePerSec.tick(FPS)
\ No newline at end of file
+
+loop = FixedStepLoop(TICK_RATE, fps=FPS)
+loop.run(handle_events, update, render)
@@ -1,15 +1,21 @@
 import pygame
 import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'TSIS10'))
+from game_loop import FixedStepLoop, interpolate
 
 pygame.init()
 W, H = 600, 800
 screen = pygame.display.set_mode((W, H))
-clock = pygame.time.Clock()
+FPS = 60        # frames drawn per second
+TICK_RATE = 60  # physics steps per second; speeds and GRAVITY are per step
 FONT = pygame.font.SysFont(None, 28)
 pygame.display.set_caption("Coin Drop Game")
 # Player
 PW, PH = 80, 18
 player_x = W // 2 - PW // 2
+previous_x = player_x  # position at the previous step, for drawing in between
 player_y = 12
 PLAYER_SPEED = 6
 
@@ -18,29 +24,32 @@ FLOOR_H = 40
 floor_y = H - FLOOR_H
 
 # Coins
-coins = []  # active falling coins: dicts with x,y,vy,r
+coins = []  # active falling coins: dicts with x,y,vy,r (and py, y at the previous step)
 COLLECTED = 0
 COLLECTED_LIST = []  # for drawing collected coin icons
 GRAVITY = 0.45
 COIN_R = 9
 
 def drop_coin():
-    coins.append({"x": player_x + PW // 2, "y": player_y + PH + COIN_R, "vy": 0.0, "r": COIN_R})
+    y = player_y + PH + COIN_R
+    coins.append({"x": player_x + PW // 2, "y": y, "py": y, "vy": 0.0, "r": COIN_R})
 
 def draw_floor():
     pygame.draw.rect(screen, (30, 30, 30), (0, floor_y, W, FLOOR_H))
 
-def draw_player():
-    pygame.draw.rect(screen, (50, 150, 250), (player_x, player_y, PW, PH))
+def draw_player(alpha):
+    x, y = interpolate((previous_x, player_y), (player_x, player_y), alpha)
+    pygame.draw.rect(screen, (50, 150, 250), (x, y, PW, PH))
 
-def draw_active_coins():
+def draw_active_coins(alpha):
     for c in coins:
-        pygame.draw.circle(screen, (255, 215, 0), (int(c["x"]), int(c["y"])), c["r"])
+        pygame.draw.circle(screen, (255, 215, 0), interpolate((c["x"], c["py"]), (c["x"], c["y"]), alpha), c["r"])
 
 def update_coins():
     global COLLECTED
     to_remove = []
     for i, c in enumerate(coins):
+        c["py"] = c["y"]
         c["vy"] += GRAVITY
         c["y"] += c["vy"]
         # floor collision -> collect and remove
@@ -67,41 +76,45 @@ def draw_score():
     txt = FONT.render(f"Collected: {COLLECTED}", True, (240,240,240))
     screen.blit(txt, (8, 8))
 
+def handle_events():
+    for ev in pygame.event.get():
+        if ev.type == pygame.QUIT:
+            return False
+        elif ev.type == pygame.KEYDOWN:
+            if ev.key == pygame.K_ESCAPE:
+                return False
+            elif ev.key == pygame.K_SPACE:
+                drop_coin()
+
+def update():
+    global player_x, previous_x
+    previous_x = player_x
+    keys = pygame.key.get_pressed()
+    if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+        player_x -= PLAYER_SPEED
+    if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+        player_x += PLAYER_SPEED
+    # clamp player
+    player_x = max(0, min(W - PW, player_x))
+
+    update_coins()
+
+def render(alpha):
+    screen.fill((18, 18, 30))
+    draw_player(alpha)
+    draw_active_coins(alpha)
+    draw_floor()
+    draw_score()
+    draw_collected_icons()
+
+    pygame.display.flip()
+
 def main():
-    global player_x
-    running = True
-    while running:
-        dt = clock.tick(60)
-        for ev in pygame.event.get():
-            if ev.type == pygame.QUIT:
-                running = False
-            elif ev.type == pygame.KEYDOWN:
-                if ev.key == pygame.K_ESCAPE:
-                    running = False
-                elif ev.key == pygame.K_SPACE:
-                    drop_coin()
-
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT] or keys[pygame.K_a]:
-            player_x -= PLAYER_SPEED
-        if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-            player_x += PLAYER_SPEED
-        # clamp player
-        player_x = max(0, min(W - PW, player_x))
-
-        update_coins()
-
-        screen.fill((18, 18, 30))
-        draw_player()
-        draw_active_coins()
-        draw_floor()
-        draw_score()
-        draw_collected_icons()
-
-        pygame.display.flip()
+    loop = FixedStepLoop(TICK_RATE, fps=FPS)
+    loop.run(handle_events, update, render)
 
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
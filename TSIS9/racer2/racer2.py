@@ -1,14 +1,17 @@
 # Imports
-import pygame, sys
+import pygame, sys, os
 from pygame.locals import *
 import random, time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'TSIS10'))
+from game_loop import FixedStepLoop, interpolate
+
 # Initialzing
 pygame.init()
 
-# Setting up FPS
+# Setting up FPS (frames drawn) and TICK_RATE (game logic steps, speeds are per step)
 FPS = 60
-FramePerSec = pygame.time.Clock()
+TICK_RATE = 60
 
 # Creating colors
 BLUE = (0, 0, 255)
@@ -27,6 +30,7 @@ sc = 0
 # Setting up Fonts
 font = pygame.font.SysFont("Verdana", 60)
 font_small = pygame.font.SysFont("Verdana", 20)
+font_speed = pygame.font.SysFont('Bauhaus 93', 20)
 game_over = font.render("Game Over", True, BLACK)
 
 background = pygame.image.load(r"AnimatedStreet.png")
@@ -43,6 +47,7 @@ class Enemy(pygame.sprite.Sprite):
         self.image = pygame.image.load(r"Enemy.png")
         self.rect = self.image.get_rect()
         self.rect.center = (random.randint(40, SCREEN_WIDTH - 40), 0)
+        self.previous = self.rect.topleft
 
     def move(self):
         global SCORE
@@ -59,6 +64,7 @@ class Coin(pygame.sprite.Sprite):
         self.image = pygame.image.load(r"coin.jpg")
         self.rect = self.image.get_rect()
         self.rect.center = (random.randint(40, SCREEN_WIDTH - 40), 0)
+        self.previous = self.rect.topleft
 
     def move(self):
         global SCORE
@@ -78,6 +84,7 @@ class Coin2(pygame.sprite.Sprite):
         self.image = pygame.image.load(r"coin1.png")
         self.rect = self.image.get_rect()
         self.rect.center = (random.randint(40, SCREEN_WIDTH - 40), 0)
+        self.previous = self.rect.topleft
 
     def move(self):
         global SCORE
@@ -97,6 +104,7 @@ class Player(pygame.sprite.Sprite):
         self.image = pygame.image.load(r"Player.png")
         self.rect = self.image.get_rect()
         self.rect.center = (160, 520)
+        self.previous = self.rect.topleft
 
     def move(self):
         pressed_keys = pygame.key.get_pressed()
@@ -134,8 +142,7 @@ all_sprites.add(C2)
 # pygame.time.set_timer(INC_SPEED, 1000)
 
 # Game Loop
-while True:
-
+def handle_events():
     # Cycles through all events occuring
     for event in pygame.event.get():
         # if event.type == INC_SPEED:
@@ -144,14 +151,13 @@ while True:
             pygame.quit()
             sys.exit()
 
-    DISPLAYSURF.blit(background, (0, 0))
-    scores = font_small.render(str(SCORE), True, BLACK)
-    DISPLAYSURF.blit(scores, (10, 10))
+def update():
+    global SCORE, SPEED, sc
 
-    # Moves and Re-draws all Sprites
+    # Moves all Sprites
     for entity in all_sprites:
+        entity.previous = entity.rect.topleft
         entity.move()
-        DISPLAYSURF.blit(entity.image, entity.rect)
 
     if pygame.sprite.spritecollideany(P1, coins):
         Coin.disappear(C1)
@@ -166,11 +172,6 @@ while True:
     if SCORE // 2>>sc:
         SPEED += 1
         sc += 1
-    
-
-    font = pygame.font.SysFont('Bauhaus 93', 20)
-    text = font.render('Speed: ' + str(SPEED - 5), True, BLACK)
-    DISPLAYSURF.blit(text, (SCREEN_WIDTH - 140, 10))
 
     # To be run if collision occurs between Player and Enemy
     if pygame.sprite.spritecollideany(P1, enemies):
@@ -187,5 +188,20 @@ while True:
         pygame.quit()
         sys.exit()
 
+def render(alpha):
+    DISPLAYSURF.blit(background, (0, 0))
+    scores = font_small.render(str(SCORE), True, BLACK)
+    DISPLAYSURF.blit(scores, (10, 10))
+
+    # Re-draws all Sprites between the last two logic steps; respawns snap
+    for entity in all_sprites:
+        position = interpolate(entity.previous, entity.rect.topleft, alpha, SCREEN_HEIGHT // 2)
+        DISPLAYSURF.blit(entity.image, position)
+
+    text = font_speed.render('Speed: ' + str(SPEED - 5), True, BLACK)
+    DISPLAYSURF.blit(text, (SCREEN_WIDTH - 140, 10))
+
     pygame.display.update()
-    FramePerSec.tick(FPS)
\ No newline at end of file
+
+loop = FixedStepLoop(TICK_RATE, fps=FPS)
+loop.run(handle_events, update, render)
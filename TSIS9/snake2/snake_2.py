@@ -1,29 +1,17 @@
 import pygame
-from random import randrange, choice
-import time
+import random
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'TSIS10'))
+from replay import GAME_SNAKE2, decode_replay, encode_replay, start_replay
 
 Res = 600
 size = 25
 sizea = 15
-score = 0
 speed = 3
-
-x, y = randrange(0, Res, size), randrange(0, Res, size)
-apple = randrange(0, Res, size), randrange(0, Res, size)
-
-length = 1
-snake = [(x, y)]
-
-dx, dy = 0, 0
 FPS = 10
 
-pygame.init()
-sc = pygame.display.set_mode([Res, Res])
-clock = pygame.time.Clock()
-font_score = pygame.font.SysFont('Arial', 26, bold=True)
-font_end = pygame.font.SysFont('Arial', 50, bold=True)
-
-food_timer = time.time()
 food_duration = 5  # in seconds
 food_weight = {1: 'light', 2: 'medium', 3: 'heavy'}  # Different weights for food items
 
@@ -41,89 +29,189 @@ bonus_points = {
     (500, 500): (pygame.Color('purple'), 7)  # Purple bonus point lasts for 7 seconds
 }
 
-level = 1
-
-while True:
+REPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'replays')
+
+
+class Game:
+    """One game; step() is one frame of the game rules.
+
+    Seconds are game time (1 / FPS per frame) rather than the wall clock, and
+    all randomness comes from a Random seeded with self.seed, so the seed and
+    the logged direction changes (self.moves) replay a game exactly.
+    """
+
+    def __init__(self, seed=None):
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.width = self.height = Res // size
+        self.x, self.y = self.rng.randrange(0, Res, size), self.rng.randrange(0, Res, size)
+        self.apple = self.rng.randrange(0, Res, size), self.rng.randrange(0, Res, size)
+        self.length = 1
+        self.snake = [(self.x, self.y)]
+        self.dx, self.dy = 0, 0
+        self.direction = (0, 0)
+        self.FPS = FPS
+        self.score = 0
+        self.level = 1
+        self.bonus_points = dict(bonus_points)
+        self.time = 0.0
+        self.food_timer = 0.0
+        self.ticks = 0
+        self.game_over = False
+        self.moves = None
+
+    def step(self):
+        if self.game_over:
+            return
+        self.ticks += 1
+        if (self.dx, self.dy) != self.direction:
+            self.direction = (self.dx, self.dy)
+            if self.moves is not None:
+                self.moves.append((self.ticks, self.direction))
+
+        self.x += self.dx * size
+        self.y += self.dy * size
+        x, y = self.x, self.y
+        self.snake.append((x, y))
+        self.snake = self.snake[-self.length:]
+
+        # Check for collision with obstacles
+        if any((x, y) == obstacle for obstacle in obstacles[self.level]):
+            self.game_over = True
+            return
+
+        # Check for collision with bonus points and handle their disappearance
+        for point, (color, duration) in self.bonus_points.items():
+            if (x, y) == point:
+                self.score += 5  # Increment score for collecting bonus points
+                del self.bonus_points[point]
+                break  # Only allow collecting one bonus point at a time
+
+        # Check for time expiration of bonus points
+        expired_points = [point for point, (_, duration) in self.bonus_points.items()
+                          if self.time - self.food_timer > duration]
+        for point in expired_points:
+            del self.bonus_points[point]
+
+        if self.snake[-1] == self.apple:
+            self.score += 1
+            self.apple = self.rng.randrange(0, Res, size), self.rng.randrange(0, Res, size)
+            self.length += 1
+            self.FPS += 0.5
+            self.food_timer = self.time
+
+            # Add more obstacles when certain score thresholds are reached
+            if self.score == 10 or self.score == 20 or self.score == 30 or self.score == 40:
+                if self.level < 3:
+                    self.level += 1
+
+        if self.time - self.food_timer > food_duration:
+            self.apple = self.rng.randrange(0, Res, size), self.rng.randrange(0, Res, size)
+            self.food_timer = self.time
+
+        if x < 0 or x > Res - size or y < 0 or y > Res - size or len(self.snake) != len(set(self.snake)):
+            self.game_over = True
+            return
+
+        self.time += 1 / self.FPS
+
+
+def replay_game(replay):
+    """Re-simulate a snake_2 replay without drawing, return the Game"""
+    if replay['game'] != GAME_SNAKE2:
+        raise ValueError("not a snake_2 replay")
+    game = Game(replay['seed'])
+    done = 0
+    for tick, (dx, dy) in replay['moves']:
+        for _ in range(tick - done - 1):
+            game.step()
+        game.dx, game.dy = dx, dy
+        game.step()
+        done = tick
+    for _ in range(replay['ticks'] - done):
+        game.step()
+    return game
+
+
+def save_replay(game, replay):
+    replay['ticks'], replay['score'] = game.ticks, game.score
+    try:
+        os.makedirs(REPLAY_DIR, exist_ok=True)
+        with open(os.path.join(REPLAY_DIR, f"snake2-{game.seed}.snr"), 'wb') as f:
+            f.write(encode_replay(replay))
+    except OSError as e:
+        print(f"Error writing replay: {e}")
+
+
+def draw(sc, game, font_score):
     sc.fill(pygame.Color('black'))
-    
+
     # Draw obstacles for the current level
-    for obstacle in obstacles[level]:
+    for obstacle in obstacles[game.level]:
         pygame.draw.rect(sc, pygame.Color('gray'), (*obstacle, size, size))
-    
+
     # Draw bonus points
-    for point, (color, _) in bonus_points.items():
+    for point, (color, _) in game.bonus_points.items():
         pygame.draw.rect(sc, color, (*point, sizea, sizea))
-    
-    [(pygame.draw.rect(sc, pygame.Color('green'), (i, j, size, size))) for i, j in snake]
-    pygame.draw.rect(sc, pygame.Color('red'), (*apple, size, size))
 
-    render_score = font_score.render(f'SCORE: {score}', 1, pygame.Color('orange'))
+    [(pygame.draw.rect(sc, pygame.Color('green'), (i, j, size, size))) for i, j in game.snake]
+    pygame.draw.rect(sc, pygame.Color('red'), (*game.apple, size, size))
+
+    render_score = font_score.render(f'SCORE: {game.score}', 1, pygame.Color('orange'))
     sc.blit(render_score, (5, 5))
 
-    x += dx * size
-    y += dy * size
-    snake.append((x, y))
-    snake = snake[-length:]
-
-    # Check for collision with obstacles
-    if any((x, y) == obstacle for obstacle in obstacles[level]):
-        while True:
-            render_end = font_end.render('GAME OVER', 1, pygame.Color('orange'))
-            sc.blit(render_end, (Res // 2 - 150, Res // 3))
-            pygame.display.flip()
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    exit()
-    
-    # Check for collision with bonus points and handle their disappearance
-    for point, (color, duration) in bonus_points.items():
-        if (x, y) == point:
-            score += 5  # Increment score for collecting bonus points
-            del bonus_points[point]
-            break  # Only allow collecting one bonus point at a time
-    
-    # Check for time expiration of bonus points
-    expired_points = [point for point, (_, duration) in bonus_points.items() if time.time() - food_timer > duration]
-    for point in expired_points:
-        del bonus_points[point]
-    
-    if snake[-1] == apple:
-        score += 1
-        apple = randrange(0, Res, size), randrange(0, Res, size)
-        length += 1
-        FPS += 0.5
-        food_timer = time.time()
-        
-        # Add more obstacles when certain score thresholds are reached
-        if score == 10 or score == 20 or score == 30 or score == 40:
-            if level < 3:
-                level += 1
-
-    if time.time() - food_timer > food_duration:
-        apple = randrange(0, Res, size), randrange(0, Res, size)
-        food_timer = time.time()
-
-    if x < 0 or x > Res - size or y < 0 or y > Res - size or len(snake) != len(set(snake)):
-        while True:
-            render_end = font_end.render('GAME OVER', 1, pygame.Color('orange'))
-            sc.blit(render_end, (Res // 2 - 150, Res // 3))
-            pygame.display.flip()
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    exit()
-    pygame.display.flip()
-    clock.tick(FPS)
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            exit()
-
-    key = pygame.key.get_pressed()
-    if key[pygame.K_UP]:
-        dx, dy = 0, -1
-    if key[pygame.K_DOWN]:
-        dx, dy = 0, 1
-    if key[pygame.K_LEFT]:
-        dx, dy = -1, 0
-    if key[pygame.K_RIGHT]:
-        dx, dy = 1, 0
+
+def main():
+    pygame.init()
+    sc = pygame.display.set_mode([Res, Res])
+    clock = pygame.time.Clock()
+    font_score = pygame.font.SysFont('Arial', 26, bold=True)
+    font_end = pygame.font.SysFont('Arial', 50, bold=True)
+
+    game = Game()
+    replay = start_replay(game, game.level, GAME_SNAKE2)
+
+    while True:
+        draw(sc, game, font_score)
+        game.step()
+
+        if game.game_over:
+            save_replay(game, replay)
+            while True:
+                render_end = font_end.render('GAME OVER', 1, pygame.Color('orange'))
+                sc.blit(render_end, (Res // 2 - 150, Res // 3))
+                pygame.display.flip()
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        exit()
+        pygame.display.flip()
+        clock.tick(game.FPS)
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                save_replay(game, replay)
+                exit()
+
+        key = pygame.key.get_pressed()
+        if key[pygame.K_UP]:
+            game.dx, game.dy = 0, -1
+        if key[pygame.K_DOWN]:
+            game.dx, game.dy = 0, 1
+        if key[pygame.K_LEFT]:
+            game.dx, game.dy = -1, 0
+        if key[pygame.K_RIGHT]:
+            game.dx, game.dy = 1, 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == '--replay':
+        # python snake_2.py --replay FILE...: re-simulate saved games
+        for path in sys.argv[2:]:
+            with open(path, 'rb') as f:
+                replay = decode_replay(f.read())
+            game = replay_game(replay)
+            ok = game.ticks == replay['ticks'] and game.score == replay['score']
+            print(f"{path}: {game.ticks} ticks, score {game.score} "
+                  f"(claimed {replay['score']}) {'OK' if ok else 'MISMATCH'}")
+    else:
+        main()